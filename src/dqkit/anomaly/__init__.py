@@ -1,2 +1,2 @@
-from .anomaly import score_outliers
-__all__=['score_outliers']
+from .anomaly import score_outliers, OutlierModel
+__all__=['score_outliers','OutlierModel']
@@ -1,9 +1,13 @@
 
 from __future__ import annotations
-from typing import Dict, List, Optional, Sequence, Tuple
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import json
 import os
 import numpy as np
 import pandas as pd
+from ..capture import Capture, CaptureConfig
+from ..sketches import KLLSketch
 from ..types import Dataset, MetricResult, RunReport
 
 try:
@@ -11,28 +15,158 @@ try:
 except Exception:  # pragma: no cover
     IsolationForest = None
 
-def _robust_z(x: np.ndarray) -> np.ndarray:
-    # robust z = |x - median| / (1.4826 * MAD)
-    med = np.nanmedian(x)
-    mad = np.nanmedian(np.abs(x - med))
-    denom = 1.4826 * mad if mad > 0 else (np.nanstd(x) + 1e-12)
-    return np.abs(x - med) / denom
-
-def _iqr_score(x: np.ndarray) -> np.ndarray:
-    q1 = np.nanpercentile(x, 25)
-    q3 = np.nanpercentile(x, 75)
-    iqr = q3 - q1
-    if iqr <= 0:
-        return np.zeros_like(x, dtype=float)
-    # 1.5*IQR rule → score grows linearly beyond fences
-    lower = q1 - 1.5 * iqr
-    upper = q3 + 1.5 * iqr
-    s = np.zeros_like(x, dtype=float)
-    s[x < lower] = (lower - x[x < lower]) / (iqr + 1e-12)
-    s[x > upper] = (x[x > upper] - upper) / (iqr + 1e-12)
-    return s
-
-def score_outliers(ds: Dataset, columns: Optional[Sequence[str]] = None, method: str = "auto", contamination: float = 0.01, artifacts_dir: Optional[str] = None) -> RunReport:
+# KLL compactor size for the streamed score threshold (rank error well under 0.1%), and
+# the row sample an OutlierModel is fitted on when streaming without one
+_SKETCH_K = 2048
+_FIT_MAX_ROWS = 1_000_000
+
+def _columns_by_row(df: pd.DataFrame, cols: Sequence[str], fill: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """(columns, rows) float matrix of `cols` with NaNs replaced by `fill` (default: the
+    column means), and the fill used. One column per contiguous row keeps the per-column
+    reductions in the same summation order as on a single column."""
+    X = df[list(cols)].to_numpy(float)
+    if fill is None:
+        fill = np.nanmean(X, axis=0)
+    inds = np.where(np.isnan(X))
+    X[inds] = np.take(fill, inds[1])
+    return np.ascontiguousarray(X.T), fill
+
+class OutlierModel:
+    """Robust per-column statistics behind method="auto" of `score_outliers`: column
+    means (NaN fill), median and MAD scale for the robust z, and quartiles for the
+    1.5*IQR fences, plus the score threshold at the fitted contamination. Fit once on a
+    reference window, `save`/`load` it, and score later batches against it without
+    recomputing any statistic.
+    """
+
+    def __init__(self, columns: Sequence[str], fill: np.ndarray, median: np.ndarray, scale: np.ndarray,
+                 q1: np.ndarray, q3: np.ndarray, threshold: float = 1.0):
+        self.columns = list(columns)
+        self.fill = np.asarray(fill, dtype=float)
+        self.median = np.asarray(median, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.q1 = np.asarray(q1, dtype=float)
+        self.q3 = np.asarray(q3, dtype=float)
+        self.threshold = float(threshold)
+
+    @classmethod
+    def fit(cls, data: Union[pd.DataFrame, Dataset], columns: Optional[Sequence[str]] = None, contamination: float = 0.01) -> "OutlierModel":
+        """Fit on the numeric columns of `data` (or of `columns`)."""
+        df = data.df if isinstance(data, Dataset) else data
+        df = df if columns is None else df[list(columns)]
+        num_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+        if not num_cols:
+            raise ValueError("no numeric columns to fit")
+        XT, fill = _columns_by_row(df, num_cols)
+        return cls._fit(num_cols, XT, fill, contamination)[0]
+
+    @classmethod
+    def _fit(cls, cols: Sequence[str], XT: np.ndarray, fill: np.ndarray, contamination: float) -> Tuple["OutlierModel", np.ndarray]:
+        """Model fitted on the (columns, rows) matrix XT, and its per-column scores of XT."""
+        med = np.nanmedian(XT, axis=1)
+        mad = np.nanmedian(np.abs(XT - med[:, None]), axis=1)
+        with np.errstate(invalid="ignore"):
+            scale = np.where(mad > 0, 1.4826 * mad, np.nanstd(XT, axis=1) + 1e-12)
+        q1, q3 = np.nanpercentile(XT, [25, 75], axis=1)
+        model = cls(cols, fill, med, scale, q1, q3)
+        S = model._column_scores(XT)
+        s = S.max(axis=0)
+        model.threshold = float(np.quantile(s, 1.0 - contamination)) if len(s) > 1 else 1.0
+        return model, S
+
+    def _column_scores(self, XT: np.ndarray) -> np.ndarray:
+        """(columns, rows) 0..1 outlierness: sigmoid(max(robust z, IQR fence distance) - 3)."""
+        z = np.abs(XT - self.median[:, None]) / self.scale[:, None]
+        iqr = (self.q3 - self.q1)[:, None]
+        lower, upper = self.q1[:, None] - 1.5 * iqr, self.q3[:, None] + 1.5 * iqr
+        with np.errstate(invalid="ignore"):
+            # 1.5*IQR rule → score grows linearly beyond fences; flat columns score 0
+            fence = np.where(XT < lower, (lower - XT) / (iqr + 1e-12), np.where(XT > upper, (XT - upper) / (iqr + 1e-12), 0.0))
+        fence[(iqr <= 0).ravel()] = 0.0
+        # squash with sigmoid to [0,1], using 3 as a typical robust z cutoff
+        return 1.0 / (1.0 + np.exp(-(np.maximum(z, fence) - 3.0)))
+
+    def score(self, data: Union[pd.DataFrame, Dataset]) -> np.ndarray:
+        """Per-row anomaly score (max over the model columns) of a new batch."""
+        df = data.df if isinstance(data, Dataset) else data
+        XT, _ = _columns_by_row(df, self.columns, self.fill)
+        return self._column_scores(XT).max(axis=0)
+
+    def save(self, path: str) -> None:
+        """Write the model to an .npz file; column names are kept as JSON so that str, int,
+        float and bool names come back with their type."""
+        try:
+            names = json.dumps(self.columns)
+        except TypeError:
+            names = None
+        if names is None or json.loads(names) != self.columns:
+            raise ValueError("only str, int, float or bool column names can be saved")
+        np.savez(path, columns=np.array(names), fill=self.fill, median=self.median, scale=self.scale,
+                 q1=self.q1, q3=self.q3, threshold=np.array(self.threshold))
+
+    @classmethod
+    def load(cls, path: str) -> "OutlierModel":
+        data = np.load(path)
+        return cls(json.loads(str(data["columns"])), data["fill"], data["median"], data["scale"], data["q1"], data["q3"], float(data["threshold"]))
+
+class _AnomalyTotals:
+    """Folds per-row scores chunk by chunk into a KLL sketch of all scores, per-column
+    score sums, the count of rows >= a known `threshold`, and the positions of the
+    `top_k` highest-scoring rows (a bounded selection merged per chunk)."""
+
+    def __init__(self, n_columns: int, top_k: int, threshold: Optional[float] = None):
+        self.sketch = KLLSketch(_SKETCH_K, seed=0)
+        self.col_sum = np.zeros(n_columns)
+        self.threshold = threshold
+        self.flagged = 0
+        self.top_k = top_k
+        self.top_score = np.empty(0)
+        self.top_pos = np.empty(0, dtype=np.int64)
+
+    def add(self, start: int, s: np.ndarray, col_sum: np.ndarray) -> None:
+        self.sketch.update(s)
+        self.col_sum += col_sum
+        if self.threshold is not None:
+            self.flagged += int((s >= self.threshold).sum())
+        if not self.top_k:
+            return
+        pos = np.arange(start, start + len(s))
+        if len(s) > self.top_k:
+            keep = np.argpartition(-s, self.top_k - 1)[:self.top_k]
+            s, pos = s[keep], pos[keep]
+        score = np.concatenate([self.top_score, s])
+        pos = np.concatenate([self.top_pos, pos])
+        if len(score) > self.top_k:
+            keep = np.argpartition(-score, self.top_k - 1)[:self.top_k]
+            score, pos = score[keep], pos[keep]
+        self.top_score, self.top_pos = score, pos
+
+def _score_chunks(df: pd.DataFrame, model: OutlierModel, totals: _AnomalyTotals, chunksize: int, n_jobs: int = 1) -> None:
+    """Score row chunks of df against `model` into `totals`. n_jobs > 1 (or -1 for all
+    cores) scores chunks on a thread pool; at most two chunks per worker are in flight and
+    results are folded in row order, so only chunk-sized copies are ever alive."""
+    def block(start: int) -> Tuple[int, np.ndarray, np.ndarray]:
+        S = model._column_scores(_columns_by_row(df.iloc[start:start + chunksize], model.columns, model.fill)[0])
+        return start, S.max(axis=0), S.sum(axis=1)
+
+    starts = range(0, len(df), chunksize)
+    if n_jobs != 1 and len(starts) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        workers = (os.cpu_count() or 1) if n_jobs < 0 else n_jobs
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for start in starts:
+                pending.append(pool.submit(block, start))
+                if len(pending) >= 2 * workers:
+                    totals.add(*pending.popleft().result())
+            while pending:
+                totals.add(*pending.popleft().result())
+    else:
+        for start in starts:
+            totals.add(*block(start))
+
+def score_outliers(ds: Dataset, columns: Optional[Sequence[str]] = None, method: str = "auto", contamination: float = 0.01, artifacts_dir: Optional[str] = None, capture: Optional[CaptureConfig] = None, model: Optional[OutlierModel] = None,
+                   chunksize: Optional[int] = None, n_jobs: int = 1, top_k: Optional[int] = None) -> RunReport:
     """Score per-row anomalies.
     - method="auto": combine per-column robust z and IQR into a 0..1 score via sigmoid; max across columns.
     - method="iforest": IsolationForest multivariate score (requires scikit-learn).
@@ -40,61 +174,117 @@ def score_outliers(ds: Dataset, columns: Optional[Sequence[str]] = None, method:
       - dq.anomaly.rate  (fraction of rows flagged given default threshold from contamination)
       - dq.anomaly.threshold  (score threshold used)
       - dq.anomaly.score.<col> (avg column-level outlierness for numeric columns, auto mode)
-    Artifact: CSV of rows with score >= threshold.
+    Artifact: CSV of rows with score >= threshold; `capture` caps/samples them (see CaptureConfig).
+    A fitted `model` (see OutlierModel) scores its own columns with its reference statistics
+    and threshold instead of refitting on this batch; `contamination` is then unused.
+    Streaming (auto only): with `chunksize`, rows are scored chunk by chunk, spread over
+    `n_jobs` threads (-1 for all cores), without the full score vector or an imputed copy
+    of the frame. Without `model`, one is fitted on a uniform sample of at most 1M rows;
+    the threshold is then the contamination quantile of a KLL sketch of all scores and the
+    rate is estimated from the sketch (both exact for small inputs; the threshold metric
+    carries the sketch rank error). Only the `top_k` highest-scoring rows (default
+    ceil(contamination * n)) are kept for the artifact, highest score first.
     """
-    df = ds.df if columns is None else ds.df[list(columns)]
-    num_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    if model is not None and method == "iforest":
+        raise ValueError("model applies to method='auto' only")
+    if chunksize is not None and method == "iforest":
+        raise ValueError("chunksize applies to method='auto' only")
+    if chunksize is not None and chunksize < 1:
+        raise ValueError("chunksize must be >= 1")
+    # streaming reads the selected columns from ds.df chunk by chunk instead of copying them
+    df = ds.df if columns is None or chunksize is not None else ds.df[list(columns)]
+    cols = list(df.columns) if columns is None else list(columns)
+    num_cols = model.columns if model is not None else [c for c in cols if pd.api.types.is_numeric_dtype(df[c])]
     n = len(df)
     if n == 0 or not num_cols:
         return RunReport(metrics=[MetricResult("dq.anomaly.rate", "dataset", "*", 0.0)], meta={"dataset": ds.name, "n": n})
-
-    X = df[num_cols].to_numpy(float)
-    # simple mean impute
-    col_means = np.nanmean(X, axis=0)
-    inds = np.where(np.isnan(X))
-    X[inds] = np.take(col_means, inds[1])
+    if chunksize is not None:
+        return _score_outliers_stream(ds, df, cols, num_cols, contamination, artifacts_dir, capture, model, chunksize, n_jobs, top_k)
 
     if method == "iforest":
         if IsolationForest is None:
             raise ImportError("scikit-learn required for IsolationForest method")
+        XT, _ = _columns_by_row(df, num_cols)
+        X = XT.T
         iso = IsolationForest(contamination=contamination, random_state=42, n_estimators=200)
         iso.fit(X)
         # higher scores indicate more normal; convert to anomaly score 0..1
         s = -iso.score_samples(X)
         # normalize to 0..1
         s = (s - s.min()) / (s.max() - s.min() + 1e-12)
+        # threshold by quantile from contamination
+        thr = float(np.quantile(s, 1.0 - contamination)) if n > 1 else 1.0
     else:
-        # auto: combine robust z and iqr per column
-        z_scores = np.column_stack([_robust_z(X[:, j]) for j in range(X.shape[1])])
-        iqr_scores = np.column_stack([_iqr_score(X[:, j]) for j in range(X.shape[1])])
-        col_scores = np.maximum(z_scores, iqr_scores)
-        # squash with sigmoid to [0,1], using 3 as a typical robust z cutoff
-        s = 1.0 / (1.0 + np.exp(-(col_scores - 3.0)))
-        # take max across columns for per-row score
-        s = s.max(axis=1)
+        # auto: combine robust z and iqr per column, max across columns for per-row score
+        if model is None:
+            XT, fill = _columns_by_row(df, num_cols)
+            model, S = OutlierModel._fit(num_cols, XT, fill, contamination)
+        else:
+            S = model._column_scores(_columns_by_row(df, num_cols, model.fill)[0])
+        s = S.max(axis=0)
+        thr = model.threshold
 
-    # threshold by quantile from contamination
-    thr = float(np.quantile(s, 1.0 - contamination)) if n > 1 else 1.0
     flagged = s >= thr
     rate = float(flagged.mean())
 
+    sink = Capture(artifacts_dir, capture)
+    try:
+        if flagged.any():
+            sink.add("artifact.anomaly.rows", f"{ds.name}__anomalies", df.loc[flagged].assign(dq_anomaly_score=s[flagged]))
+        artifacts = sink.close()
+    except BaseException:
+        sink.abort()
+        raise
+
     metrics: List[MetricResult] = [
-        MetricResult("dq.anomaly.rate","dataset","*", rate),
+        MetricResult("dq.anomaly.rate","dataset","*", rate, meta=sink.counts("artifact.anomaly.rows") if capture is not None else {}),
         MetricResult("dq.anomaly.threshold","dataset","*", thr),
     ]
     if method != "iforest":
         # emit column averages to help locate problem columns
-        for j, c in enumerate(num_cols):
-            metrics.append(MetricResult(f"dq.anomaly.score.{c}", "column", c, float(np.mean(1.0 / (1.0 + np.exp(-(np.maximum(_robust_z(X[:, j]), _iqr_score(X[:, j])) - 3.0)))))))
-
-    artifacts: Dict[str, str] = {}
-    if artifacts_dir is not None and flagged.any():
-        os.makedirs(artifacts_dir, exist_ok=True)
-        out = df.copy()
-        out["dq_anomaly_score"] = s
-        out = out.loc[flagged]
-        path = os.path.join(artifacts_dir, f"{ds.name}__anomalies.csv")
-        out.to_csv(path, index=False)
-        artifacts["artifact.anomaly.rows"] = path
+        for c, v in zip(num_cols, S.mean(axis=1)):
+            metrics.append(MetricResult(f"dq.anomaly.score.{c}", "column", c, float(v)))
 
     return RunReport(metrics=metrics, artifacts=artifacts, meta={"dataset": ds.name, "method": method, "columns": num_cols})
+
+def _score_outliers_stream(ds: Dataset, df: pd.DataFrame, cols: List[str], num_cols: List[str], contamination: float, artifacts_dir: Optional[str],
+                           capture: Optional[CaptureConfig], model: Optional[OutlierModel], chunksize: int, n_jobs: int, top_k: Optional[int]) -> RunReport:
+    n = len(df)
+    fitted = model is None
+    if fitted:
+        sample = df
+        if n > _FIT_MAX_ROWS:
+            rng = np.random.default_rng(0)
+            sample = df.iloc[np.sort(rng.choice(n, _FIT_MAX_ROWS, replace=False))]
+        model = OutlierModel.fit(sample, columns=num_cols, contamination=contamination)
+    k = int(np.ceil(contamination * n)) if top_k is None else int(top_k)
+    totals = _AnomalyTotals(len(num_cols), k, None if fitted else model.threshold)
+    _score_chunks(df, model, totals, chunksize, n_jobs=n_jobs)
+
+    sketch = totals.sketch
+    if fitted:
+        thr = float(sketch.quantiles([1.0 - contamination])[0]) if n > 1 else 1.0
+        flagged = n - float(sketch.rank(thr))
+    else:
+        thr, flagged = model.threshold, totals.flagged
+
+    sink = Capture(artifacts_dir, capture)
+    hit = totals.top_score >= thr
+    try:
+        if hit.any():
+            score, pos = totals.top_score[hit], totals.top_pos[hit]
+            order = np.lexsort((pos, -score))
+            sink.add("artifact.anomaly.rows", f"{ds.name}__anomalies", df.iloc[pos[order]][cols].assign(dq_anomaly_score=score[order]))
+        artifacts = sink.close()
+    except BaseException:
+        sink.abort()
+        raise
+
+    metrics: List[MetricResult] = [
+        MetricResult("dq.anomaly.rate", "dataset", "*", float(flagged / n), meta=sink.counts("artifact.anomaly.rows") if capture is not None else {}),
+        MetricResult("dq.anomaly.threshold", "dataset", "*", thr, meta={"rank_error": sketch.rank_error} if fitted else {}),
+    ]
+    for c, v in zip(num_cols, totals.col_sum / n):
+        metrics.append(MetricResult(f"dq.anomaly.score.{c}", "column", c, float(v)))
+    return RunReport(metrics=metrics, artifacts=artifacts, meta={"dataset": ds.name, "method": "auto", "columns": num_cols, "mode": "stream",
+                                                                 "chunksize": chunksize, "fit_rows": min(n, _FIT_MAX_ROWS) if fitted else None})
@@ -0,0 +1,189 @@
+
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+import os
+import queue
+import threading
+import zlib
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:  # pragma: no cover
+    pa = None
+    pq = None
+
+@dataclass
+class CaptureConfig:
+    """How failing rows are written as artifacts.
+    - max_rows: cap on rows kept per artifact (None keeps every row)
+    - sample: "first" keeps the first `max_rows` rows, "reservoir" a uniform random sample
+      (each row gets a random key and the smallest `max_rows` keys are kept; rows are
+      written in their original order)
+    - format: "csv" or "parquet" (requires pyarrow)
+    - background: write on a background thread so checks do not wait on disk I/O
+    """
+    max_rows: Optional[int] = None
+    sample: str = "first"
+    format: str = "csv"
+    background: bool = True
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.sample not in ("first", "reservoir"):
+            raise ValueError("sample must be 'first' or 'reservoir'")
+        if self.format not in ("csv", "parquet"):
+            raise ValueError("format must be 'csv' or 'parquet'")
+        if self.format == "parquet" and pq is None:
+            raise ImportError("pyarrow required for parquet capture")
+        if self.max_rows is not None and self.max_rows < 0:
+            raise ValueError("max_rows must be >= 0")
+
+class _Writer:
+    """Runs write jobs in submission order, inline or on one background thread.
+    The queue is bounded, so a slow disk applies back-pressure instead of buffering frames."""
+
+    def __init__(self, background: bool):
+        self._error: Optional[BaseException] = None
+        self._parquet: Dict[str, Any] = {}
+        self._queue: Optional["queue.Queue"] = None
+        if background:
+            self._queue = queue.Queue(maxsize=8)
+            self._thread = threading.Thread(target=self._loop, name="dqkit-capture", daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if self._error is None:
+                try:
+                    job[0](*job[1:])
+                except BaseException as e:  # surfaced on close()
+                    self._error = e
+
+    def submit(self, fn: Callable, *args: Any) -> None:
+        if self._queue is None:
+            fn(*args)
+        else:
+            self._queue.put((fn,) + args)
+
+    def write_csv(self, path: str, frame: pd.DataFrame, first: bool) -> None:
+        frame.to_csv(path, mode="w" if first else "a", header=first, index=False)
+
+    def write_parquet(self, path: str, frame: pd.DataFrame, first: bool) -> None:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if first:
+            self._parquet[path] = pq.ParquetWriter(path, table.schema)
+        writer = self._parquet[path]
+        writer.write_table(table.cast(writer.schema))
+
+    def close(self) -> None:
+        if self._queue is not None:
+            self._queue.put(None)
+            self._thread.join()
+        for writer in self._parquet.values():
+            writer.close()
+        self._parquet.clear()
+        if self._error is not None:
+            raise self._error
+
+class _Slot:
+    def __init__(self, path: str, seed: int):
+        self.path = path
+        self.failures = 0
+        self.captured = 0
+        self.kept: Optional[pd.DataFrame] = None
+        self.keys = np.empty(0)
+        self.order = np.empty(0, dtype=np.int64)
+        self.rng = np.random.default_rng(seed)
+
+class Capture:
+    """Collects failing rows per artifact key under a CaptureConfig.
+    `add(key, stem, frame)` counts every failing row exactly and keeps at most
+    `max_rows` of them; `close()` flushes and returns {key: path}. A key added again is
+    appended to (chunked runs), so one Capture serves a whole run.
+    """
+
+    def __init__(self, artifacts_dir: Optional[str], config: Optional[CaptureConfig] = None):
+        self.artifacts_dir = artifacts_dir
+        self.config = config or CaptureConfig()
+        self.artifacts: Dict[str, str] = {}
+        self._slots: Dict[str, _Slot] = {}
+        self._writer: Optional[_Writer] = None
+
+    def add(self, key: str, stem: str, frame: pd.DataFrame) -> None:
+        if self.artifacts_dir is None or len(frame) == 0:
+            return
+        slot = self._slots.get(key)
+        if slot is None:
+            os.makedirs(self.artifacts_dir, exist_ok=True)
+            ext = ".parquet" if self.config.format == "parquet" else ".csv"
+            slot = _Slot(os.path.join(self.artifacts_dir, stem + ext), self.config.seed + zlib.crc32(key.encode()))
+            self._slots[key] = slot
+            self.artifacts[key] = slot.path
+        start = slot.failures
+        slot.failures += len(frame)
+        cap = self.config.max_rows
+        if cap is None or self.config.sample == "first":
+            take = len(frame) if cap is None else max(0, min(len(frame), cap - slot.captured))
+            if take:
+                self._write(slot, frame.iloc[:take])
+            return
+        # reservoir by random keys: keep the `cap` rows with the smallest keys so far
+        keys = slot.rng.random(len(frame))
+        order = np.arange(start, start + len(frame))
+        kept = frame if slot.kept is None else pd.concat([slot.kept, frame], ignore_index=True)
+        keys = np.concatenate([slot.keys, keys])
+        order = np.concatenate([slot.order, order])
+        if len(keys) > cap:
+            sel = np.sort(np.argpartition(keys, cap - 1)[:cap]) if cap else np.empty(0, dtype=np.intp)
+            kept, keys, order = kept.iloc[sel].reset_index(drop=True), keys[sel], order[sel]
+        slot.kept, slot.keys, slot.order = kept, keys, order
+
+    def _write(self, slot: _Slot, frame: pd.DataFrame) -> None:
+        if self._writer is None:
+            self._writer = _Writer(self.config.background)
+        fn = self._writer.write_parquet if self.config.format == "parquet" else self._writer.write_csv
+        self._writer.submit(fn, slot.path, frame, slot.captured == 0)
+        slot.captured += len(frame)
+
+    def counts(self, key: str) -> Dict[str, int]:
+        """Exact failure count and captured rows of one key (for metric meta)."""
+        slot = self._slots.get(key)
+        if slot is None:
+            return {"failures": 0, "captured": 0}
+        captured = slot.captured if slot.kept is None else len(slot.kept)
+        return {"failures": slot.failures, "captured": captured}
+
+    def close(self) -> Dict[str, str]:
+        for slot in self._slots.values():
+            if slot.kept is not None:
+                kept = slot.kept.iloc[np.argsort(slot.order, kind="stable")]
+                slot.kept = None
+                if len(kept):
+                    self._write(slot, kept)
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        # an artifact whose sample ended up empty (max_rows=0) has no file
+        return {k: p for k, p in self.artifacts.items() if self._slots[k].captured}
+
+    def abort(self) -> None:
+        """Stop writing after a failed run: the writer thread is shut down and the
+        partial artifact files written so far are removed."""
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except BaseException:
+                pass  # the run is failing already; its own error is the one to surface
+            self._writer = None
+        for path in self.artifacts.values():
+            if os.path.exists(path):
+                os.remove(path)
+        self.artifacts.clear()
+        self._slots.clear()
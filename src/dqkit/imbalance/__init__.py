@@ -1,2 +1,2 @@
-from .imbalance import measure_imbalance, simulate_rebalance
-__all__=['measure_imbalance','simulate_rebalance']
+from .imbalance import measure_imbalance, measure_imbalance_counts, simulate_rebalance, LabelCounts
+__all__=['measure_imbalance','measure_imbalance_counts','simulate_rebalance','LabelCounts']
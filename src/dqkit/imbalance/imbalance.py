@@ -5,6 +5,77 @@ import numpy as np
 import pandas as pd
 from ..types import Dataset, MetricResult, RunReport
 
+# rarity="auto" emits per-class rarity metrics up to this many classes
+_RARITY_METRICS_MAX = 1000
+
+class LabelCounts:
+    """Exact label counts that can be fed chunks and merged across shards.
+    Each chunk is factorized and counted with one bincount; the label -> slot index grows
+    as new labels appear. Missing labels are counted as a label (like
+    value_counts(dropna=False)), but all missing markers share one slot, so None and NaN
+    in one object column are a single class. Categories of a categorical chunk that do
+    not occur are kept with count 0, as value_counts does.
+    """
+
+    def __init__(self):
+        self.labels = pd.Index([], dtype=object)
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    @property
+    def n(self) -> int:
+        return int(self.counts.sum())
+
+    def _add(self, labels: pd.Index, counts: np.ndarray) -> None:
+        pos = self.labels.get_indexer(labels)
+        # missing markers (None/NaN/NaT) all share one slot; object-index lookup may not match them
+        na = pd.isna(labels)
+        if na.any():
+            have = np.flatnonzero(pd.isna(self.labels))
+            pos[na] = have[0] if len(have) else -1
+        new = pos < 0
+        if new.any():
+            pos[new] = np.arange(len(self.labels), len(self.labels) + int(new.sum()))
+            merged = np.concatenate([self.labels.to_numpy(dtype=object), labels[new].to_numpy(dtype=object)])
+            self.labels = pd.Index(merged, dtype=object)
+            self.counts = np.concatenate([self.counts, np.zeros(int(new.sum()), dtype=np.int64)])
+        self.counts[pos] += counts
+
+    def update(self, values: Any) -> "LabelCounts":
+        values = pd.Series(values)
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        if len(uniques):
+            uniques = uniques.to_numpy(dtype=object)
+            missing = pd.isna(uniques)
+            if missing.any():
+                # keep the column's own missing marker (None stays None)
+                uniques[missing] = values[values.isna()].iloc[0]
+            self._add(pd.Index(uniques, dtype=object), np.bincount(codes, minlength=len(uniques)))
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            cats = values.cat.categories
+            self._add(pd.Index(cats.to_numpy(dtype=object), dtype=object), np.zeros(len(cats), dtype=np.int64))
+        return self
+
+    def merge(self, other: "LabelCounts") -> "LabelCounts":
+        if len(other.labels):
+            self._add(other.labels, other.counts)
+        return self
+
+    def series(self) -> pd.Series:
+        """Counts by label, largest first (ties by label text), so that every way of
+        accumulating the same counts gives the same order."""
+        order = np.lexsort((self.labels.astype(str), -self.counts)) if len(self.counts) else np.empty(0, dtype=np.intp)
+        return pd.Series(self.counts[order], index=self.labels[order], dtype="int64")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"labels": self.labels.tolist(), "counts": self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "LabelCounts":
+        lc = cls()
+        lc.labels = pd.Index(d["labels"], dtype=object)
+        lc.counts = np.asarray(d["counts"], dtype=np.int64)
+        return lc
+
 def _effective_num(counts: np.ndarray, beta: float = 0.999) -> float:
     """Cui et al. (Class-Balanced Loss). Larger when distribution is flatter."""
     counts = counts.astype(float)
@@ -16,18 +87,19 @@ def _gini(counts: np.ndarray) -> float:
     p = counts / counts.sum() if counts.sum() > 0 else counts
     return float(1.0 - np.sum(p**2))
 
-def _rarity_index(counts: np.ndarray) -> Dict[Any, float]:
+def _rarity_array(counts: np.ndarray) -> np.ndarray:
     # rarity = 1 - normalized frequency
     total = counts.sum()
     if total == 0:
-        return {}
+        return np.zeros(len(counts))
     p = counts / total
     # normalize to [0,1] by (p_max - p_c) / (p_max - p_min) if denom>0 else zeros
     pmax, pmin = float(p.max()), float(p.min())
     denom = pmax - pmin if pmax > pmin else 1.0
-    return {i: float((pmax - pc) / denom) for i, pc in enumerate(p)}
+    return (pmax - p) / denom
 
-def measure_imbalance(ds: Dataset, y: str, beta: float = 0.999) -> RunReport:
+def measure_imbalance(ds: Dataset, y: str, beta: float = 0.999, rarity: str = "auto", rarity_top_k: int = 10,
+                      artifacts_dir: Optional[str] = None) -> RunReport:
     """Compute imbalance metrics for a label column.
     Metrics:
       - dq.imbalance.counts
@@ -35,9 +107,23 @@ def measure_imbalance(ds: Dataset, y: str, beta: float = 0.999) -> RunReport:
       - dq.imbalance.effective_n (Cui beta)
       - dq.imbalance.gini (1 - sum p^2)  # higher means more even
       - dq.imbalance.rarity.<class_value> in [0,1], higher = rarer
+    rarity="metrics" emits the per-class rarity metrics, "summary" one dq.imbalance.rarity
+    metric instead (rarity quantiles and the `rarity_top_k` rarest classes), "artifact"
+    the summary plus a class/count/rarity CSV; "auto" is "metrics" up to 1,000 classes and
+    "summary" beyond. Counts come from a LabelCounts, so
+    measure_imbalance_counts(LabelCounts().update(chunk)..., y) gives the same numbers
+    for streamed or sharded labels.
     """
-    ser = ds.df[y]
-    counts = ser.value_counts(dropna=False)
+    counts = LabelCounts().update(ds.df[y])
+    return measure_imbalance_counts(counts, y, beta=beta, rarity=rarity, rarity_top_k=rarity_top_k,
+                                    artifacts_dir=artifacts_dir, name=ds.name)
+
+def measure_imbalance_counts(label_counts: LabelCounts, y: str, beta: float = 0.999, rarity: str = "auto",
+                             rarity_top_k: int = 10, artifacts_dir: Optional[str] = None, name: str = "dataset") -> RunReport:
+    """measure_imbalance from accumulated LabelCounts (see there for the metrics)."""
+    if rarity not in ("auto", "metrics", "summary", "artifact"):
+        raise ValueError("rarity must be 'auto', 'metrics', 'summary' or 'artifact'")
+    counts = label_counts.series()
     classes = counts.index.tolist()
     cnt_values = counts.values.astype(float)
     majority = float(cnt_values.max()) if len(cnt_values) else float('nan')
@@ -50,11 +136,29 @@ def measure_imbalance(ds: Dataset, y: str, beta: float = 0.999) -> RunReport:
     metrics.append(MetricResult("dq.imbalance.effective_n", "dataset", y, _effective_num(cnt_values, beta=beta), meta={"beta": beta}))
     metrics.append(MetricResult("dq.imbalance.gini", "dataset", y, _gini(cnt_values)))
 
-    rarity = _rarity_index(cnt_values)
-    for idx, cls in enumerate(classes):
-        metrics.append(MetricResult(f"dq.imbalance.rarity.{cls}", "dataset", cls, rarity.get(idx, 0.0)))
+    if rarity == "auto":
+        rarity = "metrics" if len(classes) <= _RARITY_METRICS_MAX else "summary"
+    r = _rarity_array(cnt_values)
+    artifacts: Dict[str, str] = {}
+    if rarity == "metrics":
+        for idx, cls in enumerate(classes):
+            metrics.append(MetricResult(f"dq.imbalance.rarity.{cls}", "dataset", cls, float(r[idx])))
+    else:
+        qs = (0.5, 0.9, 0.99, 1.0)
+        quantiles = {str(q): float(v) for q, v in zip(qs, np.quantile(r, qs))} if len(r) else {}
+        # rarest first: the last classes of the count order
+        rare = np.arange(len(classes))[::-1][:rarity_top_k]
+        rarest = [{"class": str(classes[i]), "count": int(cnt_values[i]), "rarity": float(r[i])} for i in rare]
+        metrics.append(MetricResult("dq.imbalance.rarity", "dataset", y, {"quantiles": quantiles, "rarest": rarest},
+                                    meta={"n_classes": len(classes)}))
+        if rarity == "artifact" and artifacts_dir is not None:
+            import os
+            os.makedirs(artifacts_dir, exist_ok=True)
+            path = os.path.join(artifacts_dir, f"{name}__rarity.csv")
+            pd.DataFrame({"class": classes, "count": cnt_values.astype(np.int64), "rarity": r}).to_csv(path, index=False)
+            artifacts["artifact.imbalance.rarity"] = path
 
-    return RunReport(metrics=metrics, meta={"dataset": ds.name, "label": y})
+    return RunReport(metrics=metrics, artifacts=artifacts, meta={"dataset": name, "label": y})
 
 def simulate_rebalance(counts: Dict[Any, int], target: Union[str, Dict[Any, int]] = "uniform") -> Dict[str, Any]:
     """Given existing class counts, simulate target counts and return sampling plan deltas.
@@ -2,18 +2,79 @@
 from __future__ import annotations
 from typing import Dict, List, Optional, Sequence, Tuple
 import os
-import itertools
 import numpy as np
 import pandas as pd
 from ..types import Dataset, MetricResult, RunReport
 
-def analyze_missingness(ds: Dataset, columns: Optional[Sequence[str]] = None, artifacts_dir: Optional[str] = None, top_k_patterns: int = 10) -> RunReport:
+try:
+    from scipy import sparse
+except Exception:  # pragma: no cover
+    sparse = None
+
+# rows per block of the dense indicator product (float32 counts stay exact below 2**24)
+_COOCCUR_BLOCK = 1 << 16
+# rows per slice when missingness patterns are folded into a heavy-hitters summary
+_PATTERN_SLICE = 1 << 20
+# below this share of missing cells the indicator matrix is multiplied in sparse form
+_SPARSE_DENSITY = 0.05
+
+def _cooccurrence_counts(miss: np.ndarray) -> np.ndarray:
+    """Counts of rows where both columns are missing, as the Gram matrix M.T @ M of the
+    boolean null-indicator matrix (the diagonal holds per-column missing counts)."""
+    n, p = miss.shape
+    miss = np.ascontiguousarray(miss)
+    col_counts = miss.sum(axis=0)
+    if sparse is not None and n and col_counts.sum() < _SPARSE_DENSITY * n * p:
+        idx = np.flatnonzero(miss.ravel())
+        S = sparse.csr_matrix((np.ones(len(idx), dtype=np.int64), (idx // p, idx % p)), shape=(n, p))
+        return (S.T @ S).toarray()
+    counts = np.zeros((p, p), dtype=np.int64)
+    active = np.flatnonzero(col_counts)
+    if len(active) == 0:
+        return counts
+    sub = np.zeros((len(active), len(active)), dtype=np.int64)
+    for start in range(0, n, _COOCCUR_BLOCK):
+        block = miss[start:start + _COOCCUR_BLOCK]
+        B = (block if len(active) == p else block[:, active]).astype(np.float32)
+        sub += np.rint(B.T @ B).astype(np.int64)
+    counts[np.ix_(active, active)] = sub
+    return counts
+
+def _pattern_keys(miss: np.ndarray) -> np.ndarray:
+    """Each row of the null-indicator matrix packed into one fixed-width byte key
+    (8 columns per byte, first column in the high bit), so any number of columns works."""
+    packed = np.ascontiguousarray(np.packbits(miss, axis=1))
+    return packed.view(np.dtype((np.void, packed.shape[1]))).ravel()
+
+def _top_patterns(miss: np.ndarray, top_k: int, capacity: Optional[int] = None):
+    """Most frequent missingness patterns as (packed key bytes, count), plus the count
+    error bound (0 = exact). With `capacity`, rows are folded slice by slice into a
+    FrequentItems summary of that many patterns instead of one exact sort of all rows."""
+    if capacity is None:
+        keys = _pattern_keys(miss)
+        uniq, first, counts = np.unique(keys, return_index=True, return_counts=True)
+        # most frequent first; ties by first occurrence
+        order = np.lexsort((first, -counts))[:top_k]
+        return [(uniq[i].tobytes(), int(counts[i])) for i in order], 0
+    from ..sketches import FrequentItems
+    fi = FrequentItems(capacity)
+    for start in range(0, len(miss), _PATTERN_SLICE):
+        uniq, counts = np.unique(_pattern_keys(miss[start:start + _PATTERN_SLICE]), return_counts=True)
+        fi.update_counts(pd.Series(counts, index=[u.tobytes() for u in uniq]))
+    return [(k, int(c)) for k, c in fi.top(top_k).items()], fi.max_error
+
+def analyze_missingness(ds: Dataset, columns: Optional[Sequence[str]] = None, artifacts_dir: Optional[str] = None, top_k_patterns: int = 10, pattern_capacity: Optional[int] = None, cooccur_top_k: Optional[int] = None, cooccur_threshold: Optional[float] = None) -> RunReport:
     """
     Compute missingness metrics for a dataset:
       - dataset row-level missingness rate
       - per-column missingness rate
-      - pairwise co-occurrence (P(both missing))
-      - top-k missingness patterns (bitmask over selected columns)
+      - pairwise co-occurrence (P(both missing)), from one product of the null-indicator
+        matrix with itself; `cooccur_threshold` keeps pairs with P >= threshold and
+        `cooccur_top_k` the k largest (both keep column-pair order), default all pairs
+      - top-k missingness patterns over all columns: a bit string (1 = missing) and the
+        names of the missing columns; rows are bit-packed and counted with one sort, or
+        with `pattern_capacity` through a bounded heavy-hitters summary (counts may then
+        undercount by `meta["max_error"]`)
     Saves artifacts (CSV) for heatmap/co-occurrence and patterns if artifacts_dir is provided.
     """
     df = ds.df if columns is None else ds.df[list(columns)]
@@ -25,39 +86,47 @@ def analyze_missingness(ds: Dataset, columns: Optional[Sequence[str]] = None, ar
     metrics.append(MetricResult("dq.missing.row_rate", "dataset", "*", row_rate))
 
     # per-column
-    for col in df.columns:
-        col_rate = float(miss[col].mean())
-        metrics.append(MetricResult(f"dq.missing.rate.{col}", "column", col, col_rate))
+    for col, col_rate in zip(df.columns, miss.mean().tolist()):
+        metrics.append(MetricResult(f"dq.missing.rate.{col}", "column", col, float(col_rate)))
 
     # pairwise co-occurrence matrix
     cols = list(df.columns)
+    n = len(df)
     if len(cols) >= 2:
-        pair_rows = []
-        for i, j in itertools.combinations(range(len(cols)), 2):
-            ci, cj = cols[i], cols[j]
-            p_both = float((miss[ci] & miss[cj]).mean())
-            pair_rows.append((ci, cj, p_both))
-            metrics.append(MetricResult(f"dq.missing.cooccur.{ci}.{cj}", "dataset", [ci, cj], p_both))
+        counts = _cooccurrence_counts(miss.to_numpy(dtype=bool))
+        iu, ju = np.triu_indices(len(cols), 1)
+        p_both = counts[iu, ju] / n if n else np.full(len(iu), np.nan)
+        keep = np.arange(len(iu))
+        if cooccur_threshold is not None:
+            keep = keep[p_both[keep] >= cooccur_threshold]
+        if cooccur_top_k is not None and len(keep) > cooccur_top_k:
+            top = np.argsort(-p_both[keep], kind="stable")[:cooccur_top_k]
+            keep = np.sort(keep[top])
+        pair_rows = [(cols[iu[k]], cols[ju[k]], float(p_both[k])) for k in keep]
+        for ci, cj, p in pair_rows:
+            metrics.append(MetricResult(f"dq.missing.cooccur.{ci}.{cj}", "dataset", [ci, cj], p))
         if artifacts_dir is not None:
             os.makedirs(artifacts_dir, exist_ok=True)
-            import pandas as pd
             co_df = pd.DataFrame(pair_rows, columns=["col_i","col_j","p_both_missing"])
             co_path = os.path.join(artifacts_dir, "missing_cooccurrence.csv")
             co_df.to_csv(co_path, index=False)
             artifacts["artifact.missing.cooccurrence"] = co_path
 
-    # top-k patterns over a small set of columns (cap at 20 columns to avoid blowup)
-    cap_cols = cols[:20]
-    if len(cap_cols) > 0:
-        bitcols = miss[cap_cols].astype(int)
-        # build bitmask string key per row, e.g., "0101"
-        keys = bitcols.apply(lambda r: "".join(map(str, r.values.tolist())), axis=1)
-        vc = keys.value_counts().head(top_k_patterns)
-        patterns = [{"pattern": k, "count": int(v)} for k, v in vc.items()]
-        metrics.append(MetricResult("dq.missing.top_patterns", "dataset", cap_cols, patterns))
+    # top-k patterns as packed bit keys
+    if len(cols) > 0:
+        top, max_error = _top_patterns(miss.to_numpy(dtype=bool), top_k_patterns, pattern_capacity)
+        patterns = []
+        for key, count in top:
+            bits = np.unpackbits(np.frombuffer(key, dtype=np.uint8))[:len(cols)].astype(bool)
+            patterns.append({"pattern": "".join("1" if b else "0" for b in bits), "count": count, "missing": [c for c, b in zip(cols, bits) if b]})
+        meta = {} if pattern_capacity is None else {"exact": max_error == 0, "max_error": int(max_error)}
+        metrics.append(MetricResult("dq.missing.top_patterns", "dataset", cols, patterns, meta=meta))
         if artifacts_dir is not None:
+            os.makedirs(artifacts_dir, exist_ok=True)
+            pat_df = pd.DataFrame({"pattern": [p["pattern"] for p in patterns], "count": [p["count"] for p in patterns],
+                                   "missing": [";".join(map(str, p["missing"])) for p in patterns]})
             pat_path = os.path.join(artifacts_dir, "missing_top_patterns.csv")
-            vc.to_frame("count").to_csv(pat_path)
+            pat_df.to_csv(pat_path, index=False)
             artifacts["artifact.missing.top_patterns"] = pat_path
 
     return RunReport(metrics=metrics, artifacts=artifacts, meta={"dataset": ds.name})
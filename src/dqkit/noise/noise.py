@@ -1,19 +1,138 @@
 
 from __future__ import annotations
-from typing import Dict, List, Optional, Sequence, Tuple, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Any, Union
 import os
 import numpy as np
 import pandas as pd
+from ..capture import Capture, CaptureConfig
 from ..types import Dataset, MetricResult, RunReport
 
+# query rows per block and reference rows per distance tile of the brute-force search;
+# the tree search is used up to this many features
+_QUERY_BLOCK = 1024
+_REF_TILE = 4096
+_TREE_MAX_DIM = 15
+# rows of an in-memory or memory-mapped proba matrix scored at a time
+_PROBA_CHUNK = 1 << 16
+
+class _NoiseTotals:
+    """Folds per-row suspicion scores chunk by chunk into the overall and per-class rates,
+    the suspect count, and the suspect rows: every suspect through `sink`, or only the
+    `top_k` highest-scoring ones (a bounded selection merged per chunk)."""
+
+    def __init__(self, n_classes: int, threshold: float, top_k: Optional[int]):
+        self.threshold = threshold
+        self.top_k = top_k
+        self.total = 0.0
+        self.count = 0
+        self.class_sum = np.zeros(n_classes)
+        self.class_count = np.zeros(n_classes, dtype=np.int64)
+        self.class_rows = np.zeros(n_classes, dtype=np.int64)
+        self.suspects = 0
+        self.top_score = np.empty(0)
+        self.top_pos = np.empty(0, dtype=np.int64)
+
+    def add(self, start: int, codes: np.ndarray, susp: np.ndarray, frame: pd.DataFrame, sink: Capture, stem: str) -> None:
+        ok = ~np.isnan(susp)
+        self.total += float(susp[ok].sum())
+        self.count += int(ok.sum())
+        known = codes >= 0
+        m = len(self.class_sum)
+        self.class_rows += np.bincount(codes[known], minlength=m)
+        self.class_sum += np.bincount(codes[known & ok], weights=susp[known & ok], minlength=m)
+        self.class_count += np.bincount(codes[known & ok], minlength=m)
+        hit = np.flatnonzero(susp > self.threshold)
+        self.suspects += len(hit)
+        if not len(hit):
+            return
+        if self.top_k is None:
+            sink.add("artifact.noise.suspects", stem, frame.iloc[hit].assign(suspect_score=susp[hit]))
+            return
+        score = np.concatenate([self.top_score, susp[hit]])
+        pos = np.concatenate([self.top_pos, hit + start])
+        if len(score) > self.top_k:
+            keep = np.argpartition(-score, self.top_k - 1)[:self.top_k] if self.top_k else np.empty(0, dtype=np.intp)
+            score, pos = score[keep], pos[keep]
+        self.top_score, self.top_pos = score, pos
+
+    def finish(self, df: pd.DataFrame, sink: Capture, stem: str) -> None:
+        if self.top_k is not None and len(self.top_pos):
+            order = np.lexsort((self.top_pos, -self.top_score))
+            sink.add("artifact.noise.suspects", stem, df.iloc[self.top_pos[order]].assign(suspect_score=self.top_score[order]))
+
+def _confident_joint(codes: np.ndarray, chunks: Iterable[np.ndarray], thresholds: np.ndarray) -> np.ndarray:
+    """Confident joint C (observed x predicted counts): a row with observed class i counts
+    toward the class j with the highest probability among those where it reaches the
+    class threshold t_j; rows below every threshold are left out. One bincount over
+    combined (observed, predicted) codes per chunk."""
+    k = len(thresholds)
+    C = np.zeros(k * k, dtype=np.int64)
+    start = 0
+    for P in chunks:
+        obs = codes[start:start + len(P)]
+        start += len(P)
+        above = P >= thresholds[None, :]
+        pred = np.where(above, P, -np.inf).argmax(axis=1)
+        use = (obs >= 0) & above.any(axis=1)
+        C += np.bincount(obs[use] * k + pred[use], minlength=k * k)
+    return C.reshape(k, k)
+
+def _confident_joint_metrics(C: np.ndarray, class_rows: np.ndarray, classes: Sequence[Any], thresholds: np.ndarray, y: str) -> Tuple[List[MetricResult], pd.DataFrame]:
+    """dq.noise.cj.* metrics and the nonzero cells of the joint. Each row of C is rescaled
+    to its observed class count before normalizing, as in confident learning."""
+    rows = C.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cal = np.where(rows > 0, C / rows, 0.0) * class_rows[:, None]
+    Q = cal / cal.sum() if cal.sum() else cal
+    out = [MetricResult(f"dq.noise.cj.threshold.{c}", "dataset", c, float(t)) for c, t in zip(classes, thresholds) if np.isfinite(t)]
+    out.append(MetricResult("dq.noise.cj.label_issues", "dataset", y, int(C.sum() - np.trace(C))))
+    out.append(MetricResult("dq.noise.cj.noise_rate", "dataset", y, float(1.0 - np.trace(Q)) if Q.sum() else float("nan")))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        flip = 1.0 - np.diag(Q) / Q.sum(axis=1)
+    for c, f in zip(classes, flip):
+        if np.isfinite(f):
+            out.append(MetricResult(f"dq.noise.cj.flip_rate.{c}", "dataset", c, float(f)))
+    i, j = np.nonzero(C)
+    names = np.asarray(classes, dtype=object)
+    frame = pd.DataFrame({"observed": names[i], "predicted": names[j], "count": C[i, j], "joint": Q[i, j]})
+    return out, frame
+
+def _proba_chunks(proba: Any, n: int, n_classes: int) -> Iterator[np.ndarray]:
+    """Chunks of probability rows from an array or memmap, a .npy path (memory-mapped),
+    or an iterable of (rows, n_classes) arrays covering the rows in order."""
+    if isinstance(proba, (str, os.PathLike)):
+        proba = np.load(proba, mmap_mode="r")
+    if hasattr(proba, "shape"):
+        if proba.shape[0] != n or proba.shape[1] != n_classes:
+            raise ValueError("proba shape must be (n_samples, n_classes) with classes provided or inferred.")
+        for s in range(0, n, _PROBA_CHUNK):
+            yield np.asarray(proba[s:s + _PROBA_CHUNK], dtype=float)
+        return
+    seen = 0
+    for chunk in proba:
+        chunk = np.asarray(chunk, dtype=float)
+        if chunk.ndim != 2 or chunk.shape[1] != n_classes or seen + len(chunk) > n:
+            raise ValueError("proba chunks must be (rows, n_classes) arrays covering the n_samples rows in order.")
+        seen += len(chunk)
+        yield chunk
+    if seen != n:
+        raise ValueError(f"proba chunks cover {seen} rows, expected {n}.")
+
 def estimate_label_noise(
     ds: Dataset,
     y: str,
-    proba: Optional[np.ndarray] = None,
+    proba: Optional[Union[np.ndarray, str, Iterable[np.ndarray]]] = None,
     classes: Optional[Sequence[Any]] = None,
     features: Optional[Sequence[str]] = None,
     threshold: Optional[float] = None,
     artifacts_dir: Optional[str] = None,
+    capture: Optional[CaptureConfig] = None,
+    k: int = 1,
+    weights: str = "uniform",
+    algorithm: str = "auto",
+    n_jobs: int = 1,
+    top_k_suspects: Optional[int] = None,
+    confident_joint: bool = False,
 ) -> RunReport:
     """
     Estimate label noise for a classification label column.
@@ -21,82 +140,223 @@ def estimate_label_noise(
     Two modes:
       1) Probabilistic (preferred): provide `proba` as an (n_samples, n_classes) numpy array aligned to ds.df.
          - Uses confidence in the observed label: suspicion_i = 1 - proba[i, y_i_index].
-      2) Heuristic (no proba): 1-NN agreement over numeric `features`.
-         - suspicion_i = 1 if nearest neighbor has a different label, else 0.
+         - `proba` may also be a np.memmap, a path to a .npy file (memory-mapped), or an
+           iterable of (rows, n_classes) chunks in row order; rows are scored chunk by chunk,
+           so only one chunk of probabilities is in memory.
+         - confident_joint=True adds confident-learning estimates: per-class thresholds
+           t_j = mean proba[:, j] over rows labelled j, the confident joint of observed vs
+           confidently predicted class, and noise rates from it calibrated to the observed
+           class counts. This needs a second pass over `proba`, so chunks must come from an
+           array, a path or a re-iterable (not a one-shot iterator).
+      2) Heuristic (no proba): k-NN agreement over numeric `features`.
+         - suspicion_i = share of the k nearest neighbors (Euclidean) with a different label,
+           weighted by 1/distance with weights="distance"; k=1 gives 1 if the nearest
+           neighbor disagrees, else 0. With k > 1 the default threshold is 0.5 (a majority
+           of the neighbors disagrees).
+         - neighbors come from a KD-tree for up to 15 features (algorithm="auto" on more
+           than 1,024 rows, or "kd_tree"), otherwise from a brute-force search over
+           distance tiles with a running top-k ("brute"); memory is O(n * k) either way.
+           n_jobs > 1 (or -1 for all cores) spreads query blocks over threads.
+         - with fewer than 2 rows there are no neighbors: the rate is 0.0 and the report
+           meta carries a "reason".
 
     Returns MetricResults:
       - dq.noise.rate.overall
       - dq.noise.rate.class.<class_value>
       - dq.noise.suspect_count (number of rows with suspicion > threshold)
-    Also writes artifact CSV of suspected rows if artifacts_dir is provided.
+      - with confident_joint: dq.noise.cj.threshold.<class_value>, dq.noise.cj.label_issues
+        (off-diagonal count), dq.noise.cj.noise_rate (off-diagonal mass of the calibrated
+        joint) and dq.noise.cj.flip_rate.<class_value> (share of class rows whose true
+        class differs), plus a long-format artifact of the nonzero joint cells
+    Also writes artifact CSV of suspected rows if artifacts_dir is provided; `capture`
+    caps/samples them (see CaptureConfig), and `top_k_suspects` keeps only the highest-
+    scoring ones (sorted by score).
     """
     df = ds.df
     y_series = df[y]
     if classes is None:
         classes = sorted(y_series.dropna().unique().tolist())
-    class_to_idx = {c: i for i, c in enumerate(classes)}
+    # observed label -> class index; labels outside `classes` get -1 (suspicion 1.0)
+    codes = pd.Index(classes).get_indexer(y_series)
 
     n = len(df)
-    susp: np.ndarray
+    stem = f"{ds.name}__suspected_label_errors"
+    sink = Capture(artifacts_dir, capture)
 
-    if proba is not None:
-        proba = np.asarray(proba)
-        if proba.shape[0] != n or proba.shape[1] != len(classes):
-            raise ValueError("proba shape must be (n_samples, n_classes) with classes provided or inferred.")
-        # map observed label to index; if label not in classes, suspicious=1.0
-        idxs = y_series.map(lambda v: class_to_idx.get(v, None))
-        susp = np.ones(n, dtype=float)
-        mask_known = idxs.notna().to_numpy()
-        susp[mask_known] = 1.0 - proba[np.arange(n)[mask_known], idxs[mask_known].astype(int)]
-        default_threshold = 0.8
-    else:
-        # 1-NN heuristic over numeric features
-        if features is None:
-            features = [c for c in df.columns if c != y and pd.api.types.is_numeric_dtype(df[c])]
-        X = df[features].to_numpy(dtype=float)
-        # handle missing by imputing column means
-        col_means = np.nanmean(X, axis=0)
-        inds = np.where(np.isnan(X))
-        X[inds] = np.take(col_means, inds[1])
-        # compute pairwise distances
-        # for large n this is O(n^2) and intended for small datasets/tests
-        dists = _pairwise_squared_euclidean(X)
-        np.fill_diagonal(dists, np.inf)
-        nn_idx = dists.argmin(axis=1)
-        nn_label = y_series.to_numpy()[nn_idx]
-        susp = (nn_label != y_series.to_numpy()).astype(float)
-        default_threshold = 1.0
+    cj_metrics: List[MetricResult] = []
+    cj_frame: Optional[pd.DataFrame] = None
+    reason: Optional[str] = None
+    try:
+        if confident_joint and proba is None:
+            raise ValueError("confident_joint requires proba")
+        if proba is not None:
+            if confident_joint and not isinstance(proba, (str, os.PathLike)) and not hasattr(proba, "shape") and iter(proba) is proba:
+                raise ValueError("confident_joint needs two passes over proba: pass an array, a .npy path or a re-iterable of chunks")
+            thr = 0.8 if threshold is None else float(threshold)
+            totals = _NoiseTotals(len(classes), thr, top_k_suspects)
+            self_sum = np.zeros(len(classes))
+            start = 0
+            for chunk in _proba_chunks(proba, n, len(classes)):
+                stop = start + len(chunk)
+                c = codes[start:stop]
+                susp = np.ones(len(chunk), dtype=float)
+                known = np.flatnonzero(c >= 0)
+                own = chunk[known, c[known]]
+                susp[known] = 1.0 - own
+                self_sum += np.bincount(c[known], weights=own, minlength=len(classes))
+                totals.add(start, c, susp, df.iloc[start:stop], sink, stem)
+                start = stop
+            if confident_joint:
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    t = np.where(totals.class_rows > 0, self_sum / totals.class_rows, np.inf)
+                C = _confident_joint(codes, _proba_chunks(proba, n, len(classes)), t)
+                cj_metrics, cj_frame = _confident_joint_metrics(C, totals.class_rows, classes, t, y)
+        else:
+            # k-NN heuristic over numeric features
+            if weights not in ("uniform", "distance"):
+                raise ValueError("weights must be 'uniform' or 'distance'")
+            if k < 1 or (n > 1 and k >= n):
+                raise ValueError("k must be between 1 and n_samples - 1")
+            if n < 2:
+                # no other row to compare with: nothing is suspected
+                reason = "fewer than 2 rows, no neighbors"
+                susp = np.zeros(n)
+            else:
+                if features is None:
+                    features = [c for c in df.columns if c != y and pd.api.types.is_numeric_dtype(df[c])]
+                X = df[features].to_numpy(dtype=float)
+                # handle missing by imputing column means
+                col_means = np.nanmean(X, axis=0)
+                inds = np.where(np.isnan(X))
+                X[inds] = np.take(col_means, inds[1])
+                dist, nn_idx = _knn(X, k, algorithm=algorithm, n_jobs=n_jobs)
+                y_arr = y_series.to_numpy()
+                disagree = (y_arr[nn_idx] != y_arr[:, None]).astype(float)
+                if weights == "distance":
+                    w = 1.0 / (dist + 1e-12)
+                    susp = (disagree * w).sum(axis=1) / w.sum(axis=1)
+                else:
+                    susp = disagree.mean(axis=1)
+            thr = (1.0 if k == 1 else 0.5) if threshold is None else float(threshold)
+            totals = _NoiseTotals(len(classes), thr, top_k_suspects)
+            totals.add(0, codes, susp, df, sink, stem)
+        totals.finish(df, sink, stem)
+    except BaseException:
+        # a bad or short proba stream can fail after suspects were written
+        sink.abort()
+        raise
 
     # aggregate metrics
-    overall = float(np.nanmean(susp)) if len(susp) else float("nan")
+    overall = totals.total / totals.count if totals.count else float("nan")
     metrics: List[MetricResult] = [
         MetricResult("dq.noise.rate.overall", "dataset", y, overall)
     ]
-    for c in classes:
-        cls_mask = (y_series == c).to_numpy()
-        if cls_mask.any():
-            metrics.append(MetricResult(f"dq.noise.rate.class.{c}", "dataset", c, float(np.nanmean(susp[cls_mask]))))
-
-    # suspected rows
-    thr = default_threshold if threshold is None else float(threshold)
-    suspects_mask = susp > thr
-    suspect_count = int(suspects_mask.sum())
-    metrics.append(MetricResult("dq.noise.suspect_count", "dataset", y, suspect_count))
-    artifacts: Dict[str, str] = {}
-    if artifacts_dir is not None and suspect_count > 0:
+    for i, c in enumerate(classes):
+        if totals.class_rows[i]:
+            rate = totals.class_sum[i] / totals.class_count[i] if totals.class_count[i] else float("nan")
+            metrics.append(MetricResult(f"dq.noise.rate.class.{c}", "dataset", c, float(rate)))
+
+    artifacts = sink.close()
+    if cj_frame is not None and artifacts_dir is not None:
         os.makedirs(artifacts_dir, exist_ok=True)
-        out = df.loc[suspects_mask].copy()
-        out["suspect_score"] = susp[suspects_mask]
-        path = os.path.join(artifacts_dir, f"{ds.name}__suspected_label_errors.csv")
-        out.to_csv(path, index=False)
-        artifacts["artifact.noise.suspects"] = path
-
-    return RunReport(metrics=metrics, artifacts=artifacts, meta={"dataset": ds.name, "mode": "proba" if proba is not None else "1nn"})
-
-def _pairwise_squared_euclidean(X: np.ndarray) -> np.ndarray:
-    # (x - y)^2 = x^2 + y^2 - 2xy
-    sq = np.sum(X*X, axis=1, keepdims=True)
-    d2 = sq + sq.T - 2 * (X @ X.T)
-    # numerical noise can make tiny negatives; clip
-    np.maximum(d2, 0.0, out=d2)
-    return d2
+        path = os.path.join(artifacts_dir, f"{ds.name}__confident_joint.csv")
+        cj_frame.to_csv(path, index=False)
+        artifacts["artifact.noise.confident_joint"] = path
+    meta = sink.counts("artifact.noise.suspects") if capture is not None else {}
+    metrics.append(MetricResult("dq.noise.suspect_count", "dataset", y, totals.suspects, meta=meta))
+    metrics.extend(cj_metrics)
+
+    run_meta = {"dataset": ds.name, "mode": "proba" if proba is not None else f"{k}nn"}
+    if reason is not None:
+        run_meta["reason"] = reason
+    return RunReport(metrics=metrics, artifacts=artifacts, meta=run_meta)
+
+def _knn(X: np.ndarray, k: int, algorithm: str = "auto", n_jobs: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """Euclidean distances and indices (n, k) of each row's k nearest other rows, nearest
+    first; among equally distant rows the lowest indices win, whichever the algorithm."""
+    n, d = X.shape
+    if algorithm == "auto":
+        algorithm = "kd_tree" if d <= _TREE_MAX_DIM and n > _QUERY_BLOCK else "brute"
+    if algorithm == "kd_tree":
+        from sklearn.neighbors import KDTree
+        # the tree holds distinct rows only, so exact duplicates never flood a tie
+        members = np.lexsort(X.T[::-1])  # equal rows adjacent, in index order
+        S = X[members]
+        head = np.r_[True, (S[1:] != S[:-1]).any(axis=1)] if n else np.empty(0, dtype=bool)
+        U, gstart = S[head], np.flatnonzero(head)
+        cnt = np.diff(np.r_[gstart, n])
+        tree = KDTree(U)
+        m = min(k + 1, len(U))
+
+        def block(s: int) -> Tuple[np.ndarray, np.ndarray]:
+            Q = X[s:s + _QUERY_BLOCK]
+            # the m nearest distinct rows (own first) hold at least k other rows; one more
+            # tells whether distinct rows tie at that radius, and only then are all of them
+            # within it (ties included) fetched
+            dist, grp = tree.query(Q, k=min(m + 1, len(U)))
+            r = dist[:, m - 1]
+            tied = dist[:, m] <= r * (1.0 + 1e-12) if dist.shape[1] > m else np.zeros(len(Q), dtype=bool)
+            plain = np.flatnonzero(~tied)
+            row, grp, dist = np.repeat(plain, m), grp[plain, :m].ravel(), dist[plain, :m].ravel()
+            if tied.any():
+                t = np.flatnonzero(tied)
+                groups, dists = tree.query_radius(Q[t], r[t] * (1.0 + 1e-12) + 1e-300, return_distance=True)
+                lens = np.array([len(g) for g in groups])
+                row = np.concatenate([row, np.repeat(t, lens)])
+                grp = np.concatenate([grp] + list(groups))
+                dist = np.concatenate([dist] + list(dists))
+            # only the k + 1 lowest-indexed members of a distinct row can be chosen
+            take = np.minimum(cnt[grp], k + 1)
+            pick = np.repeat(np.arange(len(grp)), take)
+            offs = np.arange(take.sum()) - np.repeat(np.cumsum(take) - take, take)
+            row, dist, idx = row[pick], dist[pick], members[gstart[grp][pick] + offs]
+            other = idx != row + s
+            row, dist, idx = row[other], dist[other], idx[other]
+            order = np.lexsort((idx, dist, row))
+            row, dist, idx = row[order], dist[order], idx[order]
+            first = np.searchsorted(row, row, side="left")
+            keep = np.arange(len(row)) - first < k
+            return dist[keep].reshape(-1, k), idx[keep].reshape(-1, k)
+    elif algorithm == "brute":
+        sq = np.einsum("ij,ij->i", X, X)
+
+        def block(s: int) -> Tuple[np.ndarray, np.ndarray]:
+            Q = X[s:s + _QUERY_BLOCK]
+            rows = np.arange(len(Q))
+            best_d = np.full((len(Q), k), np.inf)
+            best_i = np.zeros((len(Q), k), dtype=np.int64)
+            for t in range(0, n, _REF_TILE):
+                # (x - y)^2 = x^2 + y^2 - 2xy; numerical noise can make tiny negatives
+                D = sq[s:s + len(Q), None] + sq[None, t:t + _REF_TILE] - 2 * (Q @ X[t:t + _REF_TILE].T)
+                np.maximum(D, 0.0, out=D)
+                own = rows + s - t
+                hit = (own >= 0) & (own < D.shape[1])
+                D[rows[hit], own[hit]] = np.inf
+                cand_d = np.concatenate([best_d, D], axis=1)
+                cand_i = np.concatenate([best_i, np.broadcast_to(np.arange(t, t + D.shape[1]), D.shape)], axis=1)
+                # candidates are in index order (kept ones come from earlier tiles), so
+                # taking the first of equal distances keeps ties on the lowest index
+                if k == 1:
+                    sel = cand_d.argmin(axis=1)[:, None]
+                    best_d = np.take_along_axis(cand_d, sel, 1)
+                    best_i = np.take_along_axis(cand_i, sel, 1)
+                else:
+                    kth = np.partition(cand_d, k - 1, axis=1)[:, k - 1:k]
+                    less = cand_d < kth
+                    tie = cand_d == kth
+                    sel = less | (tie & (np.cumsum(tie, axis=1) <= k - less.sum(axis=1, keepdims=True)))
+                    best_d = cand_d[sel].reshape(-1, k)
+                    best_i = cand_i[sel].reshape(-1, k)
+            order = np.lexsort((best_i, best_d), axis=1)
+            return np.sqrt(np.take_along_axis(best_d, order, 1)), np.take_along_axis(best_i, order, 1)
+    else:
+        raise ValueError("algorithm must be 'auto', 'kd_tree' or 'brute'")
+
+    starts = list(range(0, n, _QUERY_BLOCK))
+    if n_jobs != 1 and len(starts) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=None if n_jobs < 0 else n_jobs) as pool:
+            parts = list(pool.map(block, starts))
+    else:
+        parts = [block(s) for s in starts]
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
@@ -1,2 +1,4 @@
 from .profiling import profile
-__all__=['profile']
+from .state import ProfileState
+from .incremental import profile_incremental
+__all__=['profile','ProfileState','profile_incremental']
@@ -0,0 +1,78 @@
+
+from __future__ import annotations
+from typing import Any, Dict, Optional, Sequence
+import json
+import os
+import re
+import pandas as pd
+from ..types import Dataset, RunReport
+from .state import ProfileState
+
+def _state_path(store: str, name: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9_]+", "_", str(name)).strip("_")
+    return os.path.join(store, f"{slug}.profile_state.json")
+
+def _row_hash(df: pd.DataFrame, pos: int) -> str:
+    # hash of the last profiled row, used to detect rewrites of the profiled prefix
+    return str(int(pd.util.hash_pandas_object(df.iloc[pos:pos + 1], index=False).iloc[0]))
+
+def profile_incremental(ds: Dataset, store: str, columns: Optional[Sequence[str]] = None, artifacts_dir: Optional[str] = None, **state_kwargs: Any) -> RunReport:
+    """Profile an append-only table, processing only rows added since the previous run.
+
+    The ProfileState of `ds.name` is persisted in `store` together with a row watermark.
+    Each run folds rows [watermark:] into it, saves it back and emits the usual
+    `dq.profile.*` metrics. Moments, counts and min/max stay exact; quantiles and distinct
+    counts come from sketches once they overflow, flagged with `approx=True` in metric meta
+    (the ids are also listed in report meta["approx_metrics"]).
+    The state is rebuilt from row 0 if the table shrank, its columns changed, or the last
+    profiled row no longer matches (i.e. the table was not appended to but rewritten).
+    """
+    df = ds.df if columns is None else ds.df[list(columns)]
+    path = _state_path(store, ds.name)
+    state: Optional[ProfileState] = None
+    watermark = 0
+    reset_reason = None
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            saved = json.load(f)
+        watermark = int(saved["watermark"])
+        if saved["columns"] != [str(c) for c in df.columns]:
+            reset_reason = "columns_changed"
+        elif len(df) < watermark:
+            reset_reason = "table_shrank"
+        elif watermark > 0 and saved["last_row_hash"] != _row_hash(df, watermark - 1):
+            reset_reason = "prefix_changed"
+        else:
+            state = ProfileState.from_dict(saved["state"])
+    if state is None:
+        state = ProfileState(**state_kwargs)
+        watermark = 0
+
+    new_rows = df.iloc[watermark:]
+    if len(new_rows) or not state.cols:
+        state.update(new_rows)
+    end = len(df)
+
+    os.makedirs(store, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({
+            "dataset": ds.name,
+            "watermark": end,
+            "columns": [str(c) for c in df.columns],
+            "last_row_hash": _row_hash(df, end - 1) if end else None,
+            "state": state.to_dict(),
+        }, f, default=str)
+
+    rep = state.finalize(name=ds.name, artifacts_dir=artifacts_dir)
+    meta: Dict[str, Any] = {
+        "dataset": ds.name,
+        "mode": "incremental",
+        "watermark": end,
+        "previous_watermark": watermark,
+        "new_rows": int(len(new_rows)),
+        "approx_metrics": [m.id for m in rep.metrics if m.meta.get("approx")],
+    }
+    if reset_reason is not None:
+        meta["reset"] = reset_reason
+    rep.meta = meta
+    return rep
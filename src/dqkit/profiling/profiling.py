@@ -7,6 +7,13 @@ import pandas as pd
 from ..types import Dataset, MetricResult, RunReport
 
 _NUM_QS = [0.05, 0.25, 0.5, 0.75, 0.95]
+# upper bound on the float64 bytes of one numeric block; wider groups are split
+_BLOCK_BYTES = 1 << 27
+# approx mode: rows hashed per slice, and fixed sketch sizes (~4KB HLL, 64 counters, 512B entropy)
+_APPROX_SLICE = 1 << 20
+_APPROX_HLL_P = 12
+_APPROX_TOPK = 64
+_APPROX_ENTROPY_K = 64
 
 def _is_numeric(s: pd.Series) -> bool:
     return pd.api.types.is_numeric_dtype(s)
@@ -22,48 +29,161 @@ def _entropy_from_counts(counts: np.ndarray) -> float:
     p = p[p > 0]
     return float(-(p * np.log2(p)).sum())
 
-def profile(ds: Dataset, columns: Optional[Sequence[str]] = None, bins: int = 10, artifacts_dir: Optional[str] = None) -> RunReport:
+def _numeric_blocks(df: pd.DataFrame) -> List[List[int]]:
+    """Group positions of numeric columns by dtype, split to stay under _BLOCK_BYTES."""
+    groups: Dict[Any, List[int]] = {}
+    for pos, dt in enumerate(df.dtypes):
+        if pd.api.types.is_numeric_dtype(dt):
+            groups.setdefault(dt, []).append(pos)
+    width = max(1, _BLOCK_BYTES // max(8 * len(df), 1))
+    return [g[i:i + width] for g in groups.values() for i in range(0, len(g), width)]
+
+def _block_values(block: pd.DataFrame) -> np.ndarray:
+    dt = block.dtypes.iloc[0]
+    if isinstance(dt, np.dtype):
+        return block.to_numpy()
+    # nullable extension dtypes (Int64, Float64, boolean): NA -> NaN
+    return block.to_numpy(dtype=float, na_value=np.nan)
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    # same formulation as numpy's linear quantile so values match np.quantile
+    diff = b - a
+    return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+def _numeric_block_stats(X: np.ndarray, bins: Any = None) -> Dict[str, Any]:
+    """All per-column numeric statistics of a 2D block from one sort per column.
+    NaNs sort to the end, so the first `count` rows of each sorted column are its values.
+    Histograms (counts, edges) are only built when `bins` is given.
+    """
+    n, k = X.shape
+    Xs = np.sort(X, axis=0)
+    F = X.astype(float, copy=False)
+    mask = np.isnan(F) if F.dtype.kind == "f" else np.zeros((n, k), dtype=bool)
+    cnt = n - mask.sum(axis=0)
+    has = cnt > 0
+    last = np.maximum(cnt - 1, 0)
+    cols = np.arange(k)
+
+    # distinct: value changes between neighbours of the sorted non-null prefix
+    if n > 1:
+        change = (Xs[1:] != Xs[:-1]) & (np.arange(n - 1)[:, None] < last[None, :])
+        distinct = change.sum(axis=0) + has
+    else:
+        distinct = has.astype(int)
+
+    Fs = Xs.astype(float, copy=False)
+    out: Dict[str, Any] = {"count": cnt, "distinct": distinct}
+    if n == 0:
+        return out
+    out["min"] = Fs[0]
+    out["max"] = Fs[last, cols]
+    safe = np.maximum(cnt, 1)
+    dev = np.where(mask, 0.0, F)
+    mean = dev.sum(axis=0) / safe
+    dev -= mean
+    dev[mask] = 0.0
+    var = (dev * dev).sum(axis=0) / np.maximum(cnt - 1, 1)
+    out["mean"] = mean
+    out["std"] = np.where(cnt > 1, np.sqrt(var), 0.0)
+    for q in _NUM_QS:
+        virtual = last * q
+        lo = np.floor(virtual).astype(int)
+        hi = np.minimum(lo + 1, last)
+        out[f"q{int(q*100)}"] = _lerp(Fs[lo, cols], Fs[hi, cols], virtual - lo)
+    if bins is not None:
+        out["hist"] = [_sorted_histogram(Fs[:c, j], bins) if c else None for j, c in enumerate(cnt)]
+    return out
+
+def _sorted_histogram(values: np.ndarray, bins: Any):
+    """np.histogram of an already sorted 1D array, with bin counts found by binary search."""
+    if not isinstance(bins, (int, np.integer)):
+        return np.histogram(values, bins=bins)
+    edges = np.histogram_bin_edges(values[[0, -1]], bins=bins)
+    inner = np.searchsorted(values, edges[1:-1], side="left")
+    counts = np.diff(np.concatenate(([0], inner, [len(values)])))
+    return counts, edges
+
+def profile(ds: Dataset, columns: Optional[Sequence[str]] = None, bins: int = 10, artifacts_dir: Optional[str] = None, approx: bool = False) -> RunReport:
     """
     Compute basic per-column profiling metrics.
     - count (non-null), missing_rate, distinct, dtype
     - numeric: min, max, mean, std, quantiles, histogram (artifact)
     - categorical (object/string): top-k frequencies, entropy
     - datetime: min, max
+    Numeric columns are profiled together in same-dtype 2D blocks: one sort per column
+    yields min/max, distinct, quantiles and histogram counts, and moments share a null mask.
+    approx=True profiles categorical columns through fixed-size sketches instead of a full
+    frequency table: HyperLogLog distinct, heavy-hitter top-k and a stable-projection entropy
+    estimate, each recording its error bound in `meta` (exact values are kept while the
+    sketches have not overflowed).
     Returns a RunReport with MetricResult entries; artifacts (CSV) saved if artifacts_dir provided.
     """
     df = ds.df if columns is None else ds.df[list(columns)]
     metrics: List[MetricResult] = []
     artifacts: Dict[str, str] = {}
+    n = len(df)
+
+    numeric: Dict[int, Dict[str, Any]] = {}
+    for positions in _numeric_blocks(df):
+        stats = _numeric_block_stats(_block_values(df.iloc[:, positions]), bins if artifacts_dir is not None else None)
+        for j, pos in enumerate(positions):
+            numeric[pos] = {key: arr[j] for key, arr in stats.items()}
 
-    for col in df.columns:
-        s = df[col]
-        non_null = int(s.notna().sum())
-        missing_rate = float(s.isna().mean())
-        distinct = int(s.nunique(dropna=True))
+    for pos, col in enumerate(df.columns):
+        s = df.iloc[:, pos]
+        sk = None
+        if pos in numeric:
+            st = numeric[pos]
+            non_null = int(st["count"])
+            distinct = int(st["distinct"])
+            vc = None
+        elif _is_datetime(s):
+            non_null = int(s.notna().sum())
+            distinct = int(s.nunique(dropna=True))
+            vc = None
+        elif approx:
+            from .state import _categorical_metrics, _categorical_state, _distinct_metric, _fold_categorical
+            sk = _categorical_state(str(s.dtype), _APPROX_HLL_P, _APPROX_TOPK, _APPROX_ENTROPY_K)
+            for start in range(0, n, _APPROX_SLICE):
+                part = s.iloc[start:start + _APPROX_SLICE].value_counts(dropna=True)
+                part = part[part > 0]
+                if len(part):
+                    _fold_categorical(sk, part)
+            non_null = sk.count
+            vc = None
+        else:
+            # one hash pass over raw values serves count, distinct, top-k and entropy
+            vc_raw = s.value_counts(dropna=True)
+            vc_raw = vc_raw[vc_raw > 0]
+            non_null = int(vc_raw.sum())
+            distinct = int(len(vc_raw))
+            vc = vc_raw.groupby(vc_raw.index.astype(str), sort=False).sum().sort_values(ascending=False, kind="mergesort")
+            vc.index.name = vc_raw.index.name
+        missing_rate = float((n - non_null) / n) if n else float('nan')
         metrics.append(MetricResult(f"dq.profile.count.{col}", "column", col, non_null))
         metrics.append(MetricResult(f"dq.profile.missing_rate.{col}", "column", col, missing_rate))
-        metrics.append(MetricResult(f"dq.profile.distinct.{col}", "column", col, distinct))
+        if sk is not None:
+            metrics.append(_distinct_metric(col, sk))
+        else:
+            metrics.append(MetricResult(f"dq.profile.distinct.{col}", "column", col, distinct))
         metrics.append(MetricResult(f"dq.profile.dtype.{col}", "column", col, str(s.dtype)))
 
-        if _is_numeric(s):
-            s_num = s.dropna().astype(float)
-            if len(s_num) > 0:
+        if pos in numeric:
+            if non_null > 0:
                 metrics.extend([
-                    MetricResult(f"dq.profile.min.{col}", "column", col, float(s_num.min())),
-                    MetricResult(f"dq.profile.max.{col}", "column", col, float(s_num.max())),
-                    MetricResult(f"dq.profile.mean.{col}", "column", col, float(s_num.mean())),
-                    MetricResult(f"dq.profile.std.{col}", "column", col, float(s_num.std(ddof=1)) if len(s_num)>1 else 0.0),
+                    MetricResult(f"dq.profile.min.{col}", "column", col, float(st["min"])),
+                    MetricResult(f"dq.profile.max.{col}", "column", col, float(st["max"])),
+                    MetricResult(f"dq.profile.mean.{col}", "column", col, float(st["mean"])),
+                    MetricResult(f"dq.profile.std.{col}", "column", col, float(st["std"])),
                 ])
                 # quantiles
-                qs = np.quantile(s_num, _NUM_QS)
-                for q, v in zip(_NUM_QS, qs):
-                    metrics.append(MetricResult(f"dq.profile.q{int(q*100)}.{col}", "column", col, float(v)))
+                for q in _NUM_QS:
+                    metrics.append(MetricResult(f"dq.profile.q{int(q*100)}.{col}", "column", col, float(st[f"q{int(q*100)}"])))
                 # histogram
-                hist_counts, edges = np.histogram(s_num, bins=bins)
                 if artifacts_dir is not None:
                     import os
+                    hist_counts, edges = st["hist"]
                     os.makedirs(artifacts_dir, exist_ok=True)
-                    import pandas as pd
                     hist_df = pd.DataFrame({
                         "left": edges[:-1],
                         "right": edges[1:],
@@ -79,11 +199,13 @@ def profile(ds: Dataset, columns: Optional[Sequence[str]] = None, bins: int = 10
                 metrics.append(MetricResult(f"dq.profile.min.{col}", "column", col, s_dt.min()))
                 metrics.append(MetricResult(f"dq.profile.max.{col}", "column", col, s_dt.max()))
 
+        elif sk is not None:
+            if non_null > 0:
+                metrics.extend(_categorical_metrics(col, sk, artifacts_dir, artifacts))
+
         else:
             # treat as categorical/text-like
-            s_str = s.dropna().astype(str)
-            if len(s_str) > 0:
-                vc = s_str.value_counts()
+            if non_null > 0:
                 topk = vc.head(10).to_dict()
                 metrics.append(MetricResult(f"dq.profile.topk.{col}", "column", col, topk))
                 ent = _entropy_from_counts(vc.values.astype(int))
@@ -0,0 +1,313 @@
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Union
+import copy
+import math
+import os
+import numpy as np
+import pandas as pd
+from ..types import Dataset, MetricResult, RunReport
+from ..sketches import EntropySketch, FrequentItems, HyperLogLog, KLLSketch, hash_values
+from .profiling import _NUM_QS, _block_values, _entropy_from_counts, _is_datetime, _numeric_blocks
+
+@dataclass
+class _ColumnState:
+    kind: str  # "numeric"|"datetime"|"categorical"|"empty" (no non-null value seen yet)
+    dtype: str
+    rows: int = 0
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    min: Any = None
+    max: Any = None
+    quantiles: Optional[KLLSketch] = None
+    distinct: Optional[HyperLogLog] = None
+    freq: Optional[FrequentItems] = None
+    entropy: Optional[EntropySketch] = None
+
+_SKETCHES = {"quantiles": KLLSketch, "distinct": HyperLogLog, "freq": FrequentItems, "entropy": EntropySketch}
+
+def _column_to_dict(st: _ColumnState) -> Dict[str, Any]:
+    d: Dict[str, Any] = {"kind": st.kind, "dtype": st.dtype, "rows": st.rows, "count": st.count, "mean": st.mean, "m2": st.m2}
+    # datetime bounds are stored as ISO strings
+    d["min"] = str(st.min) if st.kind == "datetime" else st.min
+    d["max"] = str(st.max) if st.kind == "datetime" else st.max
+    for key in _SKETCHES:
+        sk = getattr(st, key)
+        d[key] = None if sk is None else sk.to_dict()
+    return d
+
+def _column_from_dict(d: Dict[str, Any]) -> _ColumnState:
+    st = _ColumnState(kind=d["kind"], dtype=d["dtype"], rows=int(d["rows"]), count=int(d["count"]),
+                      mean=float(d["mean"]), m2=float(d["m2"]), min=d["min"], max=d["max"])
+    if st.kind == "datetime":
+        st.min, st.max = pd.Timestamp(st.min), pd.Timestamp(st.max)
+    for key, cls in _SKETCHES.items():
+        if d.get(key) is not None:
+            setattr(st, key, cls.from_dict(d[key]))
+    return st
+
+def _kind(s: pd.Series) -> str:
+    if pd.api.types.is_numeric_dtype(s):
+        return "numeric"
+    if _is_datetime(s):
+        return "datetime"
+    return "categorical"
+
+def _categorical_state(dtype: str, hll_precision: int, topk_capacity: int, entropy_k: int) -> _ColumnState:
+    return _ColumnState(kind="categorical", dtype=dtype, distinct=HyperLogLog(hll_precision),
+                        freq=FrequentItems(topk_capacity), entropy=EntropySketch(entropy_k))
+
+def _fold_categorical(st: _ColumnState, vc: pd.Series) -> None:
+    """Fold a chunk's raw value_counts (positive counts only) into a categorical column state."""
+    st.count += int(vc.sum())
+    st.distinct.update_hashes(hash_values(vc.index.to_numpy()))
+    # top-k and entropy are over string forms, as in profile()
+    by_str = vc.groupby(vc.index.astype(str), sort=False).sum()
+    st.freq.update_counts(by_str)
+    st.entropy.update_counts(hash_values(by_str.index.to_numpy()), by_str.to_numpy())
+
+def _distinct_metric(col: Any, st: _ColumnState) -> MetricResult:
+    if st.distinct is None or st.distinct.exact:
+        distinct = 0 if st.distinct is None else int(st.distinct.count())
+        return MetricResult(f"dq.profile.distinct.{col}", "column", col, distinct)
+    return MetricResult(f"dq.profile.distinct.{col}", "column", col, int(round(st.distinct.count())),
+                        meta={"approx": True, "relative_error": st.distinct.relative_error})
+
+def _categorical_metrics(col: Any, st: _ColumnState, artifacts_dir: Optional[str], artifacts: Dict[str, str]) -> List[MetricResult]:
+    """topk/entropy metrics (+ frequency artifact) of a categorical column state."""
+    if st.freq.exact:
+        tmeta: Dict[str, Any] = {}
+        ent, emeta = _entropy_from_counts(st.freq.counts.to_numpy()), {}
+    else:
+        tmeta = {"approx": True, "max_count_error": st.freq.max_error}
+        ent, emeta = st.entropy.estimate(), {"approx": True, "std_error": st.entropy.std_error}
+    out = [
+        MetricResult(f"dq.profile.topk.{col}", "column", col, st.freq.top(10).to_dict(), meta=tmeta),
+        MetricResult(f"dq.profile.entropy.{col}", "column", col, ent, unit="bits", meta=emeta),
+    ]
+    if artifacts_dir is not None:
+        os.makedirs(artifacts_dir, exist_ok=True)
+        freq_path = os.path.join(artifacts_dir, f"{col}_freq.csv")
+        st.freq.top(len(st.freq.counts)).rename_axis(col).to_frame("count").to_csv(freq_path)
+        artifacts[f"artifact.freq.{col}"] = freq_path
+    return out
+
+def _merge_dtype(a: str, b: str) -> str:
+    if a == b:
+        return a
+    try:
+        return str(np.result_type(np.dtype(a), np.dtype(b)))
+    except TypeError:
+        return "object"
+
+class ProfileState:
+    """Mergeable accumulator behind `profile()` for chunked or partitioned data.
+
+    Feed DataFrame chunks with `update()`, combine partial states (e.g. from worker
+    processes) with `merge()`, and call `finalize()` for the same `dq.profile.*` metrics
+    `profile()` emits. Per column it keeps Welford moments, exact min/max and null counts,
+    a KLL quantile sketch (quantiles + histogram), a HyperLogLog distinct counter and a
+    heavy-hitters summary for `topk`, so memory is bounded by sketch sizes, not row count.
+    Values are exact while the sketches have not compacted; otherwise the metric `meta`
+    carries `approx=True` and the error bound.
+    """
+
+    def __init__(self, columns: Optional[Sequence[str]] = None, bins: int = 10, quantile_k: int = 512,
+                 hll_precision: int = 12, topk_capacity: int = 1024, entropy_k: int = 64, seed: Optional[int] = None):
+        self.columns = None if columns is None else list(columns)
+        self.bins = bins
+        self.quantile_k = quantile_k
+        self.hll_precision = hll_precision
+        self.topk_capacity = topk_capacity
+        self.entropy_k = entropy_k
+        self.seed = seed
+        self.n_rows = 0
+        self.cols: Dict[Any, _ColumnState] = {}
+
+    def _new_column(self, kind: str, dtype: str) -> _ColumnState:
+        if kind == "categorical":
+            return _categorical_state(dtype, self.hll_precision, self.topk_capacity, self.entropy_k)
+        st = _ColumnState(kind=kind, dtype=dtype)
+        if kind == "empty":
+            return st
+        st.distinct = HyperLogLog(self.hll_precision)
+        if kind == "numeric":
+            st.quantiles = KLLSketch(self.quantile_k, seed=self.seed)
+        return st
+
+    def _column(self, col: Any, s: pd.Series, has_values: bool) -> _ColumnState:
+        kind = _kind(s) if has_values else "empty"
+        st = self.cols.get(col)
+        if st is None:
+            st = self.cols[col] = self._new_column(kind, str(s.dtype))
+        elif st.kind == "empty" and kind != "empty":
+            fresh = self._new_column(kind, str(s.dtype))
+            fresh.rows = st.rows
+            st = self.cols[col] = fresh
+        elif kind not in ("empty", st.kind):
+            raise ValueError(f"column {col!r} changed from {st.kind} to {kind} between chunks; pass explicit dtypes when reading")
+        elif kind != "empty":
+            st.dtype = _merge_dtype(st.dtype, str(s.dtype))
+        return st
+
+    def update(self, data: Union[pd.DataFrame, Dataset]) -> "ProfileState":
+        """Fold one chunk of rows into the state. Returns self."""
+        df = data.df if isinstance(data, Dataset) else data
+        if self.columns is not None:
+            df = df[self.columns]
+        n = len(df)
+        self.n_rows += n
+
+        numeric: Dict[int, Any] = {}
+        for positions in _numeric_blocks(df):
+            X = _block_values(df.iloc[:, positions]).astype(float, copy=False)
+            for j, pos in enumerate(positions):
+                numeric[pos] = X[:, j]
+
+        for pos, col in enumerate(df.columns):
+            s = df.iloc[:, pos]
+            if pos in numeric:
+                x = numeric[pos]
+                x = x[~np.isnan(x)]
+                st = self._column(col, s, len(x) > 0)
+                st.rows += n
+                if len(x):
+                    self._update_numeric(st, x)
+            elif _is_datetime(s):
+                v = s.dropna()
+                st = self._column(col, s, len(v) > 0)
+                st.rows += n
+                if len(v):
+                    lo, hi = v.min(), v.max()
+                    st.min = lo if st.min is None else min(st.min, lo)
+                    st.max = hi if st.max is None else max(st.max, hi)
+                    st.count += len(v)
+                    st.distinct.update_hashes(pd.util.hash_pandas_object(v, index=False).to_numpy())
+            else:
+                vc = s.value_counts(dropna=True)
+                vc = vc[vc > 0]
+                st = self._column(col, s, len(vc) > 0)
+                st.rows += n
+                if len(vc):
+                    _fold_categorical(st, vc)
+        return self
+
+    @staticmethod
+    def _update_numeric(st: _ColumnState, x: np.ndarray) -> None:
+        n_b = len(x)
+        mean_b = float(x.mean())
+        m2_b = float(((x - mean_b) ** 2).sum())
+        # Chan et al. parallel combination of Welford moments
+        n_a = st.count
+        total = n_a + n_b
+        delta = mean_b - st.mean
+        st.mean += delta * n_b / total
+        st.m2 += m2_b + delta * delta * n_a * n_b / total
+        st.count = total
+        lo, hi = float(x.min()), float(x.max())
+        st.min = lo if st.min is None else min(st.min, lo)
+        st.max = hi if st.max is None else max(st.max, hi)
+        st.quantiles.update(x)
+        st.distinct.update_hashes(hash_values(x))
+
+    def merge(self, other: "ProfileState") -> "ProfileState":
+        """Combine another state (e.g. from a different partition) into this one. Returns self.
+        A column seen on one side only counts the other side's rows as missing."""
+        for col, st in self.cols.items():
+            if col not in other.cols:
+                st.rows += other.n_rows
+        for col, ot in other.cols.items():
+            st = self.cols.get(col)
+            if st is None:
+                st = self.cols[col] = copy.deepcopy(ot)
+                st.rows += self.n_rows
+                continue
+            if st.kind == "empty" or ot.kind == "empty":
+                keep, add = (copy.deepcopy(ot), st) if st.kind == "empty" else (st, ot)
+                keep.rows += add.rows
+                self.cols[col] = keep
+                continue
+            if st.kind != ot.kind:
+                raise ValueError(f"cannot merge column {col!r}: {st.kind} vs {ot.kind}")
+            st.dtype = _merge_dtype(st.dtype, ot.dtype)
+            st.rows += ot.rows
+            if st.kind == "numeric":
+                total = st.count + ot.count
+                delta = ot.mean - st.mean
+                st.mean += delta * ot.count / total
+                st.m2 += ot.m2 + delta * delta * st.count * ot.count / total
+                st.quantiles.merge(ot.quantiles)
+            elif st.kind == "categorical":
+                st.freq.merge(ot.freq)
+                st.entropy.merge(ot.entropy)
+            if st.kind != "categorical":
+                st.min = min(st.min, ot.min)
+                st.max = max(st.max, ot.max)
+            st.count += ot.count
+            st.distinct.merge(ot.distinct)
+        self.n_rows += other.n_rows
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form of the state (see `from_dict`)."""
+        return {
+            "params": {"columns": self.columns, "bins": self.bins, "quantile_k": self.quantile_k,
+                       "hll_precision": self.hll_precision, "topk_capacity": self.topk_capacity,
+                       "entropy_k": self.entropy_k, "seed": self.seed},
+            "n_rows": self.n_rows,
+            "cols": [[col, _column_to_dict(st)] for col, st in self.cols.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "ProfileState":
+        state = cls(**d["params"])
+        state.n_rows = int(d["n_rows"])
+        state.cols = {col: _column_from_dict(cd) for col, cd in d["cols"]}
+        return state
+
+    def finalize(self, name: str = "dataset", artifacts_dir: Optional[str] = None) -> RunReport:
+        """Emit the `dq.profile.*` metrics for everything seen so far."""
+        metrics: List[MetricResult] = []
+        artifacts: Dict[str, str] = {}
+        for col, st in self.cols.items():
+            missing = st.rows - st.count
+            metrics.append(MetricResult(f"dq.profile.count.{col}", "column", col, st.count))
+            metrics.append(MetricResult(f"dq.profile.missing_rate.{col}", "column", col, float(missing / st.rows) if st.rows else float('nan')))
+            metrics.append(_distinct_metric(col, st))
+            metrics.append(MetricResult(f"dq.profile.dtype.{col}", "column", col, st.dtype))
+            if st.count == 0:
+                continue
+
+            if st.kind == "numeric":
+                std = math.sqrt(st.m2 / (st.count - 1)) if st.count > 1 else 0.0
+                metrics.extend([
+                    MetricResult(f"dq.profile.min.{col}", "column", col, float(st.min)),
+                    MetricResult(f"dq.profile.max.{col}", "column", col, float(st.max)),
+                    MetricResult(f"dq.profile.mean.{col}", "column", col, float(st.mean)),
+                    MetricResult(f"dq.profile.std.{col}", "column", col, float(std)),
+                ])
+                qmeta = {} if st.quantiles.exact else {"approx": True, "rank_error": st.quantiles.rank_error}
+                for q, v in zip(_NUM_QS, st.quantiles.quantiles(_NUM_QS)):
+                    metrics.append(MetricResult(f"dq.profile.q{int(q*100)}.{col}", "column", col, float(v), meta=dict(qmeta)))
+                if artifacts_dir is not None:
+                    edges = np.histogram_bin_edges([st.min, st.max], bins=self.bins)
+                    ranks = st.quantiles.rank(edges[1:-1])
+                    counts = np.diff(np.concatenate(([0.0], ranks, [float(st.count)])))
+                    os.makedirs(artifacts_dir, exist_ok=True)
+                    hist_df = pd.DataFrame({"left": edges[:-1], "right": edges[1:], "count": counts.astype(int)})
+                    path = os.path.join(artifacts_dir, f"{col}_hist.csv")
+                    hist_df.to_csv(path, index=False)
+                    artifacts[f"artifact.hist.{col}"] = path
+
+            elif st.kind == "datetime":
+                metrics.append(MetricResult(f"dq.profile.min.{col}", "column", col, st.min))
+                metrics.append(MetricResult(f"dq.profile.max.{col}", "column", col, st.max))
+
+            else:
+                metrics.extend(_categorical_metrics(col, st, artifacts_dir, artifacts))
+
+        metrics.append(MetricResult("dq.profile.n_rows", "dataset", "*", int(self.n_rows)))
+        metrics.append(MetricResult("dq.profile.n_cols", "dataset", "*", int(len(self.cols))))
+        return RunReport(metrics=metrics, artifacts=artifacts, meta={"dataset": name, "mode": "state"})
@@ -1,3 +1,5 @@
 from .rows import find_duplicates, find_near_duplicates
 from .features import measure_feature_redundancy
-__all__=['find_duplicates','find_near_duplicates','measure_feature_redundancy']
+from .lsh import CosineLSH
+from .minhash import MinHashLSH
+__all__=['find_duplicates','find_near_duplicates','measure_feature_redundancy','CosineLSH','MinHashLSH']
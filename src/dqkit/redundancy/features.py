@@ -5,30 +5,214 @@ import numpy as np
 import pandas as pd
 from ..types import Dataset, MetricResult, RunReport
 
-def _vif(X: np.ndarray) -> np.ndarray:
-    # Basic VIF: regress each column on others via closed form (X'X)^{-1}
-    # Add small ridge for stability.
-    n, p = X.shape
-    vifs = np.zeros(p)
-    for j in range(p):
-        y = X[:, j]
-        Z = np.delete(X, j, axis=1)
-        # add intercept
-        Z1 = np.c_[np.ones(n), Z]
-        XtX = Z1.T @ Z1 + 1e-6 * np.eye(Z1.shape[1])
-        beta = np.linalg.solve(XtX, Z1.T @ y)
-        y_hat = Z1 @ beta
-        rss = np.sum((y - y_hat)**2)
-        tss = np.sum((y - y.mean())**2) + 1e-12
-        r2 = 1.0 - rss / tss
-        vifs[j] = 1.0 / max(1.0 - r2, 1e-8)
-    return vifs
-
-def measure_feature_redundancy(ds: Dataset, columns: Optional[Sequence[str]] = None, corr_method: str = "pearson", vif: bool = True, mi: bool = False, artifacts_dir: Optional[str] = None) -> RunReport:
+# rows per chunk folded into the correlation moments, and the VIF cap (R^2 -> 1)
+_CHUNK = 1 << 16
+_VIF_MAX = 1e8
+# combined pair codes per bincount batch in the mutual-information matrix
+_MI_BATCH = 1 << 24
+
+class _PairwiseMoments:
+    """Pearson moments of p columns accumulated over row chunks with pairwise-complete
+    NaN handling (as DataFrame.corr): entry (j, k) of every matrix only counts rows
+    where both columns are present. Values are shifted by the first chunk's means so
+    the sums do not cancel catastrophically."""
+
+    def __init__(self, p: int):
+        self.shift: Optional[np.ndarray] = None
+        self.n = np.zeros((p, p))
+        self.sx = np.zeros((p, p))   # sum of x_j over rows where x_k is present
+        self.sxx = np.zeros((p, p))
+        self.sxy = np.zeros((p, p))
+
+    def update(self, X: np.ndarray) -> None:
+        if self.shift is None:
+            with np.errstate(all="ignore"):
+                self.shift = np.nan_to_num(np.nanmean(X, axis=0)) if len(X) else np.zeros(X.shape[1])
+        X = X - self.shift
+        present = ~np.isnan(X)
+        if present.all():
+            self.n += len(X)
+            self.sx += X.sum(axis=0)[:, None]
+            self.sxx += (X * X).sum(axis=0)[:, None]
+            self.sxy += X.T @ X
+            return
+        M = present.astype(float)
+        X0 = np.where(present, X, 0.0)
+        self.n += M.T @ M
+        self.sx += X0.T @ M
+        self.sxx += (X0 * X0).T @ M
+        self.sxy += X0.T @ X0
+
+    def corr(self) -> np.ndarray:
+        with np.errstate(all="ignore"):
+            n = np.where(self.n > 1, self.n, np.nan)
+            cov = self.sxy - self.sx * self.sx.T / n
+            var = self.sxx - self.sx ** 2 / n
+            R = cov / np.sqrt(var * var.T)
+        # constant columns (zero variance) have no correlation
+        R[~(var > 0) | ~(var.T > 0)] = np.nan
+        return np.clip(R, -1.0, 1.0)
+
+def _vif(R: np.ndarray) -> np.ndarray:
+    """VIF_j = 1 / (1 - R^2_j) = (R^-1)_jj from the correlation matrix alone. The inverse
+    diagonal comes from an eigendecomposition with eigenvalues floored just above zero,
+    so collinear sets get finite VIFs, capped at _VIF_MAX like constant columns."""
+    live = np.isfinite(np.diag(R))
+    out = np.full(len(R), _VIF_MAX)
+    if live.any():
+        Rl = np.nan_to_num(R[np.ix_(live, live)])
+        w, V = np.linalg.eigh(Rl)
+        out[live] = (V ** 2) @ (1.0 / np.maximum(w, 1e-12))
+    return np.clip(out, 1.0, _VIF_MAX)
+
+def _standardized(frame: pd.DataFrame, method: str) -> np.ndarray:
+    """Columns centered and scaled to unit norm, so Z[:, j] @ Z[:, k] is their correlation.
+    Spearman ranks every column once first. Missing values become 0 (the column mean);
+    constant columns are all 0."""
+    if method == "spearman":
+        frame = frame.rank()
+    elif method != "pearson":
+        raise ValueError("tiled correlation supports 'pearson' and 'spearman'")
+    # column-major, so column tiles are contiguous
+    Z = np.asfortranarray(frame.to_numpy(float, copy=True))
+    with np.errstate(all="ignore"):
+        Z -= np.nanmean(Z, axis=0)
+        np.nan_to_num(Z, copy=False)
+        norm = np.sqrt(np.einsum("ij,ij->j", Z, Z))
+        Z /= np.where(norm > 0, norm, 1.0)
+    return Z
+
+def _corr_pairs(Z: np.ndarray, tile_size: int, threshold: Optional[float], top_k: Optional[int]):
+    """Correlations of all column pairs, computed tile_size x tile_size at a time.
+    Returns (max |corr| per column, i, j, corr) where the pairs (i < j) are those with
+    |corr| >= threshold, restricted to each column's top_k strongest when top_k is set.
+    Memory is one tile plus the kept pairs (or p x top_k), never p x p."""
+    p = Z.shape[1]
+    maxabs = np.zeros(p)
+    thr = -np.inf if threshold is None else threshold
+    if top_k:
+        best = np.full((p, top_k), -np.inf)
+        best_idx = np.full((p, top_k), -1, dtype=np.int64)
+        best_corr = np.zeros((p, top_k))
+    out_i, out_j, out_c = [], [], []
+
+    def keep_top(rows: np.ndarray, cols: np.ndarray, C: np.ndarray, A: np.ndarray) -> None:
+        vals = np.concatenate([best[rows], A], axis=1)
+        idx = np.concatenate([best_idx[rows], np.broadcast_to(cols, A.shape)], axis=1)
+        corr = np.concatenate([best_corr[rows], C], axis=1)
+        sel = np.argpartition(-vals, top_k - 1, axis=1)[:, :top_k] if vals.shape[1] > top_k else np.arange(vals.shape[1])[None, :].repeat(len(rows), 0)
+        best[rows] = np.take_along_axis(vals, sel, 1)
+        best_idx[rows] = np.take_along_axis(idx, sel, 1)
+        best_corr[rows] = np.take_along_axis(corr, sel, 1)
+
+    for s in range(0, p, tile_size):
+        rows = np.arange(s, min(p, s + tile_size))
+        for t in range(s, p, tile_size):
+            cols = np.arange(t, min(p, t + tile_size))
+            C = np.clip(Z[:, s:s + tile_size].T @ Z[:, t:t + tile_size], -1.0, 1.0)
+            A = np.abs(C)
+            if t == s:
+                A[np.arange(len(rows)), np.arange(len(rows))] = -np.inf
+            maxabs[rows] = np.maximum(maxabs[rows], A.max(axis=1))
+            maxabs[cols] = np.maximum(maxabs[cols], A.max(axis=0))
+            A[A < thr] = -np.inf
+            if top_k:
+                keep_top(rows, cols, C, A)
+                if t != s:
+                    keep_top(cols, rows, C.T, A.T)
+            else:
+                if t == s:
+                    A[np.tril_indices(len(rows))] = -np.inf
+                bi, bj = np.nonzero(A > -np.inf)
+                out_i.append(rows[bi])
+                out_j.append(cols[bj])
+                out_c.append(C[bi, bj])
+    if top_k:
+        f, m = np.nonzero(best > -np.inf)
+        a, b = np.minimum(f, best_idx[f, m]), np.maximum(f, best_idx[f, m])
+        key, first = np.unique(a * p + b, return_index=True)
+        return maxabs, key // p, key % p, best_corr[f, m][first]
+    if not out_i:
+        return maxabs, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    i, j, c = np.concatenate(out_i), np.concatenate(out_j), np.concatenate(out_c)
+    order = np.lexsort((j, i))
+    return maxabs, i[order], j[order], c[order]
+
+def _mi_codes(frame: pd.DataFrame, bins: int) -> np.ndarray:
+    """(n, p) integer codes in [0, bins]: numeric columns with more than `bins` distinct
+    values are cut at their quantiles, other columns keep their `bins - 1` most frequent
+    values and lump the rest; missing values get code `bins`."""
+    codes = np.empty(frame.shape, dtype=np.intp)
+    for k, c in enumerate(frame.columns):
+        s = frame[c]
+        if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s) and s.nunique() > bins:
+            x = s.to_numpy(float)
+            edges = np.nanquantile(x, np.linspace(0, 1, bins + 1)[1:-1])
+            col = np.searchsorted(edges, x, side="right")
+        else:
+            f, _ = pd.factorize(s)
+            if not (f >= 0).any():
+                codes[:, k] = bins  # nothing but missing values
+                continue
+            counts = np.bincount(f[f >= 0])
+            rank = np.empty(len(counts), dtype=np.intp)
+            rank[np.argsort(-counts, kind="stable")] = np.arange(len(counts))
+            col = np.minimum(rank[np.maximum(f, 0)], bins - 1)
+        col[s.isna().to_numpy()] = bins
+        codes[:, k] = col
+    return codes
+
+def _mi_matrix(codes: np.ndarray, levels: int, n_jobs: int = 1) -> np.ndarray:
+    """Symmetric matrix of pairwise mutual information (bits) between code columns.
+    Joint histograms of column j against a batch of later columns come from one bincount
+    over offset pair codes; n_jobs > 1 (or -1 for all cores) spreads columns over threads."""
+    n, p = codes.shape
+    mi = np.zeros((p, p))
+    batch = max(1, _MI_BATCH // max(n, 1))
+    cells = levels * levels
+
+    def row(j: int) -> None:
+        left = codes[:, j] * levels
+        for s in range(j + 1, p, batch):
+            block = codes[:, s:s + batch]
+            m = block.shape[1]
+            joint = np.bincount((left[:, None] + block + np.arange(m) * cells).ravel(), minlength=m * cells)
+            joint = joint.reshape(m, levels, levels).astype(float)
+            px = joint.sum(axis=2, keepdims=True)
+            py = joint.sum(axis=1, keepdims=True)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                terms = joint * np.log2(joint * n / (px * py))
+            mi[j, s:s + m] = np.nansum(terms, axis=(1, 2)) / n
+
+    if n_jobs != 1 and p > 2:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=None if n_jobs < 0 else n_jobs) as pool:
+            list(pool.map(row, range(p - 1)))
+    else:
+        for j in range(p - 1):
+            row(j)
+    mi = np.maximum(mi, 0.0)
+    return mi + mi.T
+
+def measure_feature_redundancy(ds: Dataset, columns: Optional[Sequence[str]] = None, corr_method: str = "pearson", vif: Optional[bool] = None, mi: bool = False, artifacts_dir: Optional[str] = None,
+                               corr_threshold: Optional[float] = None, corr_top_k: Optional[int] = None, tile_size: int = 1024,
+                               mi_bins: int = 16, mi_max_rows: Optional[int] = 1_000_000, n_jobs: int = 1) -> RunReport:
     """Compute feature redundancy diagnostics:
       - correlation matrix (Pearson/Spearman) -> artifact CSV
-      - VIF per numeric feature
+      - VIF per numeric feature, from the inverse of the Pearson correlation matrix
+        (accumulated in row chunks, shared with the pearson maxcorr scores)
       - simple redundancy score = max_{k!=j} |corr_{jk}| per feature
+    For very wide sets pass corr_threshold and/or corr_top_k: correlations are then
+    computed in tile_size x tile_size column tiles from columns standardized once (ranked
+    once for Spearman; missing values count as the column mean), and only pairs with
+    |corr| >= corr_threshold, limited to each feature's corr_top_k strongest, are kept in a
+    sparse pair artifact (feature_a, feature_b, corr) instead of the dense matrix. VIF
+    needs the full p x p matrix and its inverse, so vif=None (the default) computes it
+    only on the dense path; pass vif=True to force it alongside the sparse pairs.
+    mi=True adds dq.redundancy.features.mi_max.<col>: the largest mutual information (bits)
+    with any other selected column, numeric or categorical. Columns are coded once into at
+    most `mi_bins` levels plus missing, on a uniform sample of `mi_max_rows` rows (None
+    uses all), and pair histograms are batched bincounts spread over `n_jobs` threads.
     """
     df = ds.df if columns is None else ds.df[list(columns)]
     num_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
@@ -36,27 +220,68 @@ def measure_feature_redundancy(ds: Dataset, columns: Optional[Sequence[str]] = N
     artifacts: Dict[str, str] = {}
 
     if num_cols:
-        corr = df[num_cols].corr(method=corr_method)
-        # redundancy score = max abs corr with others (fill 0 on diagonal)
-        abs_corr = corr.abs().copy()
-        np.fill_diagonal(abs_corr.values, 0.0)
-        for c in num_cols:
-            score = float(abs_corr.loc[c].max())
-            metrics.append(MetricResult(f"dq.redundancy.features.maxcorr.{c}", "column", c, score))
+        num = df[num_cols]
+        sparse_corr = corr_threshold is not None or corr_top_k is not None
+        do_vif = (not sparse_corr if vif is None else vif) and len(num_cols) >= 2
+        R = None
+        if (corr_method == "pearson" and not sparse_corr) or do_vif:
+            # one chunked pass gives the Pearson matrix for both VIF and (pearson) maxcorr
+            mom = _PairwiseMoments(len(num_cols))
+            for start in range(0, max(len(df), 1), _CHUNK):
+                mom.update(num.iloc[start:start + _CHUNK].to_numpy(float))
+            R = mom.corr()
+        if sparse_corr:
+            maxabs, pi, pj, pc = _corr_pairs(_standardized(num, corr_method), tile_size, corr_threshold, corr_top_k)
+            for c, score in zip(num_cols, maxabs):
+                metrics.append(MetricResult(f"dq.redundancy.features.maxcorr.{c}", "column", c, float(score)))
+            if artifacts_dir is not None:
+                import os
+                os.makedirs(artifacts_dir, exist_ok=True)
+                path = os.path.join(artifacts_dir, f"{ds.name}__corr_{corr_method}_pairs.csv")
+                names = np.asarray(num_cols, dtype=object)
+                pd.DataFrame({"feature_a": names[pi], "feature_b": names[pj], "corr": pc}).to_csv(path, index=False)
+                artifacts[f"artifact.redundancy.corr_{corr_method}_pairs"] = path
+        else:
+            if corr_method == "pearson":
+                corr = pd.DataFrame(R, index=num_cols, columns=num_cols)
+                np.fill_diagonal(corr.values, np.where(np.isfinite(np.diag(R)), 1.0, np.nan))
+            else:
+                corr = num.corr(method=corr_method)
+            # redundancy score = max abs corr with others (fill 0 on diagonal)
+            abs_corr = corr.abs().copy()
+            np.fill_diagonal(abs_corr.values, 0.0)
+            for c in num_cols:
+                score = float(abs_corr.loc[c].max())
+                metrics.append(MetricResult(f"dq.redundancy.features.maxcorr.{c}", "column", c, score))
+            if artifacts_dir is not None:
+                import os
+                os.makedirs(artifacts_dir, exist_ok=True)
+                path = os.path.join(artifacts_dir, f"{ds.name}__corr_{corr_method}.csv")
+                corr.to_csv(path)
+                artifacts[f"artifact.redundancy.corr_{corr_method}"] = path
+
+        if do_vif:
+            v = _vif(R)
+            for c, vv in zip(num_cols, v):
+                metrics.append(MetricResult(f"dq.redundancy.features.vif.{c}", "column", c, float(vv)))
+
+    if mi and df.shape[1] >= 2:
+        sample = df
+        if mi_max_rows is not None and len(df) > mi_max_rows:
+            rng = np.random.default_rng(0)
+            sample = df.iloc[np.sort(rng.choice(len(df), mi_max_rows, replace=False))]
+        M = _mi_matrix(_mi_codes(sample, mi_bins), mi_bins + 1, n_jobs=n_jobs)
+        np.fill_diagonal(M, -np.inf)
+        mi_meta = {"bins": mi_bins, "rows": len(sample)}
+        for c, score in zip(df.columns, M.max(axis=1)):
+            metrics.append(MetricResult(f"dq.redundancy.features.mi_max.{c}", "column", c, float(score), unit="bits", meta=mi_meta))
         if artifacts_dir is not None:
             import os
             os.makedirs(artifacts_dir, exist_ok=True)
-            path = os.path.join(artifacts_dir, f"{ds.name}__corr_{corr_method}.csv")
-            corr.to_csv(path)
-            artifacts[f"artifact.redundancy.corr_{corr_method}"] = path
-
-        if vif and len(num_cols) >= 2:
-            X = df[num_cols].to_numpy(float)
-            # center & scale to unit var to stabilize
-            X = (X - X.mean(axis=0)) / (X.std(axis=0) + 1e-12)
-            v = _vif(X)
-            for c, vv in zip(num_cols, v):
-                metrics.append(MetricResult(f"dq.redundancy.features.vif.{c}", "column", c, float(vv)))
+            np.fill_diagonal(M, np.nan)
+            path = os.path.join(artifacts_dir, f"{ds.name}__mi.csv")
+            pd.DataFrame(M, index=df.columns, columns=df.columns).to_csv(path)
+            artifacts["artifact.redundancy.mi"] = path
 
     # Aggregate overall redundancy index (max of maxcorr)
     if num_cols:
@@ -0,0 +1,227 @@
+
+from __future__ import annotations
+from typing import List, Optional, Tuple
+import numpy as np
+
+# candidate pairs verified per batch, the largest bucket whose pairs are listed (larger
+# ones are compared block by block), and cells of one such block
+_VERIFY_BATCH = 1 << 20
+_MAX_BUCKET = 256
+_BLOCK = 1 << 22
+
+def _normalize_rows(X: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return X / norms
+
+def _bucket_pairs(keys: np.ndarray, max_bucket: int = _MAX_BUCKET) -> Tuple[np.ndarray, np.ndarray, List[np.ndarray]]:
+    """Position pairs (a, b), a < b, of equal keys in buckets of at most `max_bucket`
+    rows, and the (ascending) positions of every larger bucket. Those are left to the
+    caller to compare block by block, so a huge bucket never becomes ~m**2/2 listed pairs."""
+    order = np.argsort(keys, kind="stable")
+    k = keys[order]
+    starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]]) if len(k) else np.empty(0, dtype=np.int64)
+    sizes = np.diff(np.r_[starts, len(k)])
+    big = sizes > max_bucket
+    large = [order[s:s + m] for s, m in zip(starts[big], sizes[big])]
+    small = np.repeat(~big, sizes)
+    order, k = order[small], k[small]
+    out_a, out_b = [], []
+    for d in range(1, min(max_bucket, len(k))):
+        same = np.flatnonzero(k[:-d] == k[d:])
+        if not len(same):
+            break
+        out_a.append(order[same])
+        out_b.append(order[same + d])
+    if not out_a:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), large
+    a, b = np.concatenate(out_a), np.concatenate(out_b)
+    return np.minimum(a, b), np.maximum(a, b), large
+
+def _duplicate_groups(X: np.ndarray) -> np.ndarray:
+    """For each row, the position of the first row identical to it."""
+    if not len(X):
+        return np.empty(0, dtype=np.int64)
+    _, first, inv = np.unique(X, axis=0, return_index=True, return_inverse=True)
+    return first[inv.ravel()]
+
+def _expand_groups(rep: np.ndarray, a: np.ndarray, b: np.ndarray, sim: np.ndarray, self_sim: np.ndarray,
+                   threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pairs over all rows from pairs (a, b, sim) between group representatives: every
+    member of a's group is paired with every member of b's, and members of one group
+    with each other when its `self_sim` reaches `threshold`. `rep` maps each row to its
+    representative (a row of the group). Returns (i < j, sim) in (i, j) order."""
+    n = len(rep)
+    order = np.argsort(rep, kind="stable")
+    heads, start, cnt = np.unique(rep[order], return_index=True, return_counts=True)
+    gstart = np.zeros(n, dtype=np.int64)
+    gcnt = np.zeros(n, dtype=np.int64)
+    gstart[heads], gcnt[heads] = start, cnt
+    na, nb = gcnt[a], gcnt[b]
+    tot = na * nb
+    p = np.repeat(np.arange(len(a)), tot)
+    off = np.arange(tot.sum()) - np.repeat(np.cumsum(tot) - tot, tot)
+    x, y = order[gstart[a][p] + off // nb[p]], order[gstart[b][p] + off % nb[p]]
+    # within a group: each member with the members after it
+    gid = np.repeat(np.arange(len(heads)), cnt)
+    partners = cnt[gid] - 1 - (np.arange(n) - start[gid])
+    partners[self_sim[heads][gid] < threshold] = 0
+    slot = np.repeat(np.arange(n), partners)
+    off = np.arange(partners.sum()) - np.repeat(np.cumsum(partners) - partners, partners)
+    wx, wy = order[slot], order[slot + 1 + off]
+    i = np.concatenate([np.minimum(x, y), wx])
+    j = np.concatenate([np.maximum(x, y), wy])
+    s = np.concatenate([sim[p], self_sim[rep[wx]]])
+    keep = np.lexsort((j, i))
+    return i[keep], j[keep], s[keep]
+
+class CosineLSH:
+    """Random-hyperplane LSH index for approximate cosine near-duplicates.
+    Each of `n_tables` tables hashes a row to the signs of `n_bits` random projections;
+    rows sharing a bucket in any table become candidates, and only candidates get an
+    exact cosine. More bits = fewer, purer candidates; more tables = higher recall.
+    Indexed (normalized) rows are kept for verification, so later batches can be
+    checked against the corpus with `query`; `save`/`load` persist the whole index.
+    """
+
+    def __init__(self, n_features: int, n_bits: int = 16, n_tables: int = 8, seed: int = 0):
+        if not 1 <= n_bits <= 64:
+            raise ValueError("n_bits must be between 1 and 64")
+        self.n_features = int(n_features)
+        self.n_bits = int(n_bits)
+        self.n_tables = int(n_tables)
+        self.seed = int(seed)
+        rng = np.random.default_rng(seed)
+        self.planes = rng.normal(size=(self.n_tables, self.n_features, self.n_bits))
+        self.vectors = np.empty((0, self.n_features))
+        self.ids = np.empty(0, dtype=np.int64)
+        self.keys = np.empty((self.n_tables, 0), dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def recall(self, similarity: float) -> float:
+        """Probability that a pair with this cosine similarity shares a bucket in some table."""
+        theta = np.arccos(np.clip(similarity, -1.0, 1.0))
+        p = (1.0 - theta / np.pi) ** self.n_bits
+        return float(1.0 - (1.0 - p) ** self.n_tables)
+
+    def _keys(self, Xn: np.ndarray) -> np.ndarray:
+        shifts = np.arange(self.n_bits, dtype=np.uint64)
+        out = np.empty((self.n_tables, len(Xn)), dtype=np.uint64)
+        for t in range(self.n_tables):
+            bits = (Xn @ self.planes[t] > 0).astype(np.uint64)
+            out[t] = (bits << shifts).sum(axis=1, dtype=np.uint64)
+        return out
+
+    def add(self, X: np.ndarray, ids: Optional[np.ndarray] = None) -> "CosineLSH":
+        """Index rows of X (n, n_features); ids default to consecutive row numbers."""
+        Xn = _normalize_rows(np.asarray(X, dtype=float))
+        if ids is None:
+            start = int(self.ids.max()) + 1 if len(self.ids) else 0
+            ids = np.arange(start, start + len(Xn))
+        self.vectors = np.vstack([self.vectors, Xn])
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        self.keys = np.concatenate([self.keys, self._keys(Xn)], axis=1)
+        return self
+
+    def pairs(self, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Near-duplicate pairs among indexed rows: (positions a < b, similarity), in (a, b) order.
+        Identical rows are collapsed to one before bucketing and expanded afterwards;
+        buckets too large to list are compared block by block, so no candidate is dropped."""
+        rep = _duplicate_groups(self.vectors)
+        heads = np.flatnonzero(rep == np.arange(len(rep)))
+        V = self.vectors[heads]
+        out = []
+        for t in range(self.n_tables):
+            a, b, large = _bucket_pairs(self.keys[t, heads])
+            out.append(_verify(V, V, a, b, threshold))
+            out.extend(_block_pairs(V, members, threshold) for members in large)
+        a, b, sim = _unique_pairs(out, len(heads))
+        return _expand_groups(rep, heads[a], heads[b], sim, np.einsum("ij,ij->i", self.vectors, self.vectors), threshold)
+
+    def query(self, X: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Pairs between new rows X and the indexed corpus: (row in X, corpus id, similarity).
+        Candidates are verified in batches of about _VERIFY_BATCH, whatever the bucket sizes."""
+        Xn = _normalize_rows(np.asarray(X, dtype=float))
+        qkeys = self._keys(Xn)
+        rep = _duplicate_groups(self.vectors)
+        heads = np.flatnonzero(rep == np.arange(len(rep)))
+        V = self.vectors[heads]
+        out = []
+        for t in range(self.n_tables):
+            order = np.argsort(self.keys[t, heads], kind="stable")
+            ck = self.keys[t, heads][order]
+            lo = np.searchsorted(ck, qkeys[t], side="left")
+            cnt = np.searchsorted(ck, qkeys[t], side="right") - lo
+            cum = np.cumsum(cnt)
+            s = 0
+            while s < len(Xn):
+                base = cum[s - 1] if s else 0
+                e = max(s + 1, int(np.searchsorted(cum, base + _VERIFY_BATCH, side="right")))
+                c = cnt[s:e]
+                q = np.repeat(np.arange(s, e), c)
+                offs = np.arange(c.sum()) - np.repeat(np.cumsum(c) - c, c)
+                out.append(_verify(Xn, V, q, order[np.repeat(lo[s:e], c) + offs], threshold))
+                s = e
+        q, c, sim = _unique_pairs(out, len(heads))
+        # each corpus head stands for all corpus rows identical to it
+        members = np.argsort(rep, kind="stable")
+        _, start, gcnt = np.unique(rep[members], return_index=True, return_counts=True)
+        k = gcnt[c]
+        p = np.repeat(np.arange(len(q)), k)
+        offs = np.arange(k.sum()) - np.repeat(np.cumsum(k) - k, k)
+        c = members[start[c][p] + offs]
+        q, sim = q[p], sim[p]
+        keep = np.lexsort((c, q))
+        return q[keep], self.ids[c[keep]], sim[keep]
+
+    def save(self, path: str) -> None:
+        np.savez(path, params=np.array([self.n_features, self.n_bits, self.n_tables, self.seed]),
+                 planes=self.planes, vectors=self.vectors, ids=self.ids, keys=self.keys)
+
+    @classmethod
+    def load(cls, path: str) -> "CosineLSH":
+        data = np.load(path)
+        n_features, n_bits, n_tables, seed = (int(v) for v in data["params"])
+        idx = cls(n_features, n_bits=n_bits, n_tables=n_tables, seed=seed)
+        idx.planes, idx.vectors, idx.ids, idx.keys = data["planes"], data["vectors"], data["ids"], data["keys"]
+        return idx
+
+def _verify(A: np.ndarray, B: np.ndarray, a: np.ndarray, b: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Exact cosine of unique candidate pairs (A[a], B[b]); keeps those >= threshold."""
+    if len(a):
+        key = np.unique(a.astype(np.int64) * len(B) + b)
+        a, b = key // len(B), key % len(B)
+    sims = np.empty(len(a))
+    for s in range(0, len(a), _VERIFY_BATCH):
+        e = s + _VERIFY_BATCH
+        sims[s:e] = np.einsum("ij,ij->i", A[a[s:e]], B[b[s:e]])
+    hit = sims >= threshold
+    return a[hit], b[hit], sims[hit]
+
+def _block_pairs(V: np.ndarray, members: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """All pairs (a < b) among rows `members` (ascending) of V with cosine >= threshold,
+    from blocks of about _BLOCK similarities."""
+    m = len(members)
+    step = max(1, _BLOCK // m)
+    out_a, out_b, out_s = [], [], []
+    for s in range(0, m, step):
+        e = min(m, s + step)
+        sims = V[members[s:e]] @ V[members[s:]].T
+        hit = (sims >= threshold) & (np.arange(m - s)[None, :] > np.arange(e - s)[:, None])
+        bi, bj = np.nonzero(hit)
+        out_a.append(members[bi + s])
+        out_b.append(members[bj + s])
+        out_s.append(sims[bi, bj])
+    return np.concatenate(out_a), np.concatenate(out_b), np.concatenate(out_s)
+
+def _unique_pairs(parts: List[Tuple[np.ndarray, np.ndarray, np.ndarray]], n_b: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Union of verified (a, b, sim) pair lists, one entry per pair, in (a, b) order."""
+    if not parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    a = np.concatenate([p[0] for p in parts]).astype(np.int64)
+    b = np.concatenate([p[1] for p in parts]).astype(np.int64)
+    sim = np.concatenate([p[2] for p in parts])
+    _, first = np.unique(a * n_b + b, return_index=True)
+    return a[first], b[first], sim[first]
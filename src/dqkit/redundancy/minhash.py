@@ -0,0 +1,183 @@
+
+from __future__ import annotations
+from typing import Optional, Tuple
+import numpy as np
+import pandas as pd
+from ..sketches import _splitmix64
+from .lsh import _bucket_pairs, _expand_groups, _unique_pairs
+
+try:
+    from scipy import sparse
+except Exception:  # pragma: no cover
+    sparse = None
+
+# token occurrences hashed per block (times num_perm values), candidate pairs verified
+# per batch, and cells of one dense intersection band in the exact path
+_SIG_BLOCK = 1 << 22
+_VERIFY_BATCH = 1 << 20
+_EXACT_BLOCK = 1 << 23
+
+def _token_matrix(col: pd.Series) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """Binary rows x tokens CSR matrix of whitespace token sets (nulls give empty rows),
+    and the token of each matrix column."""
+    if sparse is None:
+        raise ImportError("scipy required for text near-duplicate detection")
+    col = col.reset_index(drop=True)
+    n = len(col)
+    toks = col[col.notna()].astype(str).str.split().explode().dropna()
+    if not len(toks):
+        return sparse.csr_matrix((n, 0), dtype=np.float64), np.empty(0, dtype=object)
+    codes, uniques = pd.factorize(toks.to_numpy())
+    key = np.unique(toks.index.to_numpy(dtype=np.int64) * len(uniques) + codes)
+    rows, cols = key // len(uniques), key % len(uniques)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n))])
+    return sparse.csr_matrix((np.ones(len(cols)), cols, indptr), shape=(n, len(uniques))), np.asarray(uniques, dtype=object)
+
+def _jaccard_pairs(T: sparse.csr_matrix, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Exact Jaccard pairs (i < j, sim >= threshold) in row-major order. Intersections
+    come from a sparse product of row bands with the remaining rows, so peak memory is
+    one band, not n x n; cost is still quadratic in rows."""
+    n = T.shape[0]
+    sizes = np.diff(T.indptr).astype(float)
+    step = max(1, _EXACT_BLOCK // max(n, 1))
+    out_i, out_j, out_s = [], [], []
+    for s in range(0, n, step):
+        e = min(n, s + step)
+        inter = (T[s:e] @ T[s:].T).toarray()
+        den = sizes[s:e, None] + sizes[None, s:] - inter
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sim = np.where(den > 0, inter / den, 0.0)
+        hit = (sim >= threshold) & (np.arange(n - s)[None, :] > np.arange(e - s)[:, None])
+        bi, bj = np.nonzero(hit)
+        out_i.append(bi + s)
+        out_j.append(bj + s)
+        out_s.append(sim[bi, bj])
+    if not out_i:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    return np.concatenate(out_i), np.concatenate(out_j), np.concatenate(out_s)
+
+class MinHashLSH:
+    """MinHash signatures with LSH banding for approximate Jaccard near-duplicates on
+    whitespace token sets. Each row gets `num_perm` 32-bit min-hashes (O(n * num_perm)
+    memory); rows agreeing on all `rows_per_band` values of any of `n_bands` bands become
+    candidates, and only candidates get an exact Jaccard. Without explicit banding, the
+    longest bands that still give >= 95% recall at the threshold are chosen.
+    """
+
+    def __init__(self, num_perm: int = 128, n_bands: Optional[int] = None, rows_per_band: Optional[int] = None, seed: int = 0):
+        if num_perm < 1:
+            raise ValueError("num_perm must be >= 1")
+        if (n_bands is None) != (rows_per_band is None):
+            raise ValueError("give both n_bands and rows_per_band, or neither")
+        if n_bands is not None and n_bands * rows_per_band > num_perm:
+            raise ValueError("n_bands * rows_per_band must not exceed num_perm")
+        self.num_perm = int(num_perm)
+        self.n_bands = n_bands
+        self.rows_per_band = rows_per_band
+        self.seed = int(seed)
+        # multiply-shift hash family h_k(x) = (a_k * x + b_k) >> 32 with odd a_k
+        salt = _splitmix64(np.arange(2 * self.num_perm, dtype=np.uint64) + np.uint64(self.seed) * np.uint64(2 * self.num_perm))
+        self._a, self._b = salt[:self.num_perm] | np.uint64(1), salt[self.num_perm:]
+
+    def banding(self, threshold: float, target: float = 0.95) -> Tuple[int, int]:
+        """(n_bands, rows_per_band): the configured ones, else the most selective whose
+        recall at `threshold` reaches `target`."""
+        if self.n_bands is not None:
+            return self.n_bands, self.rows_per_band
+        best = (self.num_perm, 1)
+        for r in range(2, self.num_perm + 1):
+            b = self.num_perm // r
+            if 1.0 - (1.0 - threshold ** r) ** b < target:
+                break
+            best = (b, r)
+        return best
+
+    def recall(self, similarity: float, threshold: float) -> float:
+        """Probability that a pair with this Jaccard similarity becomes a candidate under
+        the banding used for `threshold`."""
+        b, r = self.banding(threshold)
+        return float(1.0 - (1.0 - similarity ** r) ** b)
+
+    def signatures(self, T: sparse.csr_matrix, tokens: np.ndarray) -> np.ndarray:
+        """(n, num_perm) uint32 min-hashes of the token rows of T (columns named by
+        `tokens`); empty rows are all-ones."""
+        n = T.shape[0]
+        sig = np.full((n, self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+        th = pd.util.hash_array(tokens)
+        indptr = T.indptr
+        block = max(1, _SIG_BLOCK // self.num_perm)
+        r0 = 0
+        while r0 < n:
+            r1 = min(n, max(r0 + 1, int(np.searchsorted(indptr, indptr[r0] + block, side="right")) - 1))
+            a, b = indptr[r0], indptr[r1]
+            if b > a:
+                # (num_perm, occurrences) so each hash function is reduced along a contiguous row
+                vals = np.multiply.outer(self._a, th[T.indices[a:b]])
+                vals += self._b[:, None]
+                vals >>= np.uint64(32)
+                full = np.flatnonzero(np.diff(indptr[r0:r1 + 1]) > 0)
+                sig[r0 + full] = np.minimum.reduceat(vals, indptr[r0 + full] - a, axis=1).T
+            r0 = r1
+        return sig
+
+    def pairs(self, col: pd.Series, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Near-duplicate pairs of a text column: (positions i < j, exact Jaccard), in (i, j) order.
+        Rows with identical token sets are hashed and bucketed once, then all paired."""
+        T, tokens = _token_matrix(col)
+        n = T.shape[0]
+        rep = _set_groups(T)
+        live = np.flatnonzero((rep == np.arange(n)) & (np.diff(T.indptr) > 0))
+        n_bands, r = self.banding(threshold)
+        sig = self.signatures(T[live], tokens)
+        cand_a, cand_b, found = [], [], []
+        for band in range(n_bands):
+            cols = sig[:, band * r:(band + 1) * r].astype(np.uint64)
+            key = np.zeros(len(live), dtype=np.uint64)
+            for k in range(r):
+                key = _splitmix64(key ^ cols[:, k])
+            a, b, large = _bucket_pairs(key)
+            cand_a.append(live[a])
+            cand_b.append(live[b])
+            # buckets too large to list get the exact banded Jaccard among their rows
+            for members in large:
+                i, j, sim = _jaccard_pairs(T[live[members]], threshold)
+                found = [_unique_pairs(found + [(live[members[i]], live[members[j]], sim)], n)]
+        a = np.concatenate(cand_a) if cand_a else np.empty(0, dtype=np.int64)
+        b = np.concatenate(cand_b) if cand_b else np.empty(0, dtype=np.int64)
+        if len(a):
+            key = np.unique(a.astype(np.int64) * n + b)
+            a, b = key // n, key % n
+        found.append(_verify(T, a, b, threshold))
+        a, b, sim = _unique_pairs(found, n)
+        return _expand_groups(rep, a, b, sim, (np.diff(T.indptr) > 0).astype(float), threshold)
+
+def _set_groups(T: sparse.csr_matrix) -> np.ndarray:
+    """For each row of T, the first row with the identical (non-empty) token set; empty
+    rows map to themselves. Rows are grouped by a 64-bit set hash and each member is
+    checked against its group's first row, so a hash collision never merges two sets."""
+    n = T.shape[0]
+    sizes = np.diff(T.indptr)
+    full = np.flatnonzero(sizes > 0)
+    rep = np.arange(n)
+    if not len(full):
+        return rep
+    h = np.add.reduceat(_splitmix64(T.indices.astype(np.uint64) + np.uint64(1)), T.indptr[full])
+    h = _splitmix64(h ^ sizes[full].astype(np.uint64))
+    _, first, inv = np.unique(h, return_index=True, return_inverse=True)
+    head = full[first[inv.ravel()]]
+    moved = np.flatnonzero(head != full)
+    same = (T[full[moved]] != T[head[moved]]).getnnz(axis=1) == 0
+    rep[full[moved[same]]] = head[moved[same]]
+    return rep
+
+def _verify(T: sparse.csr_matrix, a: np.ndarray, b: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Exact Jaccard of candidate pairs (T[a], T[b]); keeps those >= threshold."""
+    sizes = np.diff(T.indptr).astype(float)
+    sims = np.empty(len(a))
+    for s in range(0, len(a), _VERIFY_BATCH):
+        e = s + _VERIFY_BATCH
+        inter = np.asarray(T[a[s:e]].multiply(T[b[s:e]]).sum(axis=1)).ravel()
+        den = sizes[a[s:e]] + sizes[b[s:e]] - inter
+        sims[s:e] = inter / den
+    hit = sims >= threshold
+    return a[hit], b[hit], sims[hit]
@@ -4,54 +4,175 @@ from typing import Dict, List, Optional, Sequence, Tuple
 import os
 import numpy as np
 import pandas as pd
+from ..capture import Capture, CaptureConfig
 from ..types import Dataset, MetricResult, RunReport
+from .lsh import CosineLSH, _normalize_rows
+from .minhash import MinHashLSH, _jaccard_pairs, _token_matrix
 
-def find_duplicates(ds: Dataset, keys: Optional[Sequence[str]] = None, artifacts_dir: Optional[str]=None) -> RunReport:
-    """Compute exact duplicate rate over all columns or a subset of keys."""
+# rows hashed per chunk, and the (hash, position) table size above which it is spilled
+_HASH_CHUNK = 1 << 20
+_SPILL_PARTITIONS = 64
+# text_method="auto" compares all pairs exactly up to this many rows
+_EXACT_TEXT_MAX = 20_000
+
+def _candidate_positions(hashes: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Positions whose 64-bit row hash occurs more than once."""
+    _, inv, counts = np.unique(hashes, return_inverse=True, return_counts=True)
+    return positions[counts[inv] > 1]
+
+def _hash_rows(frame: pd.DataFrame) -> np.ndarray:
+    """64-bit row hashes; float columns have -0.0 folded into 0.0 first, since they are
+    equal values (and `df.duplicated` treats them so) but hash differently."""
+    floats = [i for i, dt in enumerate(frame.dtypes) if dt.kind == "f"]
+    if floats:
+        frame = frame.copy(deep=False)
+        for i in floats:
+            frame.isetitem(i, frame.iloc[:, i] + 0.0)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+def _duplicate_candidates(df: pd.DataFrame, chunksize: int, memory_budget: int) -> np.ndarray:
+    """Sorted positions of rows that share their hash with another row. Rows are hashed
+    chunk by chunk; when the (hash, position) table would exceed `memory_budget` bytes it
+    is partitioned by the top hash bits into temporary files and counted per partition."""
+    n = len(df)
+    chunks = range(0, n, chunksize)
+    if n * 16 <= memory_budget:
+        h = np.concatenate([_hash_rows(df.iloc[s:s + chunksize]) for s in chunks]) if n else np.empty(0, np.uint64)
+        return np.sort(_candidate_positions(h, np.arange(n)))
+    import tempfile
+    shift = np.uint64(64 - 6)  # 64 partitions
+    with tempfile.TemporaryDirectory(prefix="dqkit-dups-") as tmp:
+        files = [open(os.path.join(tmp, f"part{k}.bin"), "wb") for k in range(_SPILL_PARTITIONS)]
+        try:
+            for start in chunks:
+                h = _hash_rows(df.iloc[start:start + chunksize])
+                pos = np.arange(start, start + len(h), dtype=np.int64)
+                part = (h >> shift).astype(np.intp)
+                order = np.argsort(part, kind="stable")
+                bounds = np.searchsorted(part[order], np.arange(_SPILL_PARTITIONS + 1))
+                for k in range(_SPILL_PARTITIONS):
+                    sel = order[bounds[k]:bounds[k + 1]]
+                    if len(sel):
+                        np.stack([h[sel].view(np.int64), pos[sel]], axis=1).tofile(files[k])
+        finally:
+            for f in files:
+                f.close()
+        found = []
+        for k in range(_SPILL_PARTITIONS):
+            table = np.fromfile(os.path.join(tmp, f"part{k}.bin"), dtype=np.int64).reshape(-1, 2)
+            if len(table):
+                found.append(_candidate_positions(table[:, 0], table[:, 1]))
+    return np.sort(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+def find_duplicates(ds: Dataset, keys: Optional[Sequence[str]] = None, artifacts_dir: Optional[str]=None, capture: Optional[CaptureConfig]=None, chunksize: int = _HASH_CHUNK, memory_budget: int = 1 << 30) -> RunReport:
+    """Compute exact duplicate rate over all columns or a subset of keys.
+    Rows are hashed to 64-bit keys chunk by chunk (spilling hash partitions to disk past
+    `memory_budget` bytes); only rows whose hash repeats are compared on their values, so
+    hash collisions never count as duplicates.
+    Metrics: duplicate_rate (rows in a duplicate group), duplicate_count (rows beyond the
+    first of each group), duplicate_groups (meta: group size histogram), max_group_size.
+    `capture` caps/samples the duplicate rows written to `artifacts_dir` (see CaptureConfig)."""
     df = ds.df if keys is None else ds.df[list(keys)]
-    dup_mask = df.duplicated(keep=False)
-    rate = float(dup_mask.mean())
-    metrics = [MetricResult("dq.redundancy.rows.duplicate_rate", "dataset", keys or "*", rate)]
-    artifacts: Dict[str, str] = {}
-    if artifacts_dir is not None and rate > 0.0:
-        os.makedirs(artifacts_dir, exist_ok=True)
-        path = os.path.join(artifacts_dir, f"{ds.name}__duplicate_groups.csv")
-        out = ds.df.loc[dup_mask].copy()
-        out.to_csv(path, index=False)
-        artifacts["artifact.redundancy.duplicates"] = path
+    n = len(df)
+    cand = _duplicate_candidates(df, chunksize, memory_budget)
+    dup_pos = np.empty(0, dtype=np.int64)
+    sizes = np.empty(0, dtype=np.int64)
+    if len(cand):
+        sub = df.iloc[cand]
+        # exact grouping of the candidate rows on their values
+        codes = sub.groupby(list(sub.columns), dropna=False, sort=False).ngroup().to_numpy()
+        group_sizes = np.bincount(codes)
+        in_dup = group_sizes[codes] > 1
+        dup_pos = cand[in_dup]
+        sizes = group_sizes[group_sizes > 1]
+    rate = float(len(dup_pos) / n) if n else float('nan')
+    sink = Capture(artifacts_dir, capture)
+    try:
+        if len(dup_pos):
+            sink.add("artifact.redundancy.duplicates", f"{ds.name}__duplicate_groups", ds.df.iloc[dup_pos])
+        artifacts = sink.close()
+    except BaseException:
+        sink.abort()
+        raise
+    meta = sink.counts("artifact.redundancy.duplicates") if capture is not None else {}
+    size_hist = {int(k): int(v) for k, v in zip(*np.unique(sizes, return_counts=True))}
+    target = keys or "*"
+    metrics = [
+        MetricResult("dq.redundancy.rows.duplicate_rate", "dataset", target, rate, meta=meta),
+        MetricResult("dq.redundancy.rows.duplicate_count", "dataset", target, int(len(dup_pos) - len(sizes))),
+        MetricResult("dq.redundancy.rows.duplicate_groups", "dataset", target, int(len(sizes)), meta={"group_sizes": size_hist}),
+        MetricResult("dq.redundancy.rows.max_group_size", "dataset", target, int(sizes.max()) if len(sizes) else 0),
+    ]
     return RunReport(metrics=metrics, artifacts=artifacts, meta={"dataset": ds.name})
 
-def _cosine_similarity_matrix(X: np.ndarray) -> np.ndarray:
-    # Normalize rows
-    norms = np.linalg.norm(X, axis=1, keepdims=True)
-    norms[norms == 0] = 1.0
-    Xn = X / norms
-    return Xn @ Xn.T
-
-def _jaccard_sim_strings(col: pd.Series) -> np.ndarray:
-    # tokenize by whitespace; return pairwise similarities (n x n) — O(n^2), for small sets/tests
-    toks = [set(str(v).split()) if pd.notna(v) else set() for v in col.tolist()]
-    n = len(toks)
-    S = np.eye(n)
-    for i in range(n):
-        for j in range(i+1, n):
-            a, b = toks[i], toks[j]
-            num = len(a & b)
-            den = len(a | b) if (a or b) else 1
-            sim = num/den
-            S[i,j] = S[j,i] = sim
-    return S
+def _cosine_pairs(Xn: np.ndarray, threshold: float, tile_size: int = 2048, n_jobs: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """All pairs i < j with cosine(Xn[i], Xn[j]) >= threshold, in (i, j) order.
+    Similarities are computed one tile_size x tile_size block at a time over the upper
+    triangle, so memory stays O(tile_size**2); row bands can run on a thread pool
+    (the matrix products release the GIL)."""
+    n = len(Xn)
+
+    def band(start: int):
+        stop = min(start + tile_size, n)
+        rows = Xn[start:stop]
+        out_i, out_j, out_s = [], [], []
+        for cstart in range(start, n, tile_size):
+            S = rows @ Xn[cstart:cstart + tile_size].T
+            hit = S >= threshold
+            if cstart == start:
+                hit &= np.triu(np.ones(S.shape, dtype=bool), 1)
+            bi, bj = np.nonzero(hit)
+            if len(bi):
+                out_i.append(bi + start)
+                out_j.append(bj + cstart)
+                out_s.append(S[bi, bj])
+        return out_i, out_j, out_s
+
+    starts = list(range(0, n, tile_size))
+    if n_jobs != 1 and len(starts) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=None if n_jobs < 0 else n_jobs) as pool:
+            parts = list(pool.map(band, starts))
+    else:
+        parts = [band(s) for s in starts]
+    ii = [a for p in parts for a in p[0]]
+    if not ii:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    i, j, sim = np.concatenate(ii), np.concatenate([a for p in parts for a in p[1]]), np.concatenate([a for p in parts for a in p[2]])
+    order = np.lexsort((j, i))
+    return i[order], j[order], sim[order]
 
 def find_near_duplicates(
     ds: Dataset,
     numeric_cols: Optional[Sequence[str]] = None,
     text_cols: Optional[Sequence[str]] = None,
     threshold: float = 0.95,
-    artifacts_dir: Optional[str]=None
+    artifacts_dir: Optional[str]=None,
+    tile_size: int = 2048,
+    n_jobs: int = 1,
+    method: str = "exact",
+    lsh_bits: int = 16,
+    lsh_tables: int = 8,
+    index: Optional[CosineLSH] = None,
+    text_method: str = "auto",
+    minhash_perm: int = 128,
 ) -> RunReport:
     """Identify near-duplicate row pairs via cosine similarity on numeric columns and Jaccard on text columns.
     A pair is considered near-duplicate if either numeric cosine >= threshold or (if numeric_cols not provided),
     text Jaccard >= threshold. Returns rate = (#pairs above threshold) / (n choose 2).
+    Cosine similarities are computed in tile_size x tile_size blocks (never the full n x n
+    matrix); n_jobs > 1 (or -1 for all cores) spreads row bands over a thread pool.
+    method="lsh" finds numeric pairs approximately with a CosineLSH index (`lsh_bits` bits
+    per table, `lsh_tables` tables): only rows sharing a bucket are compared, and the
+    estimated recall at `threshold` is reported in meta. With `index` (a CosineLSH over an
+    earlier corpus, whose parameters are then used) the batch is also checked against
+    the corpus: dq.redundancy.rows.near_dup_cross_rate is the share of rows with a
+    near-duplicate there.
+    Text Jaccard uses whitespace token sets (requires scipy). text_method="exact" compares every pair from a
+    sparse token matrix in row bands (quadratic time, no n x n matrix); "minhash" keeps
+    `minhash_perm` MinHash values per row and verifies only LSH band collisions (banding
+    chosen for >= 95% recall at `threshold`, reported in meta); "auto" is exact up to
+    20,000 rows and minhash beyond.
     Artifacts: CSV with pairs (i, j, sim, channel).
     """
     df = ds.df
@@ -59,8 +180,11 @@ def find_near_duplicates(
     if n < 2:
         return RunReport(metrics=[MetricResult("dq.redundancy.rows.near_dup_rate", "dataset", "*", 0.0)], meta={"dataset": ds.name})
 
-    pairs = []
     total_pairs = n*(n-1)//2
+    meta: Dict[str, object] = {"threshold": threshold}
+    cross = None
+    # per channel: (i, j, similarity) arrays of pairs at or above threshold
+    found: List[Tuple[np.ndarray, np.ndarray, np.ndarray, str]] = []
 
     if numeric_cols:
         X = df[list(numeric_cols)].to_numpy(float)
@@ -68,38 +192,66 @@ def find_near_duplicates(
         col_means = np.nanmean(X, axis=0)
         inds = np.where(np.isnan(X))
         X[inds] = np.take(col_means, inds[1])
-        S = _cosine_similarity_matrix(X)
-        ch = "numeric"
-        for i in range(n):
-            for j in range(i+1, n):
-                if S[i,j] >= threshold:
-                    pairs.append((i,j, float(S[i,j]), ch))
+        if method == "lsh":
+            params = (index.n_bits, index.n_tables, index.seed) if index is not None else (lsh_bits, lsh_tables, 0)
+            lsh = CosineLSH(X.shape[1], n_bits=params[0], n_tables=params[1], seed=params[2]).add(X)
+            i, j, sim = lsh.pairs(threshold)
+            meta.update({"method": "lsh", "n_bits": lsh.n_bits, "n_tables": lsh.n_tables, "est_recall": lsh.recall(threshold)})
+        elif method == "exact":
+            i, j, sim = _cosine_pairs(_normalize_rows(X), threshold, tile_size=tile_size, n_jobs=n_jobs)
+        else:
+            raise ValueError("method must be 'exact' or 'lsh'")
+        found.append((i, j, sim, "numeric"))
+        if index is not None:
+            cross = index.query(X, threshold)
 
     if text_cols:
         for c in text_cols:
-            S = _jaccard_sim_strings(df[c])
-            ch = f"text:{c}"
-            for i in range(n):
-                for j in range(i+1, n):
-                    if S[i,j] >= threshold:
-                        pairs.append((i,j, float(S[i,j]), ch))
-
-    # deduplicate pairs (keep max sim across channels)
-    pairmap: Dict[Tuple[int,int], Tuple[float,str]] = {}
-    for i,j,sim,ch in pairs:
-        key = (i,j)
-        if key not in pairmap or sim > pairmap[key][0]:
-            pairmap[key] = (sim, ch)
-
-    near_dup_count = len(pairmap)
+            if text_method == "exact" or (text_method == "auto" and n <= _EXACT_TEXT_MAX):
+                i, j, sim = _jaccard_pairs(_token_matrix(df[c])[0], threshold)
+                meta["text_method"] = "exact"
+            elif text_method in ("minhash", "auto"):
+                mh = MinHashLSH(num_perm=minhash_perm)
+                i, j, sim = mh.pairs(df[c], threshold)
+                n_bands, rows_per_band = mh.banding(threshold)
+                meta.update({"text_method": "minhash", "minhash_perm": mh.num_perm, "minhash_bands": n_bands,
+                             "minhash_rows": rows_per_band, "text_est_recall": mh.recall(threshold, threshold)})
+            else:
+                raise ValueError("text_method must be 'auto', 'exact' or 'minhash'")
+            found.append((i, j, sim, f"text:{c}"))
+
+    # deduplicate pairs across channels: keep the max similarity (first channel on ties),
+    # in order of first appearance
+    channels = [f[3] for f in found]
+    I = np.concatenate([f[0] for f in found]).astype(np.int64) if found else np.empty(0, dtype=np.int64)
+    J = np.concatenate([f[1] for f in found]).astype(np.int64) if found else np.empty(0, dtype=np.int64)
+    SIM = np.concatenate([f[2] for f in found]).astype(float) if found else np.empty(0)
+    CH = np.concatenate([np.full(len(f[0]), k) for k, f in enumerate(found)]) if found else np.empty(0, dtype=int)
+    key = I * n + J
+    seen = np.arange(len(key))
+    best = np.lexsort((seen, -SIM, key))
+    first_of_key = np.r_[True, key[best][1:] != key[best][:-1]] if len(key) else np.empty(0, dtype=bool)
+    keep = best[first_of_key]
+    _, first_seen = np.unique(key, return_index=True)
+    keep = keep[np.argsort(first_seen, kind="stable")]
+
+    near_dup_count = len(keep)
     rate = near_dup_count / total_pairs if total_pairs > 0 else 0.0
 
-    metrics = [MetricResult("dq.redundancy.rows.near_dup_rate", "dataset", "*", float(rate), meta={"threshold": threshold})]
+    metrics = [MetricResult("dq.redundancy.rows.near_dup_rate", "dataset", "*", float(rate), meta=meta)]
     artifacts: Dict[str, str] = {}
+    if cross is not None:
+        q, cid, csim = cross
+        metrics.append(MetricResult("dq.redundancy.rows.near_dup_cross_rate", "dataset", "*", float(len(np.unique(q)) / n),
+                                    meta={"threshold": threshold, "pairs": int(len(q)), "corpus_size": len(index), "est_recall": index.recall(threshold)}))
+        if artifacts_dir is not None and len(q):
+            os.makedirs(artifacts_dir, exist_ok=True)
+            path = os.path.join(artifacts_dir, f"{ds.name}__near_duplicates_cross.csv")
+            pd.DataFrame({"i": q, "corpus_id": cid, "similarity": csim}).to_csv(path, index=False)
+            artifacts["artifact.redundancy.near_duplicates_cross"] = path
     if artifacts_dir is not None and near_dup_count > 0:
         os.makedirs(artifacts_dir, exist_ok=True)
-        import pandas as pd
-        out = pd.DataFrame([(i,j,sim,ch) for (i,j),(sim,ch) in pairmap.items()], columns=["i","j","similarity","channel"])
+        out = pd.DataFrame({"i": I[keep], "j": J[keep], "similarity": SIM[keep], "channel": [channels[k] for k in CH[keep]]})
         path = os.path.join(artifacts_dir, f"{ds.name}__near_duplicates.csv")
         out.to_csv(path, index=False)
         artifacts["artifact.redundancy.near_duplicates"] = path
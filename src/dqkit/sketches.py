@@ -0,0 +1,331 @@
+
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence
+import math
+import numpy as np
+import pandas as pd
+
+def hash_values(values: Any) -> np.ndarray:
+    """Stable 64-bit hashes of a 1D array-like (same value -> same hash in every process)."""
+    arr = values.to_numpy() if isinstance(values, pd.Series) else np.asarray(values)
+    if arr.dtype.kind not in "biufcmM":
+        arr = arr.astype(str).astype(object)
+    return pd.util.hash_array(arr)
+
+class KLLSketch:
+    """Mergeable quantile sketch (KLL compactor hierarchy) over float values.
+    Level h holds items of weight 2**h. While nothing has been compacted the sketch
+    holds every value and quantiles/ranks are exact.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        if k < 8:
+            raise ValueError("k must be >= 8")
+        self.k = int(k)
+        self.seed = seed
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._var = 0.0  # accumulated rank variance introduced by compactions
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def exact(self) -> bool:
+        return len(self.levels) == 1
+
+    @property
+    def rank_error(self) -> float:
+        """~95% bound on the normalized rank error of any quantile query (0.0 while exact)."""
+        return 0.0 if self.n == 0 else float(2.0 * math.sqrt(self._var) / self.n)
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - h - 1
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            buf = self.levels[h]
+            if len(buf) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                buf = np.sort(buf)
+                keep = buf[:len(buf) % 2]
+                buf = buf[len(keep):]
+                promoted = buf[int(self._rng.integers(2))::2]
+                self.levels[h] = keep
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                self._var += float(4 ** h)
+            h += 1
+
+    def update(self, values: Any) -> "KLLSketch":
+        v = np.asarray(values, dtype=float).ravel()
+        v = v[~np.isnan(v)]
+        if len(v):
+            self.n += len(v)
+            self.levels[0] = np.concatenate([self.levels[0], v])
+            self._compress()
+        return self
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, buf in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], buf])
+        self.n += other.n
+        self._var += other._var
+        self._compress()
+        return self
+
+    def _weighted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(b), 2.0 ** h) for h, b in enumerate(self.levels)])
+        order = np.argsort(items, kind="mergesort")
+        return items[order], weights[order]
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        qs = np.asarray(qs, dtype=float)
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        if self.exact:
+            return np.quantile(self.levels[0], qs)
+        items, w = self._weighted()
+        # place each weighted item at the centre of the ranks it stands for
+        centres = np.cumsum(w) - (w + 1.0) / 2.0
+        return np.interp(qs * (self.n - 1), centres, items)
+
+    def rank(self, x: Any) -> np.ndarray:
+        """Estimated number of values strictly less than each x."""
+        x = np.asarray(x, dtype=float)
+        if self.n == 0:
+            return np.zeros(x.shape)
+        items, w = self._weighted()
+        cw = np.concatenate(([0.0], np.cumsum(w)))
+        return cw[np.searchsorted(items, x, side="left")]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "seed": self.seed, "n": self.n, "var": self._var, "levels": [b.tolist() for b in self.levels]}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "KLLSketch":
+        sk = cls(d["k"], seed=d.get("seed"))  # dicts saved before the seed was stored have none
+        sk.n, sk._var = int(d["n"]), float(d["var"])
+        sk.levels = [np.asarray(b, dtype=float) for b in d["levels"]]
+        return sk
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch over 64-bit hashes.
+    Keeps the exact set of hashes until `sparse_limit` distinct hashes, then switches
+    to 2**p one-byte registers (relative standard error ~1.04/sqrt(2**p)).
+    """
+
+    def __init__(self, p: int = 12, sparse_limit: Optional[int] = None):
+        if not 4 <= p <= 18:
+            raise ValueError("p must be between 4 and 18")
+        self.p = int(p)
+        self.m = 1 << self.p
+        self.sparse_limit = self.m // 4 if sparse_limit is None else int(sparse_limit)
+        self.sparse: Optional[np.ndarray] = np.empty(0, dtype=np.uint64)
+        self.registers: Optional[np.ndarray] = None
+
+    @property
+    def exact(self) -> bool:
+        return self.sparse is not None
+
+    @property
+    def relative_error(self) -> float:
+        return 0.0 if self.exact else float(1.04 / math.sqrt(self.m))
+
+    def _to_dense(self) -> None:
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+        hashes, self.sparse = self.sparse, None
+        self._add_dense(hashes)
+
+    def _add_dense(self, hashes: np.ndarray) -> None:
+        bits = 64 - self.p
+        idx = (hashes >> np.uint64(bits)).astype(np.intp)
+        w = hashes & np.uint64((1 << bits) - 1)
+        # position of the leading 1-bit, computed on an exactly representable float
+        shift = max(bits - 53, 0)
+        _, e = np.frexp((w >> np.uint64(shift)).astype(float))
+        rho = np.where(w > 0, bits - shift - e + 1, bits + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rho)
+
+    def update_hashes(self, hashes: np.ndarray) -> "HyperLogLog":
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if self.sparse is not None:
+            self.sparse = np.union1d(self.sparse, hashes)
+            if len(self.sparse) > self.sparse_limit:
+                self._to_dense()
+        else:
+            self._add_dense(hashes)
+        return self
+
+    def update(self, values: Any) -> "HyperLogLog":
+        return self.update_hashes(hash_values(values))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.p != self.p:
+            raise ValueError("cannot merge HyperLogLog sketches with different p")
+        if other.sparse is not None:
+            return self.update_hashes(other.sparse)
+        if self.sparse is not None:
+            self._to_dense()
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> float:
+        if self.sparse is not None:
+            return float(len(self.sparse))
+        m = float(self.m)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(self.m, 0.7213 / (1.0 + 1.079 / m))
+        est = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(int))))
+        zeros = int((self.registers == 0).sum())
+        if est <= 2.5 * m and zeros > 0:
+            est = m * math.log(m / zeros)
+        return float(est)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"p": self.p, "sparse_limit": self.sparse_limit,
+                "sparse": None if self.sparse is None else self.sparse.tolist(),
+                "registers": None if self.registers is None else self.registers.tolist()}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "HyperLogLog":
+        sk = cls(d["p"], d["sparse_limit"])
+        sk.sparse = None if d["sparse"] is None else np.asarray(d["sparse"], dtype=np.uint64)
+        sk.registers = None if d["registers"] is None else np.asarray(d["registers"], dtype=np.uint8)
+        return sk
+
+class FrequentItems:
+    """Mergeable heavy-hitters summary (Misra-Gries / Space-Saving family).
+    Keeps at most `capacity` counters; each reported count undercounts the true one by at
+    most `max_error`, which stays 0 (exact counts) until more than `capacity` keys are seen.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = int(capacity)
+        self.n = 0
+        self.max_error = 0
+        self.counts = pd.Series(dtype="int64")
+
+    @property
+    def exact(self) -> bool:
+        return self.max_error == 0
+
+    def update_counts(self, counts: pd.Series) -> "FrequentItems":
+        """Fold in a Series of counts indexed by key (e.g. a chunk's value_counts())."""
+        counts = counts[counts > 0].astype("int64")
+        self.n += int(counts.sum())
+        merged = pd.concat([self.counts, counts]) if len(self.counts) else counts
+        if merged.index.has_duplicates:
+            merged = merged.groupby(level=0, sort=False).sum()
+        if len(merged) > self.capacity:
+            # subtract the (capacity+1)-th largest count from everything, drop non-positive
+            kth = int(np.partition(merged.to_numpy(), len(merged) - self.capacity - 1)[len(merged) - self.capacity - 1])
+            merged = merged - kth
+            merged = merged[merged > 0]
+            self.max_error += kth
+        self.counts = merged
+        return self
+
+    def update(self, values: Any) -> "FrequentItems":
+        return self.update_counts(pd.Series(values).value_counts(dropna=True))
+
+    def merge(self, other: "FrequentItems") -> "FrequentItems":
+        n, err = other.n, other.max_error
+        self.update_counts(other.counts)
+        self.n += n - int(other.counts.sum())
+        self.max_error += err
+        return self
+
+    def top(self, k: int = 10) -> pd.Series:
+        return self.counts.sort_values(ascending=False, kind="mergesort").head(k)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"capacity": self.capacity, "n": self.n, "max_error": self.max_error,
+                "keys": self.counts.index.tolist(), "counts": self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "FrequentItems":
+        sk = cls(d["capacity"])
+        sk.n, sk.max_error = int(d["n"]), int(d["max_error"])
+        sk.counts = pd.Series(d["counts"], index=d["keys"], dtype="int64")
+        return sk
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    with np.errstate(over="ignore"):
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+class EntropySketch:
+    """Mergeable Shannon-entropy sketch (Clifford & Cosma, maximally skewed 1-stable projections).
+    Each distinct value gets k pseudo-random stable draws derived from its hash; the sketch
+    keeps only k running sums, so memory is fixed whatever the cardinality.
+    """
+
+    _BLOCK = 1 << 15  # distinct values projected at a time
+
+    def __init__(self, k: int = 64, seed: int = 0):
+        self.k = int(k)
+        self.seed = int(seed)
+        self.n = 0
+        self.y = np.zeros(self.k)
+        self._salt = _splitmix64(np.arange(self.k, dtype=np.uint64) + np.uint64(self.seed) * np.uint64(self.k))
+
+    def _draws(self, hashes: np.ndarray) -> np.ndarray:
+        x = _splitmix64(hashes[:, None] ^ self._salt[None, :])
+        # two 32-bit uniforms per draw, then Chambers-Mallows-Stuck for alpha=1, beta=-1
+        u1 = ((x >> np.uint64(32)).astype(float) + 0.5) * 2.0 ** -32
+        u2 = ((x & np.uint64(0xFFFFFFFF)).astype(float) + 0.5) * 2.0 ** -32
+        w = np.pi * (u1 - 0.5)
+        half = np.pi / 2 - w
+        return (2.0 / np.pi) * (half * np.tan(w) + np.log(np.pi / 2 * -np.log(u2) * np.cos(w) / half))
+
+    def update_counts(self, hashes: np.ndarray, counts: np.ndarray) -> "EntropySketch":
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        counts = np.asarray(counts, dtype=float)
+        self.n += int(counts.sum())
+        for i in range(0, len(hashes), self._BLOCK):
+            self.y += counts[i:i + self._BLOCK] @ self._draws(hashes[i:i + self._BLOCK])
+        return self
+
+    def update(self, values: Any) -> "EntropySketch":
+        vc = pd.Series(values).value_counts(dropna=True)
+        return self.update_counts(hash_values(vc.index.to_numpy()), vc.to_numpy())
+
+    def merge(self, other: "EntropySketch") -> "EntropySketch":
+        if (other.k, other.seed) != (self.k, self.seed):
+            raise ValueError("cannot merge EntropySketch with different k/seed")
+        self.n += other.n
+        self.y += other.y
+        return self
+
+    def _terms(self) -> np.ndarray:
+        return np.exp(self.y / self.n)
+
+    def estimate(self) -> float:
+        """Entropy estimate in bits."""
+        if self.n == 0:
+            return float('nan')
+        return float(max(-(np.pi / 2) * np.log(self._terms().mean()), 0.0) / np.log(2))
+
+    @property
+    def std_error(self) -> float:
+        """Delta-method standard error of `estimate()` in bits."""
+        if self.n == 0:
+            return float('nan')
+        t = self._terms()
+        return float((np.pi / 2) * t.std(ddof=1) / (np.sqrt(self.k) * t.mean()) / np.log(2))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "seed": self.seed, "n": self.n, "y": self.y.tolist()}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "EntropySketch":
+        sk = cls(d["k"], d["seed"])
+        sk.n, sk.y = int(d["n"]), np.asarray(d["y"], dtype=float)
+        return sk
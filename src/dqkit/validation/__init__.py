@@ -1,2 +1,5 @@
 from .validation import validate, build_spec
-__all__=['validate','build_spec']
+from .plan import compile_spec, ValidationPlan
+from .stream import validate_csv
+from .keys import KeyIndex
+__all__=['validate','build_spec','compile_spec','ValidationPlan','validate_csv','KeyIndex']
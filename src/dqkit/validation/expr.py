@@ -0,0 +1,185 @@
+
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+import ast
+import io
+import operator
+import re
+import tokenize
+import numpy as np
+import pandas as pd
+
+try:
+    import numexpr as _ne
+except Exception:  # pragma: no cover
+    _ne = None
+
+_BACKTICK = re.compile(r"`([^`]*)`")
+
+def _replace_booleans(source: str) -> str:
+    """`&` -> `and`, `|` -> `or` at the token level, so that they bind looser than
+    comparisons as in pandas' own parser (`a > 0 | b > 2` is `(a > 0) | (b > 2)`)."""
+    toks = []
+    for tok in tokenize.generate_tokens(io.StringIO(source).readline):
+        if tok.type == tokenize.OP and tok.string in ("&", "|"):
+            toks.append((tokenize.NAME, "and" if tok.string == "&" else "or"))
+        else:
+            toks.append((tok.type, tok.string))
+    return tokenize.untokenize(toks)
+
+_BINOPS = {ast.Add: (operator.add, "+"), ast.Sub: (operator.sub, "-"), ast.Mult: (operator.mul, "*"),
+           ast.Div: (operator.truediv, "/"), ast.Mod: (operator.mod, "%"), ast.Pow: (operator.pow, "**"),
+           ast.FloorDiv: (operator.floordiv, None), ast.BitAnd: (operator.and_, "&"), ast.BitOr: (operator.or_, "|")}
+_CMPOPS = {ast.Eq: (operator.eq, "=="), ast.NotEq: (operator.ne, "!="), ast.Lt: (operator.lt, "<"),
+           ast.LtE: (operator.le, "<="), ast.Gt: (operator.gt, ">"), ast.GtE: (operator.ge, ">=")}
+
+class CrossFieldExpr:
+    """A cross-field rule expression parsed once and evaluated column-wise.
+    Supports the pandas-style subset used in specs: column names (backticks for names
+    that are not identifiers), number/string/bool constants, arithmetic, comparisons
+    (chained too), `&`/`|`/`~`, `and`/`or`/`not`, and `in`/`not in` with a literal list.
+    As in pandas, `&` and `|` are the element-wise `and`/`or` and bind looser than comparisons.
+    Parse errors are kept in `error` instead of raising, so a spec still compiles.
+    Comparisons over numeric arithmetic run through numexpr when it is installed (no
+    temporary per sub-expression); everything else uses NumPy, or pandas operators for
+    string/datetime columns.
+    """
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        self.error: Optional[str] = None
+        self.columns: List[Any] = []
+        self._names: Dict[str, Any] = {}
+        self._aliases: List[str] = []
+        self._tree: Optional[ast.AST] = None
+        self._ne_nodes: Dict[int, str] = {}
+        try:
+            source = _replace_booleans(_BACKTICK.sub(self._alias, expr).strip())
+            self._tree = ast.parse(source, mode="eval").body
+            self._check(self._tree)
+        except (SyntaxError, tokenize.TokenError) as e:
+            self.error = f"syntax error: {e.msg if isinstance(e, SyntaxError) else e.args[0]}"
+            self._tree = None
+        except ValueError as e:
+            self.error = str(e)
+            self._tree = None
+
+    def _alias(self, m: "re.Match") -> str:
+        alias = f"__col{len(self._names)}"
+        self._names[alias] = m.group(1)
+        return alias
+
+    def _check(self, node: ast.AST) -> Optional[str]:
+        """Validate the tree, collect column names and return the numexpr source of the
+        subtree (None when it needs the NumPy evaluator). Comparisons over arithmetic are
+        remembered for numexpr; plain comparisons and &/| are as fast in NumPy."""
+        if isinstance(node, ast.Name):
+            if node.id not in self._aliases:
+                self._aliases.append(node.id)
+                self.columns.append(self._names.get(node.id, node.id))
+            return node.id
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or isinstance(node.value, (int, float)):
+                return repr(node.value)
+            if isinstance(node.value, str) or node.value is None:
+                return None
+            raise ValueError(f"unsupported constant {node.value!r}")
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+            left, right = self._check(node.left), self._check(node.right)
+            sym = _BINOPS[type(node.op)][1]
+            return None if None in (left, right, sym) else f"({left} {sym} {right})"
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd, ast.Invert, ast.Not)):
+            inner = self._check(node.operand)
+            sym = {ast.USub: "-", ast.UAdd: "+", ast.Invert: "~", ast.Not: "~"}[type(node.op)]
+            return None if inner is None else f"({sym}{inner})"
+        if isinstance(node, ast.BoolOp):
+            parts = [self._check(v) for v in node.values]
+            sym = " & " if isinstance(node.op, ast.And) else " | "
+            return None if None in parts else "(" + sym.join(parts) + ")"
+        if isinstance(node, ast.Compare):
+            parts = [self._check(node.left)]
+            for op, comp in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.In, ast.NotIn)):
+                    if not isinstance(comp, (ast.List, ast.Tuple, ast.Set)) or not all(isinstance(e, ast.Constant) for e in comp.elts):
+                        raise ValueError("'in' needs a literal list of constants")
+                    parts.append(None)
+                elif type(op) in _CMPOPS:
+                    parts.append(self._check(comp))
+                else:
+                    raise ValueError(f"unsupported comparison {type(op).__name__}")
+            if None in parts:
+                return None
+            syms = [_CMPOPS[type(op)][1] for op in node.ops]
+            pairs = [f"({parts[i]} {syms[i]} {parts[i + 1]})" for i in range(len(syms))]
+            source = "(" + " & ".join(pairs) + ")"
+            if any(isinstance(n, ast.BinOp) for n in ast.walk(node)):
+                self._ne_nodes[id(node)] = source
+            return source
+        raise ValueError(f"unsupported syntax {type(node).__name__}")
+
+    def missing_columns(self, columns: Any) -> List[Any]:
+        return [c for c in self.columns if c not in columns]
+
+    def evaluate(self, df: pd.DataFrame) -> np.ndarray:
+        """Boolean pass mask over the rows of `df`; nulls compare as False."""
+        env = {alias: _column_values(df[col]) for alias, col in zip(self._aliases, self.columns)}
+        out = self._eval(self._tree, env)
+        if np.ndim(out) == 0:
+            return np.full(len(df), bool(out))
+        out = pd.Series(out)
+        if not pd.api.types.is_bool_dtype(out.dtype):
+            raise TypeError(f"expression evaluates to {out.dtype}, not a boolean mask")
+        # nullable boolean results: NA fails the rule
+        return out.fillna(False).to_numpy(dtype=bool)
+
+    def _eval(self, node: ast.AST, env: Dict[str, Any]) -> Any:
+        if isinstance(node, ast.Name):
+            return env[node.id]
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.BinOp):
+            return _BINOPS[type(node.op)][0](self._eval(node.left, env), self._eval(node.right, env))
+        if isinstance(node, ast.UnaryOp):
+            v = self._eval(node.operand, env)
+            if isinstance(node.op, ast.USub):
+                return -v
+            if isinstance(node.op, ast.UAdd):
+                return v
+            return ~v if not isinstance(v, bool) else (not v)
+        if isinstance(node, ast.BoolOp):
+            out = self._eval(node.values[0], env)
+            for v in node.values[1:]:
+                out = (out & self._eval(v, env)) if isinstance(node.op, ast.And) else (out | self._eval(v, env))
+            return out
+        if isinstance(node, ast.Compare):
+            source = self._ne_nodes.get(id(node))
+            if _ne is not None and source is not None:
+                names = {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}
+                local = {k: env[k] for k in names}
+                if all(isinstance(v, np.ndarray) for v in local.values()):
+                    return _ne.evaluate(source, local_dict=local)
+            left = self._eval(node.left, env)
+            out = None
+            for op, comp in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.In, ast.NotIn)):
+                    values = [e.value for e in comp.elts]
+                    res = pd.Series(left).isin(values).to_numpy() if np.ndim(left) else (left in values)
+                    if isinstance(op, ast.NotIn):
+                        res = ~res if np.ndim(res) else (not res)
+                    right = None
+                else:
+                    right = self._eval(comp, env)
+                    res = _CMPOPS[type(op)][0](left, right)
+                out = res if out is None else (out & res)
+                left = right
+            return out
+        raise ValueError(f"unsupported syntax {type(node).__name__}")  # pragma: no cover
+
+def _column_values(s: pd.Series) -> Any:
+    """NumPy values for numeric and bool columns; other columns stay Series so that null
+    and string/datetime comparisons follow pandas semantics."""
+    if isinstance(s.dtype, np.dtype) and s.dtype.kind in "biuf":
+        return s.to_numpy()
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return s.to_numpy(dtype=float, na_value=np.nan)
+    return s.reset_index(drop=True)
@@ -0,0 +1,82 @@
+
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+# fingerprinted reference indexes kept for reuse across compile_spec/validate calls
+_CACHE_SIZE = 8
+_CACHE: "OrderedDict[Any, KeyIndex]" = OrderedDict()
+
+_INT_MAX = np.iinfo(np.int64).max
+
+def _exact_parts(s: pd.Series) -> List[Any]:
+    """A numeric key column as (int64 part, float remainder): integral values go in the
+    int64 part exactly (so int and float columns of equal values agree without int64
+    keys above 2**53 collapsing), anything else (fractions, NaN/NA, huge values) in the
+    remainder."""
+    if not pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s) or pd.api.types.is_complex_dtype(s):
+        return [s]
+    if pd.api.types.is_integer_dtype(s):
+        na = s.isna().to_numpy()
+        if pd.api.types.is_unsigned_integer_dtype(s):
+            u = s.to_numpy(dtype="uint64", na_value=0)
+            big = u > _INT_MAX
+            return [np.where(big, 0, u).astype(np.int64), np.where(na, np.nan, np.where(big, u.astype(float), 0.0))]
+        return [s.to_numpy(dtype="int64", na_value=0), np.where(na, np.nan, 0.0)]
+    v = s.to_numpy(dtype=float, na_value=np.nan)
+    with np.errstate(invalid="ignore"):
+        integral = np.isfinite(v) & (v == np.floor(v)) & (np.abs(v) < 2.0 ** 63)
+    return [np.where(integral, v, 0.0).astype(np.int64), np.where(integral, 0.0, v)]
+
+def _hash_frame(frame: pd.DataFrame) -> np.ndarray:
+    parts = [p for _, s in frame.items() for p in _exact_parts(s)]
+    exact = pd.DataFrame({i: p for i, p in enumerate(parts)}, index=frame.index)
+    return pd.util.hash_pandas_object(exact, index=False).to_numpy()
+
+class KeyIndex:
+    """Membership index over the distinct key tuples of a reference table.
+    Keys are stored as a sorted array of 64-bit row hashes (numeric values compared
+    exactly, so int and float keys of equal value agree; NaN keys match NaN like `merge`),
+    probed with one vectorized binary search.
+    """
+
+    def __init__(self, reference: pd.DataFrame, columns: Optional[Sequence[Any]] = None):
+        cols = list(reference.columns if columns is None else columns)
+        self.columns: List[Any] = cols
+        self.hashes = np.unique(_hash_frame(reference[cols]))
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def contains(self, frame: pd.DataFrame) -> np.ndarray:
+        """Boolean mask of the rows of `frame` (key columns in index order) found in the index."""
+        h = _hash_frame(frame)
+        if len(self.hashes) == 0:
+            return np.zeros(len(h), dtype=bool)
+        pos = np.minimum(np.searchsorted(self.hashes, h), len(self.hashes) - 1)
+        return self.hashes[pos] == h
+
+def key_index(reference: Any, columns: Sequence[Any], fingerprint: Optional[str] = None) -> KeyIndex:
+    """KeyIndex of `reference[columns]`. With an explicit `fingerprint` it is cached
+    across calls under that fingerprint (so a reloaded but unchanged table is not
+    re-indexed; pass a new fingerprint when the table changes). Without one the index is
+    rebuilt, since a frame edited in place cannot be told apart from the indexed one.
+    A prebuilt KeyIndex is returned as is.
+    """
+    if isinstance(reference, KeyIndex):
+        return reference
+    cols = tuple(columns)
+    if fingerprint is None:
+        return KeyIndex(reference, cols)
+    key = (fingerprint, cols)
+    idx = _CACHE.get(key)
+    if idx is not None:
+        _CACHE.move_to_end(key)
+        return idx
+    idx = KeyIndex(reference, cols)
+    _CACHE[key] = idx
+    while len(_CACHE) > _CACHE_SIZE:
+        _CACHE.popitem(last=False)
+    return idx
@@ -0,0 +1,347 @@
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Pattern
+import re
+import numpy as np
+import pandas as pd
+from ..types import Dataset, MetricResult, RunReport
+from ..capture import Capture, CaptureConfig
+from .validation import _check_dtype, _check_monotonic, _slug
+from .expr import CrossFieldExpr
+from .keys import KeyIndex, _hash_frame, key_index
+
+_MISSING = object()
+# domain rules (allowed_values, regex) run once per distinct value when a strided sample
+# of the column shows at most this share of distinct values
+_DOMAIN_SAMPLE = 10_000
+_DOMAIN_MAX_RATIO = 0.2
+
+class _FailureSink:
+    """Routes violation rows of one run to a Capture; a key written again is appended to.
+    With an explicit CaptureConfig the exact failure and captured row counts are also
+    added to the meta of the rule's metric."""
+
+    def __init__(self, artifacts_dir: Optional[str], ds_name: str, capture: Optional[CaptureConfig] = None):
+        self.ds_name = ds_name
+        self.report_counts = capture is not None
+        self.capture = Capture(artifacts_dir, capture)
+
+    def write(self, key: str, slug: str, frame: pd.DataFrame) -> None:
+        self.capture.add(key, f"{_slug(self.ds_name)}__{slug}", frame)
+
+    def meta(self, key: str) -> Dict[str, int]:
+        return self.capture.counts(key) if self.report_counts else {}
+
+    def close(self) -> Dict[str, str]:
+        return self.capture.close()
+
+    def abort(self) -> None:
+        self.capture.abort()
+
+def _domain_codes(s: pd.Series):
+    """(codes, uniques) of a low-cardinality column, or None to evaluate row by row.
+    Categorical columns use their own codes; nulls get code -1."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.codes.to_numpy(), pd.Series(s.cat.categories)
+    n = len(s)
+    if n > _DOMAIN_SAMPLE:
+        sample = s.iloc[np.linspace(0, n - 1, _DOMAIN_SAMPLE).astype(np.intp)]
+        if sample.nunique() > _DOMAIN_MAX_RATIO * _DOMAIN_SAMPLE:
+            return None
+    codes, uniques = pd.factorize(s)
+    return codes, pd.Series(uniques)
+
+def _string_domain(s: pd.Series, domain):
+    """`domain` for regex checks. Factorizing an object column merges values that compare
+    equal but print differently (1, True, 1.0), so mixed columns are refactorized on
+    their string form."""
+    if s.dtype != object or pd.api.types.infer_dtype(domain[1], skipna=True) == "string":
+        return domain
+    codes, uniques = pd.factorize(s.astype(str).where(s.notna()))
+    return codes, pd.Series(uniques)
+
+def _broadcast(ok_unique: np.ndarray, codes: np.ndarray, null_value: bool) -> np.ndarray:
+    # code -1 (null) picks the appended last entry
+    return np.append(ok_unique.astype(bool), null_value)[codes]
+
+def _has_duplicate_hashes(parts: List[np.ndarray]) -> bool:
+    if not parts:
+        return False
+    h = np.concatenate(parts)
+    return len(np.unique(h)) != len(h)
+
+def _track_hashes(parts: List[np.ndarray], h: np.ndarray) -> bool:
+    """Add one chunk's hashes; every 32 chunks they are compacted into one sorted array.
+    Returns False once a duplicate has been seen in a compaction."""
+    parts.append(h)
+    if len(parts) < 32:
+        return True
+    merged = np.sort(np.concatenate(parts))
+    parts[:] = [merged]
+    return not (len(merged) > 1 and bool((merged[1:] == merged[:-1]).any()))
+
+@dataclass
+class _ColumnState:
+    """Running counts of one column's rules; folded per chunk, turned into metrics at the end."""
+    n: int = 0
+    n_null: int = 0
+    dtype_ok: bool = True
+    dtypes: List[str] = field(default_factory=list)
+    min_pass: int = 0
+    max_pass: int = 0
+    allowed_pass: int = 0
+    regex_pass: int = 0
+    mono_ok: bool = True
+    mono_last: Any = _MISSING
+    unique_ok: bool = True
+    hashes: List[np.ndarray] = field(default_factory=list)
+
+@dataclass
+class _ColumnPlan:
+    """All rules of one column, evaluated together in a single pass over the column."""
+    col: Any
+    dtype: Optional[str] = None
+    nullable: Optional[bool] = None
+    min: Any = _MISSING
+    max: Any = _MISSING
+    allowed: Optional[List[Any]] = None
+    pattern: Optional[Pattern] = None
+    monotonic: Optional[str] = None
+    unique: bool = False
+
+    def fold(self, st: _ColumnState, s: pd.Series, sink: _FailureSink, streaming: bool = False) -> None:
+        col = self.col
+        # shared null mask and non-null view for every rule of the column
+        null_mask = s.isna()
+        n_null = int(null_mask.sum())
+        nn = s[~null_mask] if n_null else s
+        n = len(s)
+        st.n += n
+        st.n_null += n_null
+
+        if self.dtype is not None:
+            st.dtype_ok = st.dtype_ok and _check_dtype(nn, self.dtype)
+            if str(s.dtype) not in st.dtypes:
+                st.dtypes.append(str(s.dtype))
+
+        if self.min is not _MISSING:
+            st.min_pass += int((nn >= self.min).sum())
+
+        if self.max is not _MISSING:
+            st.max_pass += int((nn <= self.max).sum())
+
+        domain = _domain_codes(s) if self.allowed is not None or self.pattern is not None else None
+
+        if self.allowed is not None:
+            if domain is not None:
+                codes, uniques = domain
+                in_dom = _broadcast(uniques.isin(self.allowed).to_numpy(), codes, True)
+            else:
+                in_dom = (s.isin(self.allowed) | null_mask).to_numpy()
+            st.allowed_pass += int(in_dom.sum())
+            sink.write(f"violations.allowed_values.{col}", f"allowed_values_{col}", s[~in_dom].to_frame())
+
+        if self.pattern is not None:
+            if domain is not None:
+                codes, uniques = _string_domain(s, domain)
+                full_mask = _broadcast(uniques.astype(str).str.match(self.pattern).to_numpy(dtype=bool), codes, False)
+            else:
+                full_mask = np.zeros(n, dtype=bool)
+                full_mask[~null_mask.to_numpy()] = nn.astype(str).str.match(self.pattern).to_numpy(dtype=bool)
+            st.regex_pass += int(full_mask.sum())
+            sink.write(f"violations.regex.{col}", f"regex_{col}", s[~full_mask].to_frame())
+
+        if self.monotonic is not None and len(nn):
+            ok = _check_monotonic(nn, self.monotonic)
+            if st.mono_last is not _MISSING:
+                # the boundary pair between the previous chunk and this one
+                ok = ok and _check_monotonic(pd.Series([st.mono_last, nn.iloc[0]]), self.monotonic)
+            st.mono_ok = st.mono_ok and ok
+            st.mono_last = nn.iloc[-1]
+
+        if self.unique and st.unique_ok:
+            st.unique_ok = n_null == 0 and s.nunique(dropna=False) == n
+            if streaming and st.unique_ok:
+                st.unique_ok = _track_hashes(st.hashes, _hash_frame(s.to_frame()))
+            if not st.unique_ok:
+                st.hashes.clear()
+
+    def finish(self, st: _ColumnState, sink: _FailureSink) -> List[MetricResult]:
+        col = self.col
+        n, n_nn = st.n, st.n - st.n_null
+        out: List[MetricResult] = []
+        if self.dtype is not None:
+            out.append(MetricResult(f"dq.validation.dtype.{col}", "column", col, float(st.dtype_ok), unit="bool", meta={"expected": self.dtype, "actual": ",".join(st.dtypes)}))
+        if self.nullable is not None:
+            null_rate = float(st.n_null / n) if n else float('nan')
+            ok = (self.nullable or null_rate == 0.0)
+            out.append(MetricResult(f"dq.validation.nullable.{col}", "column", col, float(ok), unit="bool", meta={"null_rate": null_rate, "allowed": self.nullable}))
+        if self.min is not _MISSING:
+            out.append(MetricResult(f"dq.validation.min.{col}", "column", col, float(st.min_pass / n_nn) if n_nn else 1.0, unit="pass_ratio", meta={"threshold": self.min}))
+        if self.max is not _MISSING:
+            out.append(MetricResult(f"dq.validation.max.{col}", "column", col, float(st.max_pass / n_nn) if n_nn else 1.0, unit="pass_ratio", meta={"threshold": self.max}))
+        if self.allowed is not None:
+            out.append(MetricResult(f"dq.validation.allowed_values.{col}", "column", col, float(st.allowed_pass / n) if n else float('nan'), unit="pass_ratio", meta={"allowed_values": list(self.allowed), **sink.meta(f"violations.allowed_values.{col}")}))
+        if self.pattern is not None:
+            out.append(MetricResult(f"dq.validation.regex.{col}", "column", col, float(st.regex_pass / n) if n else 1.0, unit="pass_ratio", meta={"pattern": self.pattern.pattern, **sink.meta(f"violations.regex.{col}")}))
+        if self.monotonic is not None:
+            out.append(MetricResult(f"dq.validation.monotonic.{col}", "column", col, float(st.mono_ok), unit="bool", meta={"mode": self.monotonic}))
+        if self.unique:
+            unique_bool = st.unique_ok and not _has_duplicate_hashes(st.hashes)
+            out.append(MetricResult(f"dq.validation.unique.{col}", "column", col, float(unique_bool), unit="bool"))
+        return out
+
+@dataclass
+class _PlanState:
+    columns: List[Optional[_ColumnState]]
+    composite_ok: List[bool]
+    composite_hashes: List[List[np.ndarray]]
+    cross_field: List[List[Any]]  # [passed, rows, (error_kind, message) or None]
+    foreign_keys: List[List[int]]
+
+@dataclass
+class ValidationPlan:
+    """A validation spec compiled once and reusable across many Datasets.
+    Build with `compile_spec(spec)`; call `plan(ds)` / `plan.run(ds)` for the same
+    `dq.validation.*` metrics as `validate(ds, spec)`. Reference tables of foreign-key
+    rules are indexed at compile time, so later in-place changes to them are not seen.
+    Rules keep running counts (`start`/`fold`/`finish`), so a plan can also validate
+    data chunk by chunk (see `validate_csv`).
+    """
+    columns: List[_ColumnPlan] = field(default_factory=list)
+    composite_unique: List[List[str]] = field(default_factory=list)
+    cross_field: List[Dict[str, Any]] = field(default_factory=list)
+    foreign_keys: List[Dict[str, Any]] = field(default_factory=list)
+
+    def start(self, df_columns: Any) -> _PlanState:
+        return _PlanState(
+            columns=[_ColumnState() if cp.col in df_columns else None for cp in self.columns],
+            composite_ok=[True for _ in self.composite_unique],
+            composite_hashes=[[] for _ in self.composite_unique],
+            cross_field=[[0, 0, None] for _ in self.cross_field],
+            foreign_keys=[[0, 0] for _ in self.foreign_keys],
+        )
+
+    def fold(self, state: _PlanState, df: pd.DataFrame, sink: _FailureSink, streaming: bool = False) -> None:
+        for cp, st in zip(self.columns, state.columns):
+            if st is not None:
+                cp.fold(st, df[cp.col], sink, streaming=streaming)
+
+        for idx, cols in enumerate(self.composite_unique):
+            dup_groups = df.duplicated(subset=cols, keep=False)
+            state.composite_ok[idx] = state.composite_ok[idx] and not bool(dup_groups.any())
+            if streaming:
+                # duplicates spanning chunks are found from row hashes; rows are written in a second pass
+                if not _track_hashes(state.composite_hashes[idx], _hash_frame(df[cols])):
+                    state.composite_ok[idx] = False
+            else:
+                sink.write(f"violations.composite_unique[{','.join(cols)}]", f"composite_unique_{idx}", df.loc[dup_groups, cols])
+
+        for idx, rule in enumerate(self.cross_field):
+            acc, compiled, name = state.cross_field[idx], rule["compiled"], rule["name"]
+            if acc[2] is not None:
+                continue
+            if compiled.error is not None:
+                acc[2] = ("parse", compiled.error)
+                continue
+            missing = compiled.missing_columns(df.columns)
+            if missing:
+                acc[2] = ("column", f"unknown columns: {missing}")
+                continue
+            try:
+                mask = compiled.evaluate(df)
+            except Exception as e:
+                acc[2] = ("eval", f"{type(e).__name__}: {e}")
+                continue
+            acc[0] += int(mask.sum())
+            acc[1] += len(df)
+            sink.write(f"violations.cross_field[{name}]", f"cross_field_{_slug(name)}", df.loc[~mask])
+
+        for idx, fk in enumerate(self.foreign_keys):
+            cols, name = fk["columns"], fk["name"]
+            ok_mask = fk["index"].contains(df[cols])
+            state.foreign_keys[idx][0] += int(ok_mask.sum())
+            state.foreign_keys[idx][1] += len(df)
+            sink.write(f"violations.foreign_key[{name}]", f"foreign_key_{_slug(name)}", df.loc[~ok_mask, cols])
+
+    def finish(self, state: _PlanState, ds_name: str, sink: _FailureSink) -> RunReport:
+        metrics: List[MetricResult] = []
+        for cp, st in zip(self.columns, state.columns):
+            if st is None:
+                metrics.append(MetricResult(f"dq.validation.exists.{cp.col}", "column", cp.col, 0.0, unit="bool", meta={"reason":"missing_column"}))
+            else:
+                metrics.extend(cp.finish(st, sink))
+        for idx, cols in enumerate(self.composite_unique):
+            unique_bool = state.composite_ok[idx] and not _has_duplicate_hashes(state.composite_hashes[idx])
+            name = ",".join(cols)
+            metrics.append(MetricResult(f"dq.validation.composite_unique[{name}]", "dataset", cols, float(unique_bool), unit="bool", meta=sink.meta(f"violations.composite_unique[{name}]")))
+        for rule, (passed, rows, error) in zip(self.cross_field, state.cross_field):
+            meta = {"expr": rule["expr"], **sink.meta(f"violations.cross_field[{rule['name']}]")}
+            if error is not None:
+                # the rule could not be checked: NaN, with the reason kept apart from data failures
+                pass_ratio = float('nan')
+                meta.update({"error_kind": error[0], "error": error[1]})
+            else:
+                pass_ratio = float(passed / rows) if rows else float('nan')
+            metrics.append(MetricResult(f"dq.validation.cross_field[{rule['name']}]", "dataset", rule["name"], pass_ratio, unit="pass_ratio", meta=meta))
+        for fk, (passed, rows) in zip(self.foreign_keys, state.foreign_keys):
+            pass_ratio = float(passed / rows) if rows else float('nan')
+            metrics.append(MetricResult(f"dq.validation.foreign_key[{fk['name']}]", "dataset", fk["name"], pass_ratio, unit="pass_ratio", meta=sink.meta(f"violations.foreign_key[{fk['name']}]")))
+        return RunReport(metrics=metrics, artifacts=sink.close(), meta={"dataset": ds_name})
+
+    def run(self, ds: Dataset, artifacts_dir: Optional[str] = None, capture: Optional[CaptureConfig] = None) -> RunReport:
+        """Validate `ds`; `capture` caps/samples the violation rows written to `artifacts_dir`."""
+        sink = _FailureSink(artifacts_dir, ds.name, capture)
+        try:
+            state = self.start(ds.df.columns)
+            self.fold(state, ds.df, sink)
+            return self.finish(state, ds.name, sink)
+        except BaseException:
+            # no partial artifacts or live writer thread after a failing rule
+            sink.abort()
+            raise
+
+    __call__ = run
+
+def compile_spec(spec: Dict[str, Any]) -> ValidationPlan:
+    """Compile a spec (see `build_spec`) into a reusable ValidationPlan.
+    Regexes and cross-field expressions are parsed, allowed-value domains materialized and foreign-key reference
+    keys indexed once, instead of on every `validate()` call. Rules with a `fingerprint`
+    also share their reference index across calls (a new fingerprint re-indexes a changed
+    table); a prebuilt `KeyIndex` may be given as `reference`.
+    """
+    plan = ValidationPlan()
+    for col, rules in spec.get("columns", {}).items():
+        cp = _ColumnPlan(col=col)
+        if "dtype" in rules:
+            cp.dtype = rules["dtype"]
+        if "nullable" in rules:
+            cp.nullable = bool(rules["nullable"])
+        if "min" in rules:
+            cp.min = rules["min"]
+        if "max" in rules:
+            cp.max = rules["max"]
+        if "allowed_values" in rules:
+            cp.allowed = list(set(rules["allowed_values"]))
+        if "regex" in rules:
+            cp.pattern = re.compile(rules["regex"])
+        if "monotonic" in rules:
+            cp.monotonic = str(rules["monotonic"])
+        cp.unique = bool(rules.get("unique"))
+        plan.columns.append(cp)
+
+    plan.composite_unique = [list(cols) for cols in (spec.get("composite_unique", []) or [])]
+    for rule in (spec.get("cross_field", []) or []):
+        plan.cross_field.append({"expr": rule["expr"], "name": rule.get("name", rule["expr"]), "compiled": CrossFieldExpr(rule["expr"])})
+    for fk in (spec.get("foreign_keys", []) or []):
+        cols = list(fk["columns"])
+        ref = fk["reference"]
+        ref_cols = list(fk.get("ref_columns", ref.columns if isinstance(ref, KeyIndex) else cols))
+        plan.foreign_keys.append({
+            "columns": cols,
+            "ref_columns": ref_cols,
+            "name": fk.get("name", f"fk({','.join(cols)})->ref({','.join(ref_cols)})"),
+            "index": key_index(ref, ref_cols, fingerprint=fk.get("fingerprint")),
+        })
+    return plan
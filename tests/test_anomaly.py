@@ -22,3 +22,58 @@ def test_anomaly_iforest(tmp_path):
     rep = score_outliers(Dataset(df, name="iforest"), method="iforest", contamination=0.03, artifacts_dir=str(tmp_path))
     m = {mm.id: mm.value for mm in rep.metrics}
     assert m["dq.anomaly.rate"] > 0.0
+
+def test_outlier_model_fit_save_score(tmp_path):
+    from dqkit.anomaly import OutlierModel
+    rng = np.random.default_rng(0)
+    ref = pd.DataFrame({"x": rng.normal(0, 1, 1000), "y": rng.normal(5, 2, 1000), "s": ["a"] * 1000})
+    ref.loc[::10, "x"] = np.nan
+    model = OutlierModel.fit(ref, contamination=0.02)
+    assert model.columns == ["x", "y"]
+    fitted = score_outliers(Dataset(ref), contamination=0.02)
+    assert model.threshold == {m.id: m.value for m in fitted.metrics}["dq.anomaly.threshold"]
+    model.save(str(tmp_path / "model.npz"))
+    loaded = OutlierModel.load(str(tmp_path / "model.npz"))
+    batch = pd.DataFrame({"x": [0.0, 0.5, 50.0, np.nan], "y": [5.0, 4.0, 5.0, 40.0]})
+    s = loaded.score(batch)
+    assert np.array_equal(s, model.score(batch))
+    assert s[2] > 0.99 and s[3] > 0.99 and s[0] < 0.5
+    rep = score_outliers(Dataset(batch, name="b"), model=loaded, artifacts_dir=str(tmp_path))
+    m = {mm.id: mm.value for mm in rep.metrics}
+    assert m["dq.anomaly.threshold"] == model.threshold and m["dq.anomaly.rate"] == 0.5
+    assert "dq.anomaly.score.x" in m
+
+def test_anomaly_stream_matches_in_memory(tmp_path):
+    rng = np.random.default_rng(1)
+    n = 1500
+    df = pd.DataFrame({"x": rng.normal(0, 1, n), "y": rng.standard_t(2, n), "s": ["a"] * n})
+    df.loc[::9, "x"] = np.nan
+    ref = score_outliers(Dataset(df, name="mem"), contamination=0.05, artifacts_dir=str(tmp_path))
+    rep = score_outliers(Dataset(df, name="stream"), contamination=0.05, artifacts_dir=str(tmp_path), chunksize=128, n_jobs=2)
+    assert rep.meta["mode"] == "stream"
+    assert np.allclose([m.value for m in rep.metrics], [m.value for m in ref.metrics])
+    a = pd.read_csv(ref.artifacts["artifact.anomaly.rows"])
+    b = pd.read_csv(rep.artifacts["artifact.anomaly.rows"])
+    assert len(b) == len(a) == 75 and b["dq_anomaly_score"].is_monotonic_decreasing
+    assert np.allclose(np.sort(a["dq_anomaly_score"]), np.sort(b["dq_anomaly_score"]))
+    top = score_outliers(Dataset(df, name="top"), contamination=0.05, artifacts_dir=str(tmp_path), chunksize=128, top_k=10)
+    assert len(pd.read_csv(top.artifacts["artifact.anomaly.rows"])) == 10
+
+def test_outlier_model_save_keeps_column_name_types(tmp_path):
+    from dqkit.anomaly import OutlierModel
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame(rng.normal(size=(200, 3)))  # integer column names 0, 1, 2
+    df["x"] = rng.normal(size=200)
+    model = OutlierModel.fit(df)
+    model.save(str(tmp_path / "m.npz"))
+    loaded = OutlierModel.load(str(tmp_path / "m.npz"))
+    assert loaded.columns == [0, 1, 2, "x"]
+    assert np.array_equal(loaded.score(df), model.score(df))
+    rep = score_outliers(Dataset(df), model=loaded)
+    assert "dq.anomaly.score.0" in {mm.id for mm in rep.metrics}
+    tupled = pd.DataFrame(rng.normal(size=(50, 2)), columns=pd.MultiIndex.from_tuples([("a", 1), ("a", 2)]))
+    try:
+        OutlierModel.fit(tupled).save(str(tmp_path / "t.npz"))
+        assert False, "tuple names do not survive a save"
+    except ValueError:
+        pass
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dqkit.capture import Capture, CaptureConfig
+from dqkit.types import Dataset
+from dqkit.validation import build_spec, validate
+from dqkit.redundancy import find_duplicates
+
+def test_capture_caps_rows_and_keeps_exact_counts(tmp_path):
+    df = pd.DataFrame({"age": np.arange(1000) % 200})
+    spec = build_spec()
+    spec["columns"] = {"age": {"allowed_values": list(range(100))}}
+    cfg = CaptureConfig(max_rows=25, sample="reservoir", seed=1)
+    out = validate(Dataset(df, name="t"), spec, artifacts_dir=str(tmp_path), capture=cfg)
+    m = out.metrics[0]
+    assert m.value == 0.5
+    assert m.meta["failures"] == 500 and m.meta["captured"] == 25
+    rows = pd.read_csv(out.artifacts["violations.allowed_values.age"])
+    assert len(rows) == 25 and (rows["age"] >= 100).all()
+    # a random sample, written in the original row order
+    assert rows["age"].nunique() > 10
+
+def test_capture_first_n_across_chunks(tmp_path):
+    cap = Capture(str(tmp_path), CaptureConfig(max_rows=5, background=False))
+    for start in range(0, 12, 4):
+        cap.add("k", "part", pd.DataFrame({"x": range(start, start + 4)}))
+    arts = cap.close()
+    assert pd.read_csv(arts["k"])["x"].tolist() == [0, 1, 2, 3, 4]
+    assert cap.counts("k") == {"failures": 12, "captured": 5}
+    dups = pd.DataFrame({"a": [1, 1, 2, 2, 3]})
+    out = find_duplicates(Dataset(dups, name="d"), artifacts_dir=str(tmp_path), capture=CaptureConfig(max_rows=3))
+    assert out.metrics[0].meta == {"failures": 4, "captured": 3}
+
+def test_capture_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    cap = Capture(str(tmp_path), CaptureConfig(format="parquet"))
+    cap.add("k", "part", pd.DataFrame({"x": [1, 2], "s": ["a", "b"]}))
+    cap.add("k", "part", pd.DataFrame({"x": [3], "s": ["c"]}))
+    path = cap.close()["k"]
+    assert path.endswith(".parquet")
+    assert pd.read_parquet(path)["x"].tolist() == [1, 2, 3]
@@ -19,3 +19,36 @@ def test_simulate_rebalance_uniform():
     plan = simulate_rebalance(counts, target="uniform")
     assert plan["total_added"] == (100-20) + (100-5)
     assert plan["target"]["1"] == 100 and plan["target"]["2"] == 100
+
+def test_label_counts_stream_matches_in_memory_and_rarity_summary(tmp_path):
+    import numpy as np
+    from dqkit.imbalance import LabelCounts, measure_imbalance_counts
+    rng = np.random.default_rng(0)
+    y = pd.Series(rng.zipf(1.3, 5000) % 1500, dtype=object)
+    y[::40] = None
+    full = measure_imbalance(Dataset(pd.DataFrame({"y": y})), y="y", rarity="metrics")
+    shards = [LabelCounts().update(y[s:s + 700]) for s in range(0, len(y), 700)]
+    acc = LabelCounts.from_dict(shards[0].to_dict())
+    for sh in shards[1:]:
+        acc.merge(sh)
+    assert acc.n == len(y)
+    streamed = measure_imbalance_counts(acc, "y", rarity="metrics")
+    assert [(m.id, m.value) for m in streamed.metrics] == [(m.id, m.value) for m in full.metrics]
+    assert any(m.id == "dq.imbalance.rarity.None" for m in full.metrics)
+    summ = measure_imbalance(Dataset(pd.DataFrame({"y": y}), name="s"), y="y", rarity="artifact", rarity_top_k=3, artifacts_dir=str(tmp_path))
+    assert not any(m.id.startswith("dq.imbalance.rarity.") for m in summ.metrics)
+    r = {m.id: m for m in summ.metrics}["dq.imbalance.rarity"]
+    assert len(r.value["rarest"]) == 3 and r.value["rarest"][0]["count"] == 1
+    assert r.meta["n_classes"] == len(pd.read_csv(summ.artifacts["artifact.imbalance.rarity"]))
+
+def test_imbalance_categorical_keeps_unused_categories():
+    ser = pd.Series(pd.Categorical(["a", "a", "a", "b", None], categories=["a", "b", "c"]))
+    rep = measure_imbalance(Dataset(pd.DataFrame({"y": ser})), y="y")
+    m = {mm.id: mm.value for mm in rep.metrics}
+    assert m["dq.imbalance.counts"] == {str(k): int(v) for k, v in ser.value_counts(dropna=False).items()}
+    assert m["dq.imbalance.ir"] == float("inf")
+    assert m["dq.imbalance.rarity.c"] == 1.0 and m["dq.imbalance.rarity.a"] == 0.0
+    assert m["dq.imbalance.rarity.b"] == m["dq.imbalance.rarity.nan"] == 2 / 3
+    # None and NaN in one object column are a single missing class
+    mixed = measure_imbalance(Dataset(pd.DataFrame({"y": ["a", None, float("nan"), "a"]})), y="y")
+    assert len({mm.id: mm.value for mm in mixed.metrics}["dq.imbalance.counts"]) == 2
@@ -22,3 +22,36 @@ def test_missingness_basic(tmp_path):
     # artifacts
     assert "artifact.missing.cooccurrence" in rep.artifacts
     assert "artifact.missing.top_patterns" in rep.artifacts
+
+def test_cooccurrence_matrix_top_k_and_threshold():
+    df = pd.DataFrame({
+        "a": [None, None, None, 1, 1, 1],
+        "b": [None, None, 1, 1, None, 1],
+        "c": [None, 1, 1, 1, 1, 1],
+        "d": [1, 2, 3, 4, 5, 6],
+    })
+    full = {m.id: m.value for m in analyze_missingness(Dataset(df)).metrics if ".cooccur." in m.id}
+    assert len(full) == 6
+    assert full["dq.missing.cooccur.a.b"] == 2 / 6
+    assert full["dq.missing.cooccur.a.c"] == full["dq.missing.cooccur.b.c"] == 1 / 6
+    assert full["dq.missing.cooccur.a.d"] == 0.0
+    top = [m.id for m in analyze_missingness(Dataset(df), cooccur_top_k=2).metrics if ".cooccur." in m.id]
+    assert top == ["dq.missing.cooccur.a.b", "dq.missing.cooccur.a.c"]
+    thr = [m.id for m in analyze_missingness(Dataset(df), cooccur_threshold=0.1).metrics if ".cooccur." in m.id]
+    assert thr == ["dq.missing.cooccur.a.b", "dq.missing.cooccur.a.c", "dq.missing.cooccur.b.c"]
+
+def test_top_patterns_packed_beyond_20_columns(tmp_path):
+    import numpy as np
+    df = pd.DataFrame(np.ones((6, 25)), columns=[f"c{i}" for i in range(25)])
+    df.iloc[0:3, 24] = None
+    df.iloc[3, [0, 24]] = None
+    rep = analyze_missingness(Dataset(df), artifacts_dir=str(tmp_path), top_k_patterns=2)
+    pats = {m.id: m for m in rep.metrics}["dq.missing.top_patterns"].value
+    assert [p["count"] for p in pats] == [3, 2]
+    assert pats[0]["missing"] == ["c24"] and pats[0]["pattern"] == "0" * 24 + "1"
+    assert pats[1]["missing"] == []
+    approx = {m.id: m for m in analyze_missingness(Dataset(df), pattern_capacity=8).metrics}["dq.missing.top_patterns"]
+    assert approx.meta == {"exact": True, "max_error": 0}
+    assert approx.value[0]["missing"] == ["c24"]
+    art = pd.read_csv(rep.artifacts["artifact.missing.top_patterns"])
+    assert art.loc[0, "missing"] == "c24"
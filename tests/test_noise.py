@@ -33,3 +33,96 @@ def test_noise_1nn_heuristic(tmp_path):
     m = {mm.id: mm.value for mm in rep.metrics}
     assert m["dq.noise.rate.overall"] > 0.0
     assert "dq.noise.rate.class.0" in m and "dq.noise.rate.class.1" in m
+
+def test_noise_knn_single_row_reports_no_noise(tmp_path):
+    df = pd.DataFrame({"x": [1.0], "y": ["a"]})
+    rep = estimate_label_noise(Dataset(df, name="one"), y="y", artifacts_dir=str(tmp_path))
+    m = {mm.id: mm.value for mm in rep.metrics}
+    assert m["dq.noise.rate.overall"] == 0.0
+    assert m["dq.noise.suspect_count"] == 0
+    assert "reason" in rep.meta and rep.artifacts == {}
+
+def test_noise_knn_blocked_and_tree_agree():
+    rng = np.random.default_rng(0)
+    X = np.vstack([rng.normal(0, 1, (1500, 3)), rng.normal(6, 1, (1500, 3))])
+    y = np.r_[np.zeros(1500, dtype=int), np.ones(1500, dtype=int)]
+    y[:30] = 1  # flipped labels inside cluster 0
+    df = pd.DataFrame(X, columns=["a", "b", "c"]).assign(y=y)
+    reps = [estimate_label_noise(Dataset(df), y="y", k=5, algorithm=alg, n_jobs=2) for alg in ("brute", "kd_tree")]
+    m = [{mm.id: mm.value for mm in r.metrics} for r in reps]
+    assert m[0] == m[1]
+    assert m[0]["dq.noise.suspect_count"] >= 25
+    assert reps[0].meta["mode"] == "5nn"
+    w = estimate_label_noise(Dataset(df), y="y", k=5, weights="distance")
+    assert {mm.id: mm.value for mm in w.metrics}["dq.noise.suspect_count"] >= 25
+
+def test_noise_proba_chunks_memmap_and_top_k(tmp_path):
+    rng = np.random.default_rng(1)
+    n = 500
+    df = pd.DataFrame({"y": rng.choice(["a", "b", "c"], n)})
+    proba = rng.dirichlet(np.ones(3), n)
+    ref = estimate_label_noise(Dataset(df), y="y", proba=proba, classes=["a", "b", "c"])
+    np.save(tmp_path / "p.npy", proba)
+    for src in (str(tmp_path / "p.npy"), (proba[s:s + 64] for s in range(0, n, 64))):
+        rep = estimate_label_noise(Dataset(df), y="y", proba=src, classes=["a", "b", "c"])
+        assert np.allclose([m.value for m in rep.metrics], [m.value for m in ref.metrics])
+    top = estimate_label_noise(Dataset(df, name="top"), y="y", proba=proba, classes=["a", "b", "c"], top_k_suspects=10, artifacts_dir=str(tmp_path))
+    art = pd.read_csv(top.artifacts["artifact.noise.suspects"])
+    susp = 1.0 - proba[np.arange(n), pd.Index(["a", "b", "c"]).get_indexer(df["y"])]
+    assert np.allclose(art["suspect_score"], np.sort(susp)[::-1][:10])
+    try:
+        estimate_label_noise(Dataset(df), y="y", proba=iter([proba[:100]]), classes=["a", "b", "c"])
+        assert False, "short chunk stream must fail"
+    except ValueError:
+        pass
+
+def test_noise_confident_joint(tmp_path):
+    rng = np.random.default_rng(3)
+    n, k = 2000, 3
+    true = rng.integers(0, k, n)
+    proba = rng.dirichlet(np.ones(k), n)
+    proba[np.arange(n), true] += 2.0
+    proba /= proba.sum(axis=1, keepdims=True)
+    y = true.copy()
+    y[:200] = (true[:200] + 1) % k  # 10% flipped
+    df = pd.DataFrame({"y": y})
+    chunks = [proba[s:s + 300] for s in range(0, n, 300)]
+    rep = estimate_label_noise(Dataset(df, name="cj"), y="y", proba=chunks, classes=[0, 1, 2], confident_joint=True, artifacts_dir=str(tmp_path))
+    m = {mm.id: mm.value for mm in rep.metrics}
+    for j in range(k):
+        assert np.isclose(m[f"dq.noise.cj.threshold.{j}"], proba[y == j, j].mean())
+    assert 0.07 < m["dq.noise.cj.noise_rate"] < 0.13
+    assert 150 < m["dq.noise.cj.label_issues"] < 250
+    joint = pd.read_csv(rep.artifacts["artifact.noise.confident_joint"])
+    assert joint["count"].sum() <= n and np.isclose(joint["joint"].sum(), 1.0)
+    try:
+        estimate_label_noise(Dataset(df), y="y", proba=iter(chunks), classes=[0, 1, 2], confident_joint=True)
+        assert False, "a one-shot iterator cannot be read twice"
+    except ValueError:
+        pass
+
+def test_noise_knn_ties_keep_lowest_index():
+    rng = np.random.default_rng(4)
+    X = rng.integers(0, 6, (3000, 2)).astype(float)  # lattice points: many equidistant neighbors
+    df = pd.DataFrame(X, columns=["a", "b"]).assign(y=rng.integers(0, 2, 3000))
+    for k in (1, 3):
+        reps = [estimate_label_noise(Dataset(df), y="y", k=k, algorithm=alg) for alg in ("brute", "kd_tree", "auto")]
+        vals = [[mm.value for mm in r.metrics] for r in reps]
+        assert vals[0] == vals[1] == vals[2]
+
+def test_noise_failed_proba_stream_leaves_no_artifacts(tmp_path):
+    import threading
+    from dqkit.capture import CaptureConfig
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({"y": rng.choice(["a", "b"], 400)})
+    proba = rng.dirichlet(np.ones(2), 400)
+    bad = [proba[:200], proba[200:300, :1]]  # second chunk has the wrong width
+    for cfg in (None, CaptureConfig(background=True)):
+        try:
+            estimate_label_noise(Dataset(df, name="bad"), y="y", proba=bad, classes=["a", "b"], threshold=0.0,
+                                 artifacts_dir=str(tmp_path), capture=cfg)
+            assert False, "a malformed chunk must fail"
+        except ValueError:
+            pass
+    assert list(tmp_path.iterdir()) == []
+    assert not any(t.name == "dqkit-capture" for t in threading.enumerate())
@@ -26,3 +26,112 @@ def test_profile_quantiles_hist(tmp_path):
     m = {mm.id: mm.value for mm in rep.metrics}
     assert m["dq.profile.q50.x"] == 49.5 or abs(m["dq.profile.q50.x"]-49.5) < 1e-9
     assert "artifact.hist.x" in rep.artifacts
+
+def test_profile_blocks_match_per_column_stats():
+    import numpy as np
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "f": rng.normal(size=200),
+        "i": rng.integers(0, 20, 200),
+        "n": pd.Series(rng.integers(0, 5, 200)).astype("Int64"),
+        "b": rng.random(200) > 0.5,
+    })
+    df.loc[::7, "f"] = np.nan
+    df.loc[::5, "n"] = pd.NA
+    rep = profile(Dataset(df, name="blocks"))
+    m = {mm.id: mm.value for mm in rep.metrics}
+    for col in df.columns:
+        s = df[col].dropna().astype(float)
+        assert m[f"dq.profile.count.{col}"] == len(s)
+        assert m[f"dq.profile.distinct.{col}"] == df[col].nunique()
+        assert m[f"dq.profile.min.{col}"] == s.min() and m[f"dq.profile.max.{col}"] == s.max()
+        assert abs(m[f"dq.profile.mean.{col}"] - s.mean()) < 1e-12
+        assert abs(m[f"dq.profile.std.{col}"] - s.std(ddof=1)) < 1e-12
+        for q, v in zip([0.05, 0.25, 0.5, 0.75, 0.95], np.quantile(s, [0.05, 0.25, 0.5, 0.75, 0.95])):
+            assert m[f"dq.profile.q{int(q*100)}.{col}"] == v
+
+def test_profile_state_chunks_and_merge_match_profile(tmp_path):
+    import numpy as np
+    from dqkit.profiling import ProfileState
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        "x": rng.normal(size=300),
+        "k": rng.integers(0, 9, 300),
+        "c": rng.choice(["a", "b", "c"], 300),
+    })
+    df.loc[::4, "x"] = np.nan
+    df.loc[::9, "c"] = None
+    left, right = ProfileState(), ProfileState()
+    for start in range(0, 150, 50):
+        left.update(df.iloc[start:start + 50])
+    right.update(df.iloc[150:])
+    rep = left.merge(right).finalize(name="chunks", artifacts_dir=str(tmp_path / "state"))
+    got = {mm.id: mm.value for mm in rep.metrics}
+    want = {mm.id: mm.value for mm in profile(Dataset(df), artifacts_dir=str(tmp_path / "full")).metrics}
+    assert set(got) == set(want)
+    for k, v in want.items():
+        if isinstance(v, float):
+            assert abs(got[k] - v) < 1e-9, k
+        else:
+            assert got[k] == v, k
+    assert (tmp_path / "state" / "x_hist.csv").read_text() == (tmp_path / "full" / "x_hist.csv").read_text()
+
+def test_profile_state_merge_disjoint_columns(tmp_path):
+    from dqkit.profiling import ProfileState
+    left = ProfileState().update(pd.DataFrame({"a": [1.0, 2.0, None]}))
+    right = ProfileState().update(pd.DataFrame({"b": ["x", "y"]}))
+    m = {mm.id: mm.value for mm in left.merge(right).finalize(name="m", artifacts_dir=str(tmp_path)).metrics}
+    assert m["dq.profile.missing_rate.a"] == 3 / 5
+    assert m["dq.profile.missing_rate.b"] == 3 / 5
+
+def test_profile_state_reports_sketch_error_bounds():
+    import numpy as np
+    from dqkit.profiling import ProfileState
+    rng = np.random.default_rng(2)
+    st = ProfileState(quantile_k=64, hll_precision=10)
+    for _ in range(5):
+        st.update(pd.DataFrame({"x": rng.normal(size=20000)}))
+    m = {mm.id: mm for mm in st.finalize().metrics}
+    assert m["dq.profile.count.x"].value == 100000
+    assert m["dq.profile.q50.x"].meta["approx"] and abs(m["dq.profile.q50.x"].value) < 0.1
+    assert abs(m["dq.profile.distinct.x"].value - 100000) < 10000
+    assert m["dq.profile.distinct.x"].meta["relative_error"] > 0
+
+def test_profile_approx_categorical_sketches():
+    import numpy as np
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({
+        "low": rng.choice(["a", "b", "c"], 5000),
+        "ids": rng.integers(0, 10**6, 5000).astype(str),
+    })
+    exact = {mm.id: mm for mm in profile(Dataset(df)).metrics}
+    approx = {mm.id: mm for mm in profile(Dataset(df), approx=True).metrics}
+    # low cardinality stays exact, with no error bounds attached
+    assert approx["dq.profile.topk.low"].value == exact["dq.profile.topk.low"].value
+    assert abs(approx["dq.profile.entropy.low"].value - exact["dq.profile.entropy.low"].value) < 1e-9
+    assert approx["dq.profile.distinct.low"].meta == {}
+    # high cardinality reports estimates with their error bounds
+    d = approx["dq.profile.distinct.ids"]
+    assert d.meta["approx"] and abs(d.value - exact["dq.profile.distinct.ids"].value) < 0.1 * 5000
+    e = approx["dq.profile.entropy.ids"]
+    assert e.meta["std_error"] > 0 and abs(e.value - exact["dq.profile.entropy.ids"].value) < 5 * e.meta["std_error"]
+    assert "max_count_error" in approx["dq.profile.topk.ids"].meta
+
+def test_profile_incremental_processes_only_new_rows(tmp_path):
+    import numpy as np
+    from dqkit.profiling import profile_incremental
+    rng = np.random.default_rng(4)
+    df = pd.DataFrame({"x": rng.normal(size=200), "c": rng.choice(["a", "b"], 200)})
+    store = str(tmp_path / "state")
+    first = profile_incremental(Dataset(df.iloc[:120], name="events"), store)
+    assert first.meta["new_rows"] == 120
+    second = profile_incremental(Dataset(df, name="events"), store)
+    assert second.meta["previous_watermark"] == 120 and second.meta["new_rows"] == 80
+    got = {mm.id: mm.value for mm in second.metrics}
+    want = {mm.id: mm.value for mm in profile(Dataset(df)).metrics}
+    assert got["dq.profile.count.x"] == 200 and got["dq.profile.n_rows"] == 200
+    assert abs(got["dq.profile.mean.x"] - want["dq.profile.mean.x"]) < 1e-12
+    assert got["dq.profile.topk.c"] == want["dq.profile.topk.c"]
+    # rewriting the table (not an append) triggers a rebuild from row 0
+    third = profile_incremental(Dataset(df.iloc[::-1].reset_index(drop=True), name="events"), store)
+    assert third.meta["reset"] == "prefix_changed" and third.meta["new_rows"] == 200
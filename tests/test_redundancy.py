@@ -30,3 +30,94 @@ def test_find_near_duplicates_text(tmp_path):
     rep = find_near_duplicates(Dataset(df, name="r3"), text_cols=["t"], threshold=0.5, artifacts_dir=str(tmp_path))
     m = {mm.id: mm.value for mm in rep.metrics}
     assert "dq.redundancy.rows.near_dup_rate" in m
+
+def test_near_duplicates_tiled_matches_single_tile(tmp_path):
+    import numpy as np
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=(10, 3))
+    X = base[rng.integers(0, 10, 200)] + rng.normal(scale=0.01, size=(200, 3))
+    df = pd.DataFrame(X, columns=["a", "b", "c"])
+    one = find_near_duplicates(Dataset(df, name="one"), numeric_cols=["a", "b", "c"], threshold=0.99, artifacts_dir=str(tmp_path))
+    tiled = find_near_duplicates(Dataset(df, name="tiled"), numeric_cols=["a", "b", "c"], threshold=0.99, artifacts_dir=str(tmp_path), tile_size=16, n_jobs=2)
+    assert one.metrics[0].value == tiled.metrics[0].value > 0
+    p1 = pd.read_csv(one.artifacts["artifact.redundancy.near_duplicates"])
+    p2 = pd.read_csv(tiled.artifacts["artifact.redundancy.near_duplicates"])
+    assert p1[["i", "j"]].equals(p2[["i", "j"]])
+    assert (p1["i"] < p1["j"]).all()
+    # independent reference: dense cosine matrix of the small frame
+    Xn = X / np.linalg.norm(X, axis=1, keepdims=True)
+    S = Xn @ Xn.T
+    ei, ej = np.nonzero(np.triu(S >= 0.99, k=1))
+    assert p2["i"].tolist() == ei.tolist() and p2["j"].tolist() == ej.tolist()
+    assert np.allclose(p2["similarity"], S[ei, ej])
+    assert tiled.metrics[0].value == len(ei) / (200 * 199 / 2)
+
+def test_near_duplicates_lsh_and_cross_batch_index(tmp_path):
+    import numpy as np
+    from dqkit.redundancy import CosineLSH
+    rng = np.random.default_rng(1)
+    base = rng.normal(size=(300, 6))
+    batch = np.vstack([base[:100], base[:100] + rng.normal(scale=0.001, size=(100, 6))])
+    cols = [f"f{i}" for i in range(6)]
+    df = pd.DataFrame(batch, columns=cols)
+    exact = find_near_duplicates(Dataset(df), numeric_cols=cols, threshold=0.999)
+    approx = find_near_duplicates(Dataset(df), numeric_cols=cols, threshold=0.999, method="lsh", lsh_bits=12, lsh_tables=6)
+    assert approx.metrics[0].value == exact.metrics[0].value
+    assert 0.9 < approx.metrics[0].meta["est_recall"] <= 1.0
+    index = CosineLSH(6, n_bits=12, n_tables=6).add(base)
+    index.save(str(tmp_path / "corpus.npz"))
+    loaded = CosineLSH.load(str(tmp_path / "corpus.npz"))
+    new = pd.DataFrame(np.vstack([base[200:] * 3.0, rng.normal(size=(100, 6))]), columns=cols)
+    rep = find_near_duplicates(Dataset(new, name="new"), numeric_cols=cols, threshold=0.999, method="lsh", index=loaded, artifacts_dir=str(tmp_path))
+    m = {mm.id: mm for mm in rep.metrics}
+    assert m["dq.redundancy.rows.near_dup_cross_rate"].value == 0.5
+    cross = pd.read_csv(rep.artifacts["artifact.redundancy.near_duplicates_cross"])
+    assert (cross["corpus_id"] == cross["i"] + 200).all()
+
+def test_near_duplicates_text_minhash_matches_exact(tmp_path):
+    import numpy as np
+    rng = np.random.default_rng(2)
+    vocab = [f"w{i}" for i in range(200)]
+    docs = [" ".join(rng.choice(vocab, 8)) for _ in range(150)]
+    df = pd.DataFrame({"t": docs + [d + " extra" for d in docs[:50]] + [None, ""]})
+    exact = find_near_duplicates(Dataset(df, name="ex"), text_cols=["t"], threshold=0.8, text_method="exact", artifacts_dir=str(tmp_path))
+    approx = find_near_duplicates(Dataset(df, name="mh"), text_cols=["t"], threshold=0.8, text_method="minhash", artifacts_dir=str(tmp_path))
+    assert exact.metrics[0].meta["text_method"] == "exact"
+    assert approx.metrics[0].value == exact.metrics[0].value > 0
+    assert approx.metrics[0].meta["text_est_recall"] >= 0.95
+    p1 = pd.read_csv(exact.artifacts["artifact.redundancy.near_duplicates"])
+    p2 = pd.read_csv(approx.artifacts["artifact.redundancy.near_duplicates"])
+    assert p1.equals(p2) and (p1["channel"] == "text:t").all()
+
+def test_near_duplicates_lsh_large_buckets_match_exact(tmp_path):
+    import numpy as np
+    from dqkit.redundancy import CosineLSH
+    rng = np.random.default_rng(3)
+    X = np.vstack([np.ones((1200, 3)), rng.normal(size=(300, 3))])
+    df = pd.DataFrame(X, columns=["a", "b", "c"])
+    exact = find_near_duplicates(Dataset(df, name="ex"), numeric_cols=["a", "b", "c"], threshold=0.999, artifacts_dir=str(tmp_path))
+    # two bits per table put hundreds of distinct rows into each bucket
+    approx = find_near_duplicates(Dataset(df, name="lsh"), numeric_cols=["a", "b", "c"], threshold=0.999, method="lsh", lsh_bits=2, lsh_tables=2, artifacts_dir=str(tmp_path))
+    assert approx.metrics[0].value == exact.metrics[0].value > 0.6
+    p1 = pd.read_csv(exact.artifacts["artifact.redundancy.near_duplicates"])
+    p2 = pd.read_csv(approx.artifacts["artifact.redundancy.near_duplicates"])
+    assert p1[["i", "j"]].equals(p2[["i", "j"]])
+    q, cid, _ = CosineLSH(3, n_bits=2, n_tables=2).add(X).query(np.ones((1, 3)), 0.999)
+    assert len(q) >= 1200 and set(range(1200)) <= set(cid)
+
+def test_near_duplicates_minhash_identical_texts():
+    df = pd.DataFrame({"t": ["same words here"] * 1500 + ["other text"] * 20 + [""] * 30})
+    exact = find_near_duplicates(Dataset(df), text_cols=["t"], threshold=0.8, text_method="exact")
+    approx = find_near_duplicates(Dataset(df), text_cols=["t"], threshold=0.8, text_method="minhash")
+    n = len(df)
+    assert approx.metrics[0].value == exact.metrics[0].value == (1500 * 1499 / 2 + 20 * 19 / 2) / (n * (n - 1) / 2)
+
+def test_find_duplicates_signed_zero_matches_pandas():
+    import numpy as np
+    df = pd.DataFrame({"a": [0.0, -0.0, 1.0, -0.0, np.nan, np.nan], "b": ["x", "x", "y", "z", "w", "w"]})
+    for sub in (df[["a"]], df):
+        rep = find_duplicates(Dataset(sub))
+        m = {mm.id: mm.value for mm in rep.metrics}
+        assert m["dq.redundancy.rows.duplicate_rate"] == sub.duplicated(keep=False).mean()
+    spilled = find_duplicates(Dataset(df[["a"]]), chunksize=2, memory_budget=0)
+    assert spilled.metrics[0].value == df[["a"]].duplicated(keep=False).mean()
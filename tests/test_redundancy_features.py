@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from dqkit.types import Dataset
+from dqkit.redundancy import measure_feature_redundancy
+
+def test_vif_from_correlation_inverse(tmp_path):
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=2000)
+    df = pd.DataFrame({"a": x, "b": 2 * x + rng.normal(scale=0.5, size=2000), "c": rng.normal(size=2000), "k": 1.0})
+    df.loc[::7, "c"] = np.nan
+    rep = measure_feature_redundancy(Dataset(df, name="f"), artifacts_dir=str(tmp_path))
+    m = {mm.id: mm.value for mm in rep.metrics}
+    # two regressors: VIF = 1 / (1 - r^2)
+    r = df["a"].corr(df["b"])
+    assert np.isclose(m["dq.redundancy.features.vif.a"], 1 / (1 - r ** 2), rtol=1e-3)
+    assert m["dq.redundancy.features.vif.k"] == 1e8
+    assert np.isclose(m["dq.redundancy.features.maxcorr.a"], abs(r))
+    corr = pd.read_csv(rep.artifacts["artifact.redundancy.corr_pearson"], index_col=0)
+    assert np.allclose(corr.to_numpy(), df.corr().to_numpy(), equal_nan=True)
+
+def test_tiled_correlation_pairs_match_dense(tmp_path):
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(300, 40))
+    X[:, 1] = X[:, 0] + rng.normal(scale=0.2, size=300)
+    X[:, 9] = np.exp(X[:, 8])
+    df = pd.DataFrame(X, columns=[f"f{i}" for i in range(40)])
+    for method in ("pearson", "spearman"):
+        dense = measure_feature_redundancy(Dataset(df, name="d"), corr_method=method, vif=False)
+        tiled = measure_feature_redundancy(Dataset(df, name="t"), corr_method=method, vif=False, corr_threshold=0.5,
+                                           tile_size=16, artifacts_dir=str(tmp_path))
+        assert np.allclose([m.value for m in tiled.metrics], [m.value for m in dense.metrics])
+        pairs = pd.read_csv(tiled.artifacts[f"artifact.redundancy.corr_{method}_pairs"])
+        assert set(zip(pairs["feature_a"], pairs["feature_b"])) == {("f0", "f1"), ("f8", "f9")}
+    top = measure_feature_redundancy(Dataset(df, name="k"), corr_top_k=1, artifacts_dir=str(tmp_path))
+    pairs = pd.read_csv(top.artifacts["artifact.redundancy.corr_pearson_pairs"])
+    assert len(pairs) <= 40 and ("f0", "f1") in set(zip(pairs["feature_a"], pairs["feature_b"]))
+    # the sparse path skips the p x p VIF inverse unless asked for
+    assert not any(m.id.startswith("dq.redundancy.features.vif.") for m in top.metrics)
+    forced = measure_feature_redundancy(Dataset(df), corr_top_k=1, vif=True)
+    assert sum(m.id.startswith("dq.redundancy.features.vif.") for m in forced.metrics) == 40
+
+def test_mutual_information_max_mixed_columns(tmp_path):
+    from sklearn.metrics import mutual_info_score
+    rng = np.random.default_rng(2)
+    x = rng.normal(size=3000)
+    df = pd.DataFrame({"x": x, "sign": np.where(x > np.median(x), "hi", "lo"), "noise": rng.integers(0, 5, 3000)})
+    rep = measure_feature_redundancy(Dataset(df, name="mi"), vif=False, mi=True, mi_bins=8, n_jobs=2, artifacts_dir=str(tmp_path))
+    m = {mm.id: mm for mm in rep.metrics}
+    # the sign is a function of x (split at a bin edge): MI(x, sign) = H(sign) = 1 bit
+    h = mutual_info_score(df["sign"], df["sign"]) / np.log(2)
+    assert np.isclose(m["dq.redundancy.features.mi_max.sign"].value, h)
+    assert m["dq.redundancy.features.mi_max.x"].value == m["dq.redundancy.features.mi_max.sign"].value
+    assert m["dq.redundancy.features.mi_max.noise"].value < 0.01
+    assert m["dq.redundancy.features.mi_max.x"].unit == "bits"
+    M = pd.read_csv(rep.artifacts["artifact.redundancy.mi"], index_col=0)
+    assert M.shape == (3, 3) and np.isnan(M.loc["x", "x"])
+
+def test_mutual_information_all_missing_column():
+    df = pd.DataFrame({"x": np.arange(100.0), "empty": np.nan, "none": pd.Series([None] * 100, dtype=object)})
+    rep = measure_feature_redundancy(Dataset(df), vif=False, mi=True)
+    m = {mm.id: mm.value for mm in rep.metrics}
+    assert m["dq.redundancy.features.mi_max.empty"] == 0.0
+    assert m["dq.redundancy.features.mi_max.none"] == 0.0
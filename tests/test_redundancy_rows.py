@@ -9,3 +9,14 @@ def test_dup_rate_keys():
     m = {x.id:x.value for x in rep.metrics}
     assert 'dq.redundancy.rows.duplicate_rate' in m
     assert 0.0 <= m['dq.redundancy.rows.duplicate_rate'] <= 1.0
+
+def test_duplicate_groups_and_spill_path():
+    df = pd.DataFrame({'a': [1, 1, 2, 3, 3, 3, None, None], 'b': ['x', 'x', 'y', 'z', 'z', 'z', None, None]})
+    for budget in (1 << 30, 0):  # 0 forces the partitioned spill-to-disk path
+        rep = find_duplicates(Dataset(df), chunksize=3, memory_budget=budget)
+        m = {x.id: x for x in rep.metrics}
+        assert m['dq.redundancy.rows.duplicate_rate'].value == 7 / 8
+        assert m['dq.redundancy.rows.duplicate_count'].value == 4
+        assert m['dq.redundancy.rows.duplicate_groups'].value == 3
+        assert m['dq.redundancy.rows.duplicate_groups'].meta['group_sizes'] == {2: 2, 3: 1}
+        assert m['dq.redundancy.rows.max_group_size'].value == 3
@@ -0,0 +1,58 @@
+
+import numpy as np
+import pandas as pd
+from dqkit.sketches import FrequentItems, HyperLogLog, KLLSketch
+
+def test_kll_exact_until_compaction_and_mergeable():
+    x = np.arange(100, dtype=float)
+    k = KLLSketch(k=256).update(x)
+    assert k.exact and k.quantiles([0.5])[0] == 49.5
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=50000)
+    a, b = KLLSketch(k=128, seed=0), KLLSketch(k=128, seed=1)
+    a.update(data[:25000]); b.update(data[25000:])
+    a.merge(b)
+    assert a.n == 50000 and not a.exact
+    assert abs(a.rank(0.0)[()] / a.n - 0.5) < 0.02
+
+def test_kll_round_trip_keeps_seed():
+    rng = np.random.default_rng(3)
+    d = KLLSketch(k=32, seed=7).update(rng.normal(size=1000)).to_dict()
+    assert d["seed"] == 7
+    more = rng.normal(size=5000)
+    # reloaded copies compact the same way
+    a, b = KLLSketch.from_dict(d).update(more), KLLSketch.from_dict(d).update(more)
+    assert a.seed == 7 and [x.tolist() for x in a.levels] == [x.tolist() for x in b.levels]
+    legacy = {k: v for k, v in d.items() if k != "seed"}
+    assert KLLSketch.from_dict(legacy).seed is None
+
+def test_hll_sparse_then_dense():
+    h = HyperLogLog(p=10)
+    h.update(np.arange(100))
+    assert h.exact and h.count() == 100
+    h.update(np.arange(50000))
+    assert not h.exact and abs(h.count() - 50000) / 50000 < 0.1
+    other = HyperLogLog(p=10).update(np.arange(50000, 60000))
+    assert abs(h.merge(other).count() - 60000) / 60000 < 0.1
+
+def test_frequent_items_bounds():
+    vals = np.r_[np.zeros(500), np.ones(300), np.arange(2, 1000)]
+    f = FrequentItems(capacity=16)
+    for chunk in np.array_split(vals, 7):
+        f.update(chunk)
+    top = f.top(2)
+    assert list(top.index) == [0.0, 1.0]
+    assert 500 - f.max_error <= top.iloc[0] <= 500
+    assert f.n == len(vals)
+
+def test_entropy_sketch_close_to_exact():
+    from dqkit.sketches import EntropySketch
+    rng = np.random.default_rng(1)
+    vals = rng.zipf(1.3, 50000)
+    p = pd.Series(vals).value_counts(normalize=True).to_numpy()
+    exact = float(-(p * np.log2(p)).sum())
+    a, b = EntropySketch(k=128), EntropySketch(k=128)
+    a.update(vals[:20000]); b.update(vals[20000:])
+    a.merge(b)
+    assert a.n == len(vals)
+    assert abs(a.estimate() - exact) < 4 * a.std_error
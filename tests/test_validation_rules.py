@@ -51,3 +51,194 @@ def test_foreign_key(tmp_path):
     out = validate(ds, spec, artifacts_dir=str(tmp_path))
     m = {mm.id: mm.value for mm in out.metrics}
     assert m["dq.validation.foreign_key[orders.user_id->users.id]"] == 0.75
+
+def test_compiled_plan_matches_validate_across_batches():
+    from dqkit.validation import compile_spec
+    df = pd.DataFrame({
+        "age": [10, -1, None, 130, 40, 50],
+        "code": ["A1", "b2", None, "C3", "D4", "E5"],
+        "kind": ["x", "y", "z", "x", None, "y"],
+    })
+    spec = build_spec()
+    spec["columns"] = {
+        "age": {"nullable": False, "min": 0, "max": 120},
+        "code": {"regex": r"^[A-Z][0-9]$"},
+        "kind": {"allowed_values": ["x", "y"]},
+        "absent": {"min": 0},
+    }
+    plan = compile_spec(spec)
+    for batch in (df.iloc[:3], df.iloc[3:], df):
+        ds = Dataset(batch, name="batch")
+        got = [(m.id, m.value, m.meta) for m in plan(ds).metrics]
+        want = [(m.id, m.value, m.meta) for m in validate(ds, spec).metrics]
+        assert got == want
+    m = {mm.id: mm.value for mm in plan(Dataset(df)).metrics}
+    assert m["dq.validation.min.age"] == 0.8
+    assert m["dq.validation.exists.absent"] == 0.0
+
+def test_validate_csv_streams_chunks(tmp_path):
+    from dqkit.io import from_csv
+    from dqkit.validation import validate_csv
+    df = pd.DataFrame({
+        "id": [1, 2, 3, 5, 4, 6, 7],
+        "age": [10, -1, None, 130, 40, 50, 60],
+        "u": [1, 2, 3, 4, 5, 6, 1],
+        "a": [1, 1, 2, 2, 3, 3, 1],
+        "b": ["x", "y", "x", "y", "x", "y", "x"],
+    })
+    path = tmp_path / "data.csv"
+    df.to_csv(path, index=False)
+    spec = build_spec()
+    spec["columns"] = {
+        "id": {"monotonic": "increasing", "unique": True},
+        "age": {"nullable": True, "min": 0, "max": 120},
+        "u": {"unique": True},
+    }
+    spec["composite_unique"] = [["a", "b"]]
+    spec["cross_field"] = [{"expr": "id <= u + 10", "name": "id_u"}]
+    spec["foreign_keys"] = [{"columns": ["a"], "reference": pd.DataFrame({"a": [1, 2]})}]
+    rep = validate_csv(str(path), spec, chunksize=2, artifacts_dir=str(tmp_path / "stream"))
+    want = validate(from_csv(str(path)), spec, artifacts_dir=str(tmp_path / "mem"))
+    assert [(m.id, m.value, m.meta) for m in rep.metrics] == [(m.id, m.value, m.meta) for m in want.metrics]
+    m = {mm.id: mm.value for mm in rep.metrics}
+    # duplicates and order breaks that only show up across chunk boundaries
+    assert m["dq.validation.monotonic.id"] == 0.0
+    assert m["dq.validation.unique.u"] == 0.0
+    assert m["dq.validation.composite_unique[a,b]"] == 0.0
+    dup_rows = pd.read_csv(rep.artifacts["violations.composite_unique[a,b]"])
+    assert len(dup_rows) == 2
+    assert rep.meta["n_rows"] == 7
+
+def test_validate_csv_unique_large_int_ids(tmp_path):
+    from dqkit.validation import validate_csv
+    big = 2 ** 62
+    # ids closer together than float64 can tell apart, spread over enough chunks
+    # for the cross-chunk hash compaction to run
+    df = pd.DataFrame({"id": [big + i for i in range(100)], "g": [1] * 100})
+    path = tmp_path / "big.csv"
+    df.to_csv(path, index=False)
+    spec = build_spec()
+    spec["columns"] = {"id": {"unique": True}}
+    spec["composite_unique"] = [["id", "g"]]
+    rep = validate_csv(str(path), spec, chunksize=2, artifacts_dir=str(tmp_path / "a"))
+    want = validate(Dataset(df), spec, artifacts_dir=str(tmp_path / "b"))
+    m = {mm.id: mm.value for mm in rep.metrics}
+    assert m["dq.validation.unique.id"] == 1.0
+    assert m["dq.validation.composite_unique[id,g]"] == 1.0
+    assert [(mm.id, mm.value) for mm in rep.metrics] == [(mm.id, mm.value) for mm in want.metrics]
+
+def test_validate_csv_failing_chunk_leaves_no_artifacts(tmp_path):
+    import threading
+    import pytest
+    from dqkit.validation import validate_csv
+    # the string in the third chunk makes `min` raise after violations were written
+    path = tmp_path / "bad.csv"
+    pd.DataFrame({"x": [5, 1, 2, 5, 5, 1, 2, 5, 5, 1, "oops", 1]}).to_csv(path, index=False)
+    spec = build_spec()
+    spec["columns"] = {"x": {"allowed_values": [1, 2], "min": 0}}
+    out = tmp_path / "artifacts"
+    with pytest.raises(TypeError):
+        validate_csv(str(path), spec, chunksize=5, artifacts_dir=str(out))
+    assert not [t for t in threading.enumerate() if t.name == "dqkit-capture"]
+    assert not (out.exists() and list(out.iterdir()))
+
+def test_foreign_key_index_cached_and_dtype_tolerant():
+    from dqkit.validation import KeyIndex, compile_spec
+    ref = pd.DataFrame({"k": [1, 2, 3], "g": ["a", "b", "a"]})
+    spec = build_spec()
+    spec["foreign_keys"] = [{"columns": ["k", "g"], "reference": ref, "fingerprint": "ref-v1"}]
+    p1, p2 = compile_spec(spec), compile_spec(spec)
+    assert p1.foreign_keys[0]["index"] is p2.foreign_keys[0]["index"]
+    df = pd.DataFrame({"k": [1.0, 2.0, 3.0, None], "g": ["a", "a", "a", "a"]})
+    m = {mm.id: mm.value for mm in p1(Dataset(df)).metrics}
+    assert m["dq.validation.foreign_key[fk(k,g)->ref(k,g)]"] == 0.5
+    idx = KeyIndex(ref, ["k"])
+    assert len(idx) == 3
+    assert idx.contains(pd.DataFrame({"k": [3, 4]})).tolist() == [True, False]
+
+def test_foreign_key_large_int_keys_not_collapsed():
+    from dqkit.validation import KeyIndex
+    big = 2 ** 62
+    ref = pd.DataFrame({"id": [big, big + 1000]})
+    child = pd.DataFrame({"id": [big + 1, big + 2, big + 1000]})
+    assert KeyIndex(ref, ["id"]).contains(child).tolist() == [False, False, True]
+    as_float = pd.DataFrame({"id": [float(big), 0.5, None]})
+    assert KeyIndex(ref, ["id"]).contains(as_float).tolist() == [True, False, False]
+    spec = build_spec()
+    spec["foreign_keys"] = [{"columns": ["id"], "reference": ref}]
+    m = {mm.id: mm.value for mm in validate(Dataset(child), spec).metrics}
+    assert abs(m["dq.validation.foreign_key[fk(id)->ref(id)]"] - 1 / 3) < 1e-12
+
+def test_domain_rules_per_unique_match_row_wise(monkeypatch):
+    from dqkit.validation import compile_spec, plan as plan_mod
+    codes = ["A1", "b2", None, "C3", "zz", "A1"] * 50
+    df = pd.DataFrame({"code": codes, "cat": pd.Categorical(codes)})
+    spec = build_spec()
+    rules = {"regex": r"^[A-Z][0-9]$", "allowed_values": ["A1", "C3"]}
+    spec["columns"] = {"code": dict(rules), "cat": dict(rules)}
+    per_unique = [(m.id, m.value) for m in compile_spec(spec)(Dataset(df)).metrics]
+    # a tiny sample with a zero ratio forces the row-wise fallback for object columns
+    monkeypatch.setattr(plan_mod, "_DOMAIN_SAMPLE", 10)
+    monkeypatch.setattr(plan_mod, "_DOMAIN_MAX_RATIO", 0.0)
+    row_wise = [(m.id, m.value) for m in compile_spec(spec)(Dataset(df)).metrics]
+    assert per_unique == row_wise
+    m = dict(per_unique)
+    assert m["dq.validation.regex.code"] == m["dq.validation.regex.cat"] == 0.5
+    assert m["dq.validation.allowed_values.cat"] == 4 / 6
+
+def test_regex_domain_keeps_equal_values_of_mixed_types_apart(monkeypatch):
+    from dqkit.validation import compile_spec, plan as plan_mod
+    # 1, True and 1.0 compare equal but print differently
+    df = pd.DataFrame({"v": [1, True, 1.0, "1", None] * 3})
+    spec = build_spec()
+    spec["columns"] = {"v": {"regex": r"^True$", "allowed_values": [1]}}
+    per_unique = [(m.id, m.value) for m in compile_spec(spec)(Dataset(df)).metrics]
+    monkeypatch.setattr(plan_mod, "_DOMAIN_SAMPLE", 2)
+    monkeypatch.setattr(plan_mod, "_DOMAIN_MAX_RATIO", 0.0)
+    row_wise = [(m.id, m.value) for m in compile_spec(spec)(Dataset(df)).metrics]
+    assert per_unique == row_wise
+    assert dict(per_unique)["dq.validation.regex.v"] == 0.2
+
+def test_cross_field_engine_reports_errors_separately():
+    df = pd.DataFrame({"start": [1, 2, 3, 4], "end": [1, 1, 5, None], "kind": ["a", "b", "a", None], "my col": [0, 1, 2, 3]})
+    spec = build_spec()
+    spec["cross_field"] = [
+        {"expr": "start <= end", "name": "le"},
+        {"expr": "0 <= start <= 3 and kind in ['a', 'b']", "name": "chain"},
+        {"expr": "`my col` + start * 2 > 3", "name": "arith"},
+        {"expr": "start <=", "name": "parse"},
+        {"expr": "start < nope", "name": "column"},
+        {"expr": "kind > 1", "name": "eval"},
+    ]
+    out = validate(Dataset(df), spec)
+    m = {mm.target: mm for mm in out.metrics}
+    assert m["le"].value == 0.5
+    assert m["chain"].value == 0.75
+    assert m["arith"].value == 0.75
+    for name in ("parse", "column", "eval"):
+        assert m[name].value != m[name].value  # NaN
+        assert m[name].meta["error_kind"] == name
+    assert "nope" in m["column"].meta["error"]
+
+def test_foreign_key_reference_edited_in_place_is_reindexed():
+    from dqkit.validation import compile_spec
+    ref = pd.DataFrame({"id": [1, 2, 3]})
+    df = pd.DataFrame({"id": [1, 2, 4]})
+    spec = build_spec()
+    spec["foreign_keys"] = [{"columns": ["id"], "reference": ref}]
+    fk = "dq.validation.foreign_key[fk(id)->ref(id)]"
+    assert abs({m.id: m.value for m in compile_spec(spec)(Dataset(df)).metrics}[fk] - 2 / 3) < 1e-12
+    ref.loc[2, "id"] = 4
+    assert {m.id: m.value for m in compile_spec(spec)(Dataset(df)).metrics}[fk] == 1.0
+
+def test_cross_field_bitwise_ops_bind_like_pandas(monkeypatch):
+    from dqkit.validation import expr as expr_mod
+    df = pd.DataFrame({"a": [1, 2, 3, 4, 5, 6], "b": [3, 1, 4, 1, 5, 9]})
+    exprs = ["a < 3 & b > 2", "a > 0 | b > 2", "a * 2 > b | a - b < 0 & b > 1"]
+    spec = build_spec()
+    spec["cross_field"] = [{"expr": e, "name": e} for e in exprs]
+    for ne in (expr_mod._ne, None):
+        monkeypatch.setattr(expr_mod, "_ne", ne)
+        m = {mm.target: mm.value for mm in validate(Dataset(df), spec).metrics}
+        for e in exprs:
+            assert m[e] == pd.eval(e, resolvers=[df]).mean()